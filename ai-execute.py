@@ -2,7 +2,7 @@
 import sys
 import json
 import time
-import queue
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import csv
 import argparse
 from pathlib import Path
@@ -11,68 +11,62 @@ from datetime import datetime
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
 
-from host.core.device_manager import DeviceManager
+from host.core.device_manager import DeviceManager, DeviceProblemError
 from host.lab.sidekick_plate_manager import PlateManager
 from host.gui.console import C
-from shared_lib.messages import Message
 from host.ai.ai_utils import connect_devices, load_world_from_file
+from host.ai.plan_optimizer import optimize_plan
 
 def wait_for_completion(
     manager: DeviceManager,
     port: str,
+    future: Future,
     step_info: dict,
     csv_writer: csv.DictWriter,
     header_written: bool,
     timeout: int = 60
 ):
-    """Waits for a completion message and logs any DATA_RESPONSE to the CSV."""
-    # ... (This function remains unchanged as its logic is still correct)
+    """Waits for an instruction's response future and logs any DATA_RESPONSE to the CSV."""
     print(f"  -> Waiting for completion from {port} (timeout: {timeout}s)...")
-    start_time = time.time()
     header_was_written = header_written
 
-    while time.time() - start_time < timeout:
-        try:
-            msg_type, msg_port, msg_data = manager.incoming_message_queue.get(timeout=1)
-            if msg_port != port:
-                continue
-
-            status = msg_data.status.upper()
-            payload = msg_data.payload
-
-            if status in ("SUCCESS", "DATA_RESPONSE"):
-                print(f"{C.OK}  -> Received {status}{C.END}")
-                
-                if status == "DATA_RESPONSE":
-                    data_points = payload.get('data', {})
-                    if isinstance(data_points, dict):
-                        log_row = {
-                            'timestamp': datetime.now().isoformat(),
-                            'step': step_info['number'],
-                            'device': step_info['device'],
-                            'command': step_info['command'],
-                        }
-                        log_row.update(data_points)
-                        
-                        if not header_was_written:
-                            csv_writer.fieldnames = log_row.keys()
-                            csv_writer.writeheader()
-                            header_was_written = True
-                        
-                        csv_writer.writerow(log_row)
-                        print(f"  -> {C.INFO}Logged data response to CSV.{C.END}")
-
-                return True, payload, header_was_written
-
-            elif status == "PROBLEM":
-                print(f"{C.ERR}  -> Received PROBLEM: {payload}{C.END}")
-                return False, payload, header_was_written
-
-        except queue.Empty:
-            continue
-
-    print(f"{C.ERR}  -> Timed out waiting for response from {port}.{C.END}")
-    return False, None, header_was_written
+    try:
+        response = future.result(timeout=timeout)
+    except DeviceProblemError as e:
+        print(f"{C.ERR}  -> Received PROBLEM: {e.message.payload}{C.END}")
+        return False, e.message.payload, header_was_written
+    except FutureTimeoutError:
+        future.cancel()
+        print(f"{C.ERR}  -> Timed out waiting for response from {port}.{C.END}")
+        return False, None, header_was_written
+    except ConnectionError as e:
+        print(f"{C.ERR}  -> {e}{C.END}")
+        return False, None, header_was_written
+
+    status = response.status.upper()
+    payload = response.payload
+    print(f"{C.OK}  -> Received {status}{C.END}")
+
+    if status == "DATA_RESPONSE":
+        data_points = payload.get('data', {})
+        if isinstance(data_points, dict):
+            log_row = {
+                'timestamp': datetime.now().isoformat(),
+                'step': step_info['number'],
+                'device': step_info['device'],
+                'command': step_info['command'],
+            }
+            log_row.update(data_points)
+
+            if not header_was_written:
+                csv_writer.fieldnames = log_row.keys()
+                csv_writer.writeheader()
+                header_was_written = True
+
+            csv_writer.writerow(log_row)
+            print(f"  -> {C.INFO}Logged data response to CSV.{C.END}")
+
+    return True, payload, header_was_written
 
 
 def main():
@@ -80,6 +74,7 @@ def main():
     parser.add_argument("--plan", type=str, required=True, help="Path to the plan JSON file.")
     parser.add_argument("--world", type=str, required=True, help="Path to the world model JSON file for this plan.")
     parser.add_argument("--output", type=str, help="Optional: Name of the output CSV file for results.")
+    parser.add_argument("--optimize", action="store_true", help="Reorder independent well visits to reduce arm travel before running.")
     args = parser.parse_args()
 
     print("====== AI Experiment Executor ======")
@@ -110,6 +105,12 @@ def main():
 
             print(f"{C.OK}Loaded plan with {len(plan)} steps from '{args.plan}'.{C.END}")
 
+            if args.optimize:
+                plan, report = optimize_plan(plan)
+                print(f"{C.INFO}Reordered {report['moved']} of {report['groups']} well visits: "
+                      f"est. arm travel {report['original_s']:.1f} s -> {report['optimized_s']:.1f} s "
+                      f"(saves {report['saved_s']:.1f} s).{C.END}")
+
         except (FileNotFoundError, json.JSONDecodeError) as e:
             sys.exit(f"{C.ERR}Failed to load or parse plan file: {e}{C.END}")
 
@@ -140,11 +141,15 @@ def main():
                 print(f"{C.ERR}  -> Aborting: Device '{step['device']}' is not connected.{C.END}")
                 break
             
-            msg = Message("AI_EXECUTOR", "INSTRUCTION", payload={"func": step['command'], "args": step['args']})
-            manager.send_message(port, msg)
+            future = manager.request(
+                port,
+                {"func": step['command'], "args": step['args']},
+                expect=("SUCCESS", "DATA_RESPONSE"),
+                subsystem_name="AI_EXECUTOR"
+            )
             
             step_info = {'number': step_num, 'device': step['device'], 'command': step['command']}
-            success, response, header_written = wait_for_completion(manager, port, step_info, csv_writer, header_written)
+            success, response, header_written = wait_for_completion(manager, port, future, step_info, csv_writer, header_written)
 
             if not success:
                 print(f"{C.ERR}  -> Aborting plan due to error in step {step_num}.{C.END}")
@@ -0,0 +1,74 @@
+# benchmarks/bench_kinematics.py
+"""
+Benchmark for the Sidekick inverse kinematics in firmware/sidekick/kinematics.py.
+
+Solves a grid of targets across the reachable workspace with the closed-form
+IK and with the previous geometric IK (tests/sidekick/reference.py). Absolute
+times are for this host; the ratio is what carries over to the RP2040.
+
+Also times every well x pump step target, point by point with the firmware
+functions and in one call to the vectorized host.kinematics.sidekick.well_steps.
+
+    python benchmarks/bench_kinematics.py [--rounds 20]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from host.kinematics import sidekick as host_kinematics
+from tests.sidekick.reference import load_firmware_module, make_machine, legacy_inverse_kinematics
+
+kinematics = load_firmware_module("kinematics")
+
+def solve_all(ik, machine, targets, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for x, y in targets:
+            ik(machine, x, y)
+    return (time.perf_counter() - start) / (rounds * len(targets))
+
+def firmware_well_steps(machine):
+    config = machine.config
+    _names, x, y = host_kinematics.well_positions(config)
+    for well_x, well_y in zip(x.tolist(), y.tolist()):
+        for pump in [None] + sorted(config['pump_offsets']):
+            target = (well_x, well_y)
+            if pump is not None:
+                target = kinematics.pump_center_target(machine, config['pump_offsets'][pump], well_x, well_y)
+            kinematics.degrees_to_steps(machine, *kinematics.inverse_kinematics(machine, *target))
+
+def time_per_call(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds
+
+def main():
+    parser = argparse.ArgumentParser(description="Sidekick inverse kinematics benchmark.")
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over the target grid (default 20)")
+    args = parser.parse_args()
+
+    machine = make_machine()
+    # 0.5 cm grid over the plate side of the workspace
+    targets = [(x / 2, y / 2) for x in range(0, 35) for y in range(-20, 21)]
+
+    print(f"Python {sys.version.split()[0]}, {len(targets)} targets x {args.rounds} rounds")
+    legacy = solve_all(legacy_inverse_kinematics, machine, targets, args.rounds)
+    closed = solve_all(kinematics.inverse_kinematics, machine, targets, args.rounds)
+    print(f"  {'legacy geometric IK':<22} {legacy * 1e6:>8.2f} us/solve")
+    print(f"  {'closed-form IK':<22} {closed * 1e6:>8.2f} us/solve  ({legacy / closed:.1f}x)")
+
+    config = host_kinematics.load_firmware_config()
+    plate_machine = make_machine(config)
+    per_point = time_per_call(lambda: firmware_well_steps(plate_machine), args.rounds)
+    vectorized = time_per_call(lambda: host_kinematics.well_steps(config), args.rounds)
+    print("All wells x (center + pumps) step targets")
+    print(f"  {'firmware, per point':<22} {per_point * 1e3:>8.2f} ms")
+    print(f"  {'host, vectorized':<22} {vectorized * 1e3:>8.2f} ms  ({per_point / vectorized:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_message_buffer.py
+"""
+Benchmark for the FIFO message buffers in shared_lib.message_buffer.
+
+Each round stores a burst of messages and then drains it, the way an inbox
+fills while a device is busy and empties once it is free. "list pop(0)" is
+the previous LinearMessageBuffer implementation, kept here for comparison.
+
+    python benchmarks/bench_message_buffer.py [--burst 10000] [--rounds 20]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from shared_lib.message_buffer import MessageBuffer, LinearMessageBuffer, RingMessageBuffer, DequeMessageBuffer
+from shared_lib.messages import Message
+
+class ListPopBuffer(MessageBuffer):
+    """The original list based LinearMessageBuffer."""
+    def _create_storage(self):
+        return []
+
+    def _store(self, value):
+        self.messages.append(value)
+
+    def _get(self):
+        return self.messages.pop(0)
+
+    def _flush(self):
+        self.messages = []
+
+def burst(buffer_class, size, rounds):
+    buffer = buffer_class(max_size=size)
+    message = Message("HOST", "INSTRUCTION", payload={"func": "ping"})
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _ in range(size):
+            buffer.store(message)
+        while buffer.get() is not None:
+            pass
+    return size * rounds / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Message buffer burst benchmark.")
+    parser.add_argument("--burst", type=int, default=10000, help="Messages per burst (default 10000)")
+    parser.add_argument("--rounds", type=int, default=20, help="Bursts per buffer (default 20)")
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}, {args.rounds} bursts of {args.burst} messages")
+    for name, buffer_class in (("list pop(0)", ListPopBuffer), ("DequeMessageBuffer", DequeMessageBuffer),
+                               ("RingMessageBuffer", RingMessageBuffer), ("LinearMessageBuffer", LinearMessageBuffer)):
+        print(f"  {name:<20} {burst(buffer_class, args.burst, args.rounds):>12,.0f} msg/s (store + get)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_messages.py
+"""
+Micro-benchmark for shared_lib.messages.Message on CPython.
+
+Measures messages per second for the three things every device loop and
+host listener thread does: create a message, serialize it, and parse a line.
+Each test reports the best of several runs.
+
+    python benchmarks/bench_messages.py [--count 100000]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from shared_lib.messages import Message
+
+# A typical colorimeter read, the largest message on the wire during a scan
+SPECTRUM = {
+    "metadata": {"data_type": "color_spectrum"},
+    "data": {"violet": 1203, "indigo": 2204, "blue": 3105, "cyan": 4006, "green": 5907,
+             "yellow": 6808, "orange": 7709, "red": 8600, "clear": 9501, "nir": 402}
+}
+
+REPEATS = 5
+
+def rate(func, count):
+    """Best of REPEATS runs, which is the least disturbed by other processes."""
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(count)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+def create(count):
+    for _ in range(count):
+        Message("COLORIMETER", "DATA_RESPONSE", payload=SPECTRUM)
+
+def serialize(count):
+    msg = Message("COLORIMETER", "DATA_RESPONSE", payload=SPECTRUM, origin="0a1b2c3d-42")
+    for _ in range(count):
+        msg.serialize()
+
+def parse(count):
+    line = Message("COLORIMETER", "DATA_RESPONSE", payload=SPECTRUM, origin="0a1b2c3d-42").serialize()
+    for _ in range(count):
+        Message.from_json(line)
+
+def serialize_small(count):
+    msg = Message("SIDEKICK", "SUCCESS", payload={"message": "Moved to A1"}, origin="0a1b2c3d-42")
+    for _ in range(count):
+        msg.serialize()
+
+def parse_small(count):
+    line = Message("SIDEKICK", "SUCCESS", payload={"message": "Moved to A1"}, origin="0a1b2c3d-42").serialize()
+    for _ in range(count):
+        Message.from_json(line)
+
+def round_trip(count):
+    for _ in range(count):
+        Message.from_json(Message("COLORIMETER", "DATA_RESPONSE", payload=SPECTRUM).serialize())
+
+def main():
+    parser = argparse.ArgumentParser(description="Message throughput benchmark.")
+    parser.add_argument("--count", type=int, default=100000, help="Messages per test (default 100000)")
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}, {args.count} messages per test")
+    tests = (
+        ("create", create),
+        ("serialize", serialize),
+        ("from_json", parse),
+        ("serialize (SUCCESS)", serialize_small),
+        ("from_json (SUCCESS)", parse_small),
+        ("round trip", round_trip),
+    )
+    for name, func in tests:
+        func(1000)  # warm up
+        print(f"  {name:<20} {rate(func, args.count):>12,.0f} msg/s")
+
+if __name__ == "__main__":
+    main()
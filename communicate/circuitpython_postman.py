@@ -2,15 +2,20 @@
 #type: ignore
 import usb_cdc  # Make sure this is not commented out
 from .postman import Postman
+from .framing import LineAssembler
 
 class CircuitPythonPostman(Postman):
     """
     Postman implementation for serial communication using data line in CircuitPython.
     usb_cdc.enable(console=True, data=True) belongs in boot.py
+
+    Optional params: "rx_buffer" - size in bytes of the receive buffer, which
+    is also the longest line that can be received (default 1024).
     """
 
     def _open_channel(self):
         """Opens the serial port."""
+        self._assembler = LineAssembler(self.params.get("rx_buffer", 1024))
         return usb_cdc.data
 
     def _close_channel(self):
@@ -19,25 +24,53 @@ class CircuitPythonPostman(Postman):
 
     def _send(self, value):
         """Sends data over the serial port."""
-        message = str(value)
-        if not message.endswith('\n'):
-            message += '\n'
-        # Assuming you want to send a string, encode it to bytes
-        data = message.encode('utf-8')  # Ensure the data is encoded as bytes
+        self.channel.write(self._to_wire(value))
+
+    def _write(self, data):
+        """Writes framed bytes over the serial port."""
         self.channel.write(data)
 
     def _receive(self):
         """
         Receives data from the serial port in a NON-BLOCKING way.
         """
-        # --- FIX IS HERE ---
-        # First, check if there is any data waiting to be read.
-        if self.channel.in_waiting > 0:
-            # If there is data, read one line.
-            data = self.channel.readline()
-            # Decode the bytes to a string, stripping any trailing whitespace.
-            return data.decode('utf-8').strip()
-        
-        # If no data is waiting, return an empty string immediately.
-        # This prevents the main loop from blocking.
-        return ""
\ No newline at end of file
+        if self.framing == "cobs":
+            return self._receive_frame()
+
+        # Never call readline(): a partial line would block the main loop until
+        # the rest arrives. The assembler only reads bytes that are already waiting.
+        line = self._assembler.next_line()
+        if line is None:
+            self._assembler.fill(self.channel)
+            line = self._assembler.next_line()
+            if line is None:
+                return ""
+        try:
+            return line.decode('utf-8').strip()
+        except UnicodeError:
+            # Corrupted bytes; drop the line rather than stall on it
+            return ""
+
+    def _receive_many(self):
+        """
+        Returns every complete line (or frame) that has arrived. Reads only what
+        is already waiting, at most one buffer's worth per call.
+        """
+        if self.framing == "cobs":
+            waiting = self.channel.in_waiting
+            if waiting:
+                self._frames.extend(self._frame_decoder.feed(self.channel.read(waiting)))
+            received, self._frames = self._frames, []
+            return received
+        received = []
+        self._assembler.fill(self.channel)
+        line = self._assembler.next_line()
+        while line is not None:
+            try:
+                line = line.decode('utf-8').strip()
+                if line:
+                    received.append(line)
+            except UnicodeError:
+                pass
+            line = self._assembler.next_line()
+        return received
@@ -0,0 +1,192 @@
+# communicate/framing.py
+#type: ignore
+"""
+Frame formats for byte streams between the host and a device.
+
+"line" - newline terminated UTF-8 text. The original format.
+"cobs" - each frame is COBS(data + CRC16) followed by a single 0x00 byte.
+         COBS removes every 0x00 from the body, so the delimiter can never
+         appear inside a frame. A receiver that joins mid-stream or sees a
+         corrupted frame resynchronizes at the next 0x00, and the CRC rejects
+         damaged frames before anyone tries to parse them. The body is
+         arbitrary bytes, so binary codecs need no escaping.
+
+Both ends of a link must be configured with the same framing.
+"""
+
+FRAMINGS = ("line", "cobs")
+
+FRAME_DELIMITER = b"\x00"
+
+# Frames longer than this without a delimiter are line noise; drop them
+MAX_FRAME = 4096
+
+
+def _make_crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+_CRC_TABLE = _make_crc_table()
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) of a bytes-like object."""
+    crc = 0xFFFF
+    table = _CRC_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+def cobs_encode(data):
+    """Consistent Overhead Byte Stuffing. The result contains no 0x00 bytes."""
+    out = bytearray()
+    for chunk in bytes(data).split(b"\x00"):
+        while len(chunk) >= 254:
+            out.append(0xFF)
+            out.extend(chunk[:254])
+            chunk = chunk[254:]
+        out.append(len(chunk) + 1)
+        out.extend(chunk)
+    return bytes(out)
+
+def cobs_decode(data):
+    """Reverses cobs_encode. Raises ValueError on an invalid encoding."""
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        code = data[i]
+        if code == 0:
+            raise ValueError("Zero byte inside COBS frame")
+        end = i + code
+        if end > n:
+            raise ValueError("Truncated COBS frame")
+        out.extend(data[i + 1:end])
+        i = end
+        if code < 0xFF and i < n:
+            out.append(0)
+    return bytes(out)
+
+def encode_frame(data):
+    """Returns the complete on-the-wire frame for data, delimiter included."""
+    crc = crc16(data)
+    return cobs_encode(bytes(data) + bytes((crc >> 8, crc & 0xFF))) + FRAME_DELIMITER
+
+def decode_frame(body):
+    """
+    Decodes one frame body (without the delimiter) and checks its CRC.
+    Returns the data, or None if the frame is damaged.
+    """
+    if len(body) < 3:
+        return None
+    try:
+        raw = cobs_decode(body)
+    except ValueError:
+        return None
+    data = raw[:-2]
+    if crc16(data) != (raw[-2] << 8) | raw[-1]:
+        return None
+    return data
+
+
+class FrameDecoder:
+    """
+    Splits a byte stream into verified COBS frames.
+
+    feed() returns the data of every complete, valid frame in the order received.
+    Bytes of an unfinished frame are kept for the next call. Damaged frames are
+    dropped and counted in bad_frames.
+    """
+    def __init__(self, max_frame=MAX_FRAME):
+        self.max_frame = max_frame
+        self.bad_frames = 0
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        frames = []
+        buffer = self._buffer
+        buffer.extend(data)
+        start = 0
+        while True:
+            end = buffer.find(FRAME_DELIMITER, start)
+            if end < 0:
+                break
+            if end > start:
+                frame = decode_frame(buffer[start:end])
+                if frame is None:
+                    self.bad_frames += 1
+                else:
+                    frames.append(frame)
+            start = end + 1
+        if start:
+            del buffer[:start]
+        if len(buffer) > self.max_frame:
+            # No delimiter for too long: discard and wait for the next one
+            self.bad_frames += 1
+            del buffer[:]
+        return frames
+
+    def reset(self):
+        del self._buffer[:]
+
+
+class LineAssembler:
+    """
+    Non-blocking reader for "line" framing on a device.
+
+    Bytes are read into one preallocated buffer, never more than the channel
+    reports in in_waiting, so a call costs bounded time even when only part
+    of a line has arrived. Complete lines are split off in order and the
+    partial tail is kept for the next call. A line longer than the buffer is
+    discarded up to its newline and counted in overflows.
+    """
+    def __init__(self, size=1024):
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._len = 0        # Bytes held in the buffer
+        self._scanned = 0    # Bytes already searched for a newline
+        self._discarding = False
+        self.overflows = 0
+
+    def fill(self, channel):
+        """Reads what is waiting on channel, up to the free space. Returns the number of bytes read."""
+        free = len(self._buf) - self._len
+        waiting = channel.in_waiting
+        if not waiting or not free:
+            return 0
+        count = channel.readinto(self._view[self._len:self._len + min(waiting, free)]) or 0
+        self._len += count
+        return count
+
+    def next_line(self):
+        """Returns the next complete line as bytes (without the newline), or None."""
+        while True:
+            # Only search bytes not searched before; bytes(...).find works on every port
+            found = bytes(self._view[self._scanned:self._len]).find(b"\n")
+            if found < 0:
+                self._scanned = self._len
+                if self._len == len(self._buf):
+                    # Buffer full and still no newline: drop it and skip to the next line
+                    if not self._discarding:
+                        self.overflows += 1
+                    self._discarding = True
+                    self._len = self._scanned = 0
+                return None
+            end = self._scanned + found
+            line = None if self._discarding else bytes(self._view[:end])
+            remaining = self._len - end - 1
+            self._view[:remaining] = self._view[end + 1:self._len]
+            self._len = remaining
+            self._scanned = 0
+            if line is None:
+                self._discarding = False
+                continue
+            return line
+
+    def reset(self):
+        self._len = self._scanned = 0
+        self._discarding = False
@@ -1,4 +1,6 @@
 #type: ignore
+from .wire_codec import get_codec
+from .framing import FRAMINGS, FrameDecoder, encode_frame
 
 class Postman():
     """
@@ -16,6 +18,10 @@ class Postman():
                        "port" (for serial)
                        "baudrate" (for serial, default 115200)
                        "timeout" (for serial, default 1)
+                       "codec" (wire format for send_message, default "json")
+                       "framing" ("line" or "cobs", default "line"; must match the other end)
+                       "coalesce" (buffer sends until flush(), default False)
+                       "coalesce_limit" (bytes buffered before an automatic flush, default 512)
                        "url" (for REST)
                        "topic" (for MQTT)
                        ... (other protocol-specific parameters)
@@ -27,6 +33,22 @@ class Postman():
 
         self.channel = None
         self.is_open = False
+        self.codec = get_codec(params.get("codec", "json"))
+
+        self.framing = params.get("framing", "line")
+        if self.framing not in FRAMINGS:
+            raise ValueError(f"framing must be one of {FRAMINGS}, not '{self.framing}'")
+        self._frame_decoder = FrameDecoder() if self.framing == "cobs" else None
+        self._frames = []  # Complete lines or verified frames read but not yet received
+
+        # Opt-in write coalescing: messages sent in the same tick go out in one write
+        self.coalesce = params.get("coalesce", False)
+        self.coalesce_limit = params.get("coalesce_limit", 512)
+        self._outbound = bytearray()
+
+        # Optional callable returning a dict merged into the meta of every message
+        # sent with send_message (e.g. StateMachine.flow_meta for credits)
+        self.meta_source = None
 
     def open_channel(self):
         """
@@ -45,6 +67,7 @@ class Postman():
         if not self.is_open:
             return  # Do nothing if already closed. Raise exception?
 
+        self.flush()
         self._close_channel()
         self.channel = None
         self.is_open = False
@@ -55,7 +78,43 @@ class Postman():
         """
         if not self.is_open:
             raise ValueError("Channel is not open.  Must call open_channel() first.")
-        self._send(value)
+        if not self.coalesce:
+            self._send(value)
+            return
+        self._outbound.extend(self._to_wire(value))
+        if len(self._outbound) >= self.coalesce_limit:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes any coalesced messages in a single write. Does nothing when
+        coalescing is off or nothing is waiting.
+        """
+        if not self._outbound or not self.is_open:
+            return
+        data = bytes(self._outbound)
+        self._outbound = bytearray()
+        self._write(data)
+
+    def send_message(self, message):
+        """
+        Encodes a Message with the current codec and sends it.
+        """
+        if self.meta_source is not None:
+            message.meta.update(self.meta_source())
+        if self.framing == "cobs":
+            # Frames carry bytes, so binary codecs skip their text armor
+            self.send(self.codec.encode_binary(message))
+        else:
+            self.send(self.codec.encode(message))
+
+    def set_codec(self, name):
+        """
+        Switches the codec used by send_message. Raises ValueError for unknown codecs.
+        Received lines are decoded in whichever format they arrive, so only
+        the sending side changes.
+        """
+        self.codec = get_codec(name)
 
     def receive(self):
         """
@@ -65,6 +124,46 @@ class Postman():
             raise ValueError("Channel is not open.  Must call open_channel() first.")
         return self._receive()
 
+    def receive_many(self):
+        """
+        Receives every complete message that is available, oldest first.
+        Returns an empty list if there is none. Never waits for more data.
+        """
+        if not self.is_open:
+            raise ValueError("Channel is not open.  Must call open_channel() first.")
+        return self._receive_many()
+
+    @property
+    def bad_frames(self):
+        """Number of COBS frames dropped for a bad CRC or encoding."""
+        return self._frame_decoder.bad_frames if self._frame_decoder else 0
+
+    # Helpers for byte stream channels
+
+    def _to_wire(self, value):
+        """Converts a value given to send() into the bytes to write, framing included."""
+        if self.framing == "cobs":
+            if isinstance(value, (bytes, bytearray)):
+                return encode_frame(value)
+            return encode_frame(str(value).encode('utf-8'))
+        message = str(value)
+        if not message.endswith('\n'):
+            message += '\n'
+        return message.encode('utf-8')
+
+    def _receive_frame(self):
+        """
+        Returns the data of the next verified COBS frame as bytes, or "" if no
+        complete frame has arrived. Reads only what is already waiting, so it never blocks.
+        """
+        if not self._frames:
+            waiting = self.channel.in_waiting
+            if waiting:
+                self._frames.extend(self._frame_decoder.feed(self.channel.read(waiting)))
+        if self._frames:
+            return self._frames.pop(0)
+        return ""
+
     # Implementation specific
 
     def _open_channel(self):
@@ -79,9 +178,18 @@ class Postman():
         """implementation to send"""
         raise NotImplementedError("Implementation specific send not implemented")
 
+    def _write(self, data):
+        """implementation to write already framed bytes (used by flush)"""
+        raise NotImplementedError("Implementation specific write not implemented")
+
     def _receive(self):
         """implementation to receive"""
         raise NotImplementedError("Implementation specific receive not implemented")
+
+    def _receive_many(self):
+        """implementation to receive everything available; by default at most one receive()"""
+        value = self._receive()
+        return [value] if value else []
     
 #type: ignore
 
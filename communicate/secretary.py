@@ -22,7 +22,7 @@ class SecretaryStateMachine(StateMachine):
 
     def __init__(self, inbox, outbox, subsystem_router, filer=None, postman = None, name = "secretary"):
         """Initializes the SecretaryStateMachine."""
-        super().__init__(init_state='Monitoring', name=name)  # set the name for the logging
+        super().__init__(name=name, config={}, init_state='Monitoring')  # set the name for the logging
 
         self.inbox = inbox
         self.outbox = outbox
@@ -45,7 +45,7 @@ class Monitoring(State):
     def name(self):
         return 'Monitoring'
     
-    def enter(self, machine):
+    def enter(self, machine, context=None):
         machine.log.info("Monitoring for new tasks.")
 
     def update(self, machine):
@@ -58,7 +58,7 @@ class Monitoring(State):
             mail = machine.outbox.get()
             if mail:
                 # Issue 2 FIX: Serialize the message object before sending.
-                machine.postman.send(mail.serialize())
+                machine.postman.send_message(mail)
         else:
             message = machine.inbox.get()
             if message:
@@ -77,7 +77,7 @@ class Reading(State):
     def name(self):
         return 'Reading'
 
-    def enter(self, machine):
+    def enter(self, machine, context=None):
         message = machine.flags.get("current_message")
         if message:
             # Log the dictionary representation for better readability
@@ -137,7 +137,7 @@ class Filing(State):
     def name(self):
         return 'Filing'
 
-    def enter(self, machine):
+    def enter(self, machine, context=None):
         machine.log.info("Entering Filing state.")
 
     def update(self, machine):
@@ -166,7 +166,7 @@ class Error(State):
     def name(self):
         return 'Error'
 
-    def enter(self, machine):
+    def enter(self, machine, context=None):
         machine.log.critical("An error has occurred in the Secretary.")
         error_msg = machine.flags.get("error_message", "No error message provided.")
         machine.log.critical(error_msg)
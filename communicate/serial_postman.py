@@ -1,13 +1,40 @@
 import serial
+import threading
 from .postman import Postman
 
 class SerialPostman(Postman):
     """
     Postman implementation for serial communication in standard Python.
+
+    With "coalesce" enabled, sends are buffered and written together at most
+    "max_latency" seconds (default 0.005) after the first one, or sooner if
+    flush() is called or "coalesce_limit" bytes are waiting. Sending is thread safe.
     """
 
+    def __init__(self, params: dict):
+        super().__init__(params)
+        self.max_latency = params.get("max_latency", 0.005)
+        self._send_lock = threading.RLock()
+        self._flush_timer = None
+
+    def send(self, value):
+        with self._send_lock:
+            super().send(value)
+            if self._outbound and self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.max_latency, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        with self._send_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            super().flush()
+
     def _open_channel(self):
         """Opens the serial port."""
+        self._carry = b""  # Partial line left over from receive_many()
         try:
             port = self.params.get("port")
             baudrate = self.params.get("baudrate", 115200)  # Default baudrate
@@ -23,16 +50,43 @@ class SerialPostman(Postman):
 
     def _send(self, value):
         """Sends data over the serial port."""
-        message = str(value)
-        if not message.endswith('\n'):
-            message += '\n'
-        # Assuming you want to send a string, encode it to bytes
-        data = message.encode('utf-8')  # Ensure the data is encoded as bytes
+        self.channel.write(self._to_wire(value))
+
+    def _write(self, data):
+        """Writes framed bytes over the serial port."""
         self.channel.write(data)
 
     def _receive(self):
         """Receives data from the serial port."""
+        if self.framing == "cobs":
+            return self._receive_frame()
+        # Lines already split off by receive_many() come first
+        if self._frames:
+            return self._frames.pop(0)
         # Read a line of data (terminated by newline character)
         data = self.channel.readline()
+        if self._carry:
+            data = self._carry + data
+            self._carry = b""
         # Decode the bytes to a string, stripping any trailing whitespace
-        return data.decode('utf-8').strip()
\ No newline at end of file
+        return data.decode('utf-8').strip()
+
+    def _receive_many(self):
+        """
+        Reads everything waiting on the port in one call and splits it into
+        complete lines (or frames). A trailing partial line is carried over.
+        """
+        waiting = self.channel.in_waiting
+        data = self.channel.read(waiting) if waiting else b""
+        received, self._frames = self._frames, []
+        if self.framing == "cobs":
+            if data:
+                received += self._frame_decoder.feed(data)
+            return received
+        if data:
+            *lines, self._carry = (self._carry + data).split(b"\n")
+            for line in lines:
+                line = line.decode('utf-8', errors='replace').strip()
+                if line:
+                    received.append(line)
+        return received
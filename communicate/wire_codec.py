@@ -0,0 +1,287 @@
+# communicate/wire_codec.py
+#type: ignore
+"""
+Wire codecs turn a Message into one line of text for a Postman and back.
+
+"json"   - the original format, Message.serialize(). Every device understands it.
+"packed" - a MessagePack-compatible binary form of the message, base64 encoded
+           on a line that starts with PACKED_MARKER. The envelope is the array
+           [status, subsystem_name, timestamp, meta, payload]: the status is an
+           index into STATUS_CODES, and dictionary keys listed in KEY_TAGS
+           are sent as their one-byte index instead of a string. On a link
+           with "cobs" framing (see framing.py) the packed bytes are sent
+           as the frame itself, without base64.
+
+Receivers accept both formats at any time (decode_message looks at the first
+character of the line), so a sender can switch codecs without a handshake.
+Which codec a host uses for a device is agreed through get_info / set_codec.
+"""
+import json
+import struct
+import binascii
+from shared_lib.messages import Message
+
+PACKED_MARKER = "~"
+# First byte of every raw packed message: a MessagePack array of 5 elements
+PACKED_TAG = b"\x95"
+
+# Order is part of the wire format. Only ever append.
+STATUS_CODES = ("DEBUG", "TELEMETRY", "INFO", "INSTRUCTION", "SUCCESS", "PROBLEM", "WARNING", "DATA_RESPONSE")
+_STATUS_INDEX = {status: i for i, status in enumerate(STATUS_CODES)}
+
+# Dictionary keys common enough to send as a single byte (their index here).
+# JSON only has string keys, so an integer key on the wire is always a tag;
+# other keys are sent as the string JSON would turn them into.
+# Order is part of the wire format. Only ever append (at most 128 entries).
+KEY_TAGS = (
+    # meta
+    "id", "seq", "origin",
+    # payload structure (messaging.md section 4)
+    "metadata", "data", "data_type", "message", "exception", "detail", "func", "args",
+    # colorimeter channels
+    "violet", "indigo", "blue", "cyan", "green", "yellow", "orange", "red", "clear", "nir",
+    # flow control meta
+    "credit", "rx",
+)
+_KEY_INDEX = {key: i for i, key in enumerate(KEY_TAGS)}
+
+
+# --- MessagePack subset: nil, bool, int, float, str, array, map ---
+
+def _pack(obj, buf):
+    if obj is None:
+        buf.append(0xc0)
+    elif obj is True:
+        buf.append(0xc3)
+    elif obj is False:
+        buf.append(0xc2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            buf.append(obj)
+        elif -32 <= obj < 0:
+            buf.append(obj & 0xff)
+        elif 0 <= obj <= 0xffff:
+            buf.extend(struct.pack(">BH", 0xcd, obj))
+        elif 0 <= obj <= 0xffffffff:
+            buf.extend(struct.pack(">BI", 0xce, obj))
+        elif -0x8000 <= obj < 0:
+            buf.extend(struct.pack(">Bh", 0xd1, obj))
+        elif -0x80000000 <= obj < 0:
+            buf.extend(struct.pack(">Bi", 0xd2, obj))
+        elif obj < 0:
+            buf.extend(struct.pack(">Bq", 0xd3, obj))
+        else:
+            # Raises struct.error beyond 64 bits; the codec then falls back to JSON
+            buf.extend(struct.pack(">BQ", 0xcf, obj))
+    elif isinstance(obj, float):
+        buf.extend(struct.pack(">Bd", 0xcb, obj))
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n < 32:
+            buf.append(0xa0 | n)
+        elif n < 0x100:
+            buf.extend(struct.pack(">BB", 0xd9, n))
+        elif n < 0x10000:
+            buf.extend(struct.pack(">BH", 0xda, n))
+        else:
+            buf.extend(struct.pack(">BI", 0xdb, n))
+        buf.extend(data)
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            buf.append(0x90 | n)
+        elif n < 0x10000:
+            buf.extend(struct.pack(">BH", 0xdc, n))
+        else:
+            buf.extend(struct.pack(">BI", 0xdd, n))
+        for item in obj:
+            _pack(item, buf)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            buf.append(0x80 | n)
+        elif n < 0x10000:
+            buf.extend(struct.pack(">BH", 0xde, n))
+        else:
+            buf.extend(struct.pack(">BI", 0xdf, n))
+        for key, value in obj.items():
+            if not isinstance(key, str):
+                key = json.dumps(key)
+            _pack(_KEY_INDEX.get(key, key), buf)
+            _pack(value, buf)
+    else:
+        raise TypeError("Cannot pack type " + type(obj).__name__)
+
+# Fixed-size formats: code -> (struct format, size)
+_FIXED = {
+    0xca: (">f", 4), 0xcb: (">d", 8),
+    0xcc: (">B", 1), 0xcd: (">H", 2), 0xce: (">I", 4), 0xcf: (">Q", 8),
+    0xd0: (">b", 1), 0xd1: (">h", 2), 0xd2: (">i", 4), 0xd3: (">q", 8),
+}
+
+def _unpack(data, pos):
+    """Decodes one object starting at data[pos]. Returns (object, next position)."""
+    code = data[pos]
+    pos += 1
+    if code < 0x80:
+        return code, pos
+    if code >= 0xe0:
+        return code - 0x100, pos
+    if 0xa0 <= code <= 0xbf:
+        n = code & 0x1f
+        return str(data[pos:pos + n], "utf-8"), pos + n
+    if 0x90 <= code <= 0x9f:
+        return _unpack_array(data, pos, code & 0x0f)
+    if 0x80 <= code <= 0x8f:
+        return _unpack_map(data, pos, code & 0x0f)
+    if code == 0xc0:
+        return None, pos
+    if code == 0xc2:
+        return False, pos
+    if code == 0xc3:
+        return True, pos
+    if code in _FIXED:
+        fmt, size = _FIXED[code]
+        return struct.unpack_from(fmt, data, pos)[0], pos + size
+    if code == 0xd9:
+        n = data[pos]
+        pos += 1
+        return str(data[pos:pos + n], "utf-8"), pos + n
+    if code == 0xda:
+        n = struct.unpack_from(">H", data, pos)[0]
+        pos += 2
+        return str(data[pos:pos + n], "utf-8"), pos + n
+    if code == 0xdb:
+        n = struct.unpack_from(">I", data, pos)[0]
+        pos += 4
+        return str(data[pos:pos + n], "utf-8"), pos + n
+    if code == 0xdc:
+        return _unpack_array(data, pos + 2, struct.unpack_from(">H", data, pos)[0])
+    if code == 0xdd:
+        return _unpack_array(data, pos + 4, struct.unpack_from(">I", data, pos)[0])
+    if code == 0xde:
+        return _unpack_map(data, pos + 2, struct.unpack_from(">H", data, pos)[0])
+    if code == 0xdf:
+        return _unpack_map(data, pos + 4, struct.unpack_from(">I", data, pos)[0])
+    raise ValueError("Unsupported packed type 0x%02x" % code)
+
+def _unpack_array(data, pos, n):
+    items = []
+    for _ in range(n):
+        item, pos = _unpack(data, pos)
+        items.append(item)
+    return items, pos
+
+def _unpack_map(data, pos, n):
+    result = {}
+    for _ in range(n):
+        key, pos = _unpack(data, pos)
+        if type(key) is int:
+            key = KEY_TAGS[key]
+        value, pos = _unpack(data, pos)
+        result[key] = value
+    return result, pos
+
+
+def pack_message(message):
+    """Returns the packed binary form of a Message."""
+    status = message.status
+    buf = bytearray()
+    _pack([
+        None if status is None else _STATUS_INDEX[status],
+        message.subsystem_name,
+        message.timestamp,
+        message.meta,
+        message.payload,
+    ], buf)
+    return bytes(buf)
+
+def unpack_message(data):
+    """Rebuilds a Message from pack_message() output. Raises ValueError if it is malformed."""
+    try:
+        envelope, end = _unpack(data, 0)
+        status, subsystem_name, timestamp, meta, payload = envelope
+        if status is not None:
+            status = STATUS_CODES[status]
+    except (IndexError, TypeError, KeyError, AttributeError, struct.error) as e:
+        raise ValueError("Malformed packed message: " + str(e))
+    if end != len(data):
+        raise ValueError("Malformed packed message: trailing bytes")
+    return Message.from_dict({
+        "subsystem_name": subsystem_name,
+        "status": status,
+        "meta": meta,
+        "payload": payload,
+        "timestamp": timestamp,
+    })
+
+
+class JsonCodec:
+    """The original one-JSON-object-per-line format."""
+    name = "json"
+
+    def encode(self, message):
+        return message.serialize()
+
+    def encode_binary(self, message):
+        return message.serialize().encode("utf-8")
+
+    def decode(self, line):
+        return Message.from_json(line)
+
+class PackedCodec:
+    """
+    Packed binary messages carried as a base64 line behind PACKED_MARKER.
+    Messages the packed form cannot hold (integers beyond 64 bits) are sent as
+    JSON instead, which every receiver decodes as well.
+    """
+    name = "packed"
+
+    def encode(self, message):
+        try:
+            data = pack_message(message)
+        except (struct.error, OverflowError):
+            return message.serialize()
+        return PACKED_MARKER + binascii.b2a_base64(data).decode().strip()
+
+    def encode_binary(self, message):
+        try:
+            return pack_message(message)
+        except (struct.error, OverflowError):
+            return message.serialize().encode("utf-8")
+
+    def decode(self, line):
+        try:
+            data = binascii.a2b_base64(line[len(PACKED_MARKER):])
+        except Exception as e:
+            raise ValueError("Invalid base64 in packed message: " + str(e))
+        return unpack_message(data)
+
+CODECS = {
+    "packed": PackedCodec(),
+    "json": JsonCodec(),
+}
+# Advertised in get_info, most compact first
+CODEC_NAMES = ("packed", "json")
+
+def get_codec(name):
+    """Returns the codec registered under name. Raises ValueError for unknown names."""
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError("Unknown codec '" + str(name) + "'. Supported: " + ", ".join(CODEC_NAMES))
+    return codec
+
+def decode_message(line):
+    """
+    Decodes a received line or frame in whichever format it was sent.
+    Frames from a binary framing arrive as bytes and may hold a raw packed message.
+    Raises ValueError if it is not a message.
+    """
+    if isinstance(line, (bytes, bytearray)):
+        if line[:1] == PACKED_TAG:
+            return unpack_message(line)
+        line = str(line, "utf-8")
+    if line.startswith(PACKED_MARKER):
+        return CODECS["packed"].decode(line)
+    return Message.from_json(line)
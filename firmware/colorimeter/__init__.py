@@ -61,7 +61,7 @@ def send_telemetry(machine):
                 }
             }
         )
-        machine.postman.send(telemetry_message.serialize())
+        machine.postman.send_message(telemetry_message)
     except Exception as e:
         machine.log.error(f"Failed to send telemetry: {e}")
 
@@ -85,9 +85,10 @@ machine = StateMachine(
     status_callback=build_status
 )
 
-postman = CircuitPythonPostman(params={"protocol": "serial_cp"})
+postman = CircuitPythonPostman(params={"protocol": "serial_cp", "framing": "line"})
 postman.open_channel()
 machine.postman = postman
+postman.meta_source = machine.flow_meta  # Advertise inbox credit to the host
 
 # --- Add States ---
 machine.add_state(states.Initialize())
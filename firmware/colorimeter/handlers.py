@@ -2,7 +2,7 @@
 # REFACTORED: This file updates all message payloads to comply with messaging.md
 # and introduces a 'measure' command to demonstrate the StateSequencer.
 # type: ignore
-from shared_lib.messages import Message, send_problem, send_success
+from shared_lib.messages import Message, send_problem, send_success, reply_origin
 from shared_lib.error_handling import try_wrapper
 
 # This dictionary maps the user-friendly channel names to the actual
@@ -41,9 +41,10 @@ def handle_read_all(machine, payload):
                 "units": "counts"
             },
             "data": readings_dict
-        }
+        },
+        origin=reply_origin(machine)
     )
-    machine.postman.send(response.serialize())
+    machine.postman.send_message(response)
 
 @try_wrapper
 def handle_get_settings(machine, payload):
@@ -63,9 +64,10 @@ def handle_get_settings(machine, payload):
         payload={
             "metadata": { "data_type": "sensor_settings" },
             "data": settings_data
-        }
+        },
+        origin=reply_origin(machine)
     )
-    machine.postman.send(response.serialize())
+    machine.postman.send_message(response)
  
 @try_wrapper
 def handle_set_settings(machine, payload):
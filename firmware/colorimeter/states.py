@@ -89,9 +89,10 @@ class TurnOffLED(State):
                 payload={
                     "metadata": { "data_type": "color_spectrum", "units": "counts" },
                     "data": readings_dict
-                }
+                },
+                origin=machine.sequencer.origin
             )
-            machine.postman.send(response.serialize())
+            machine.postman.send_message(response)
         else:
             from shared_lib.messages import send_problem
             send_problem(machine, "Measurement failed: could not retrieve sensor data from context.")
@@ -1,6 +1,7 @@
 # shared_lib/command_library.py
 #type: ignore
-from shared_lib.messages import Message, send_problem, send_success
+from shared_lib.messages import Message, send_problem, send_success, reply_origin
+from communicate.wire_codec import CODEC_NAMES
 import time
 
 # Helper function, not a class, to register common commands.
@@ -31,6 +32,13 @@ def register_common_commands(machine):
         "description": "Retrieves status information.",
         "args": []
     })
+    machine.add_command("set_codec", handle_set_codec, {
+        "description": "Selects the wire format for messages sent by the device. Supported codecs are listed in get_info.",
+        "args": [
+            {"name": "codec", "type": "str", "description": "One of the names in get_info metadata 'codecs'"}
+        ],
+        "ai_enabled": False
+    })
 
 # --- Handler functions are now standalone ---
 def handle_help(machine, payload):
@@ -44,9 +52,10 @@ def handle_help(machine, payload):
                 "data_type": "dict"
             },
             "data": machine.supported_commands # Get it directly from the machine
-        }
+        },
+        origin=reply_origin(machine)
     )
-    machine.postman.send(response.serialize())
+    machine.postman.send_message(response)
 
 def handle_ping(machine, payload):
     """Responds with a simple 'pong'."""
@@ -108,6 +117,11 @@ def handle_get_info(machine, payload):
                 "firmware_name": machine.name,
                 "firmware_version": machine.version,
                 "current_state": machine.state.name,
+                "codecs": list(CODEC_NAMES),
+                "codec": machine.postman.codec.name,
+                "framing": machine.postman.framing,
+                "queued_instructions": machine.inbox.current_size,
+                "queue_size": machine.inbox.max_size,
                 "data_type": "dict"
             },
             
@@ -120,9 +134,21 @@ def handle_get_info(machine, payload):
         response = Message.create_message(
             subsystem_name=machine.name,
             status="DATA_RESPONSE",
-            payload=info_payload
+            payload=info_payload,
+            origin=reply_origin(machine)
         )
-        machine.postman.send(response.serialize())
+        machine.postman.send_message(response)
     except Exception as e:
         send_problem(machine, "Failed to retrieve device info", str(e))
 
+def handle_set_codec(machine, payload):
+    """
+    Switches the codec the device uses to send messages. The SUCCESS reply is
+    still sent in the old codec; everything after it uses the new one.
+    """
+    codec = payload.get("args", {}).get("codec")
+    if codec not in CODEC_NAMES:
+        send_problem(machine, f"Unsupported codec '{codec}'. Supported: {list(CODEC_NAMES)}")
+        return
+    send_success(machine, f"Codec set to {codec}")
+    machine.postman.set_codec(codec)
@@ -4,21 +4,37 @@
 import time
 import digitalio
 from shared_lib.statemachine import State
-from shared_lib.messages import Message
+from shared_lib.messages import Message, send_problem
+from communicate.wire_codec import decode_message
 
-def listen_for_instructions(machine):
+def receive_instructions(machine):
     """
-    A reusable helper function that checks for and dispatches incoming
-    INSTRUCTION messages. Any state can call this.
+    Moves every INSTRUCTION waiting on the postman into machine.inbox without
+    running it. States that cannot act on instructions yet can call this to keep
+    the wire drained and the host's credit accurate. An instruction that arrives
+    when the inbox is full is answered with a PROBLEM rather than lost.
     """
-    raw_message = machine.postman.receive()
-    if raw_message:
+    for raw_message in machine.postman.receive_many():
         try:
-            message = Message.from_json(raw_message)
-            if message.status == "INSTRUCTION":
-                machine.handle_instruction(message.payload)
+            message = decode_message(raw_message)
         except Exception as e:
             machine.log.error(f"Could not process message: '{raw_message}'. Error: {e}")
+            continue
+        if message.status != "INSTRUCTION":
+            continue
+        machine.instructions_received += 1
+        if machine.inbox.is_full():
+            send_problem(machine, "Inbox full. Instruction dropped.", origin=message.meta.get("id"))
+        else:
+            machine.inbox.store(message)
+
+def listen_for_instructions(machine):
+    """
+    A reusable helper function that checks for and dispatches incoming
+    INSTRUCTION messages. Any state can call this.
+    """
+    receive_instructions(machine)
+    machine.handle_next_instruction()
 
 class GenericIdle(State):
     """
@@ -88,7 +104,7 @@ class GenericErrorWithButton(State):
     def name(self):
         return 'Error'
     
-    def __init__(self, reset_pin=None, reset_state_name='Idle'):
+    def __init__(self, reset_pin=None, reset_state_name='Idle', on_enter=None):
         """
         Initializes the GenericError state.
 
@@ -98,10 +114,13 @@ class GenericErrorWithButton(State):
                 If None, the error state is permanent until a power cycle.
             reset_state_name (str, optional): The name of the state to transition
                 to when the reset button is pressed. Defaults to 'Idle'.
+            on_enter (callable, optional): Called with the machine on entry, for
+                device state an error makes untrustworthy (e.g. the homed position).
         """
         super().__init__()
         self._reset_pin_config = reset_pin
         self._reset_state_name = reset_state_name
+        self._on_enter = on_enter
         self._reset_button = None # This will hold the DigitalInOut object
 
     # <<< FIX IS HERE: Method signature updated to accept 'context'.
@@ -112,6 +131,8 @@ class GenericErrorWithButton(State):
         machine.log.critical(f"ENTERING ERROR STATE: {error_msg}")
         # Abort any sequence
         machine.sequencer.abort("Entering error state")
+        if self._on_enter:
+            self._on_enter(machine)
         # --- Hardware Setup ---
         if self._reset_pin_config:
             try:
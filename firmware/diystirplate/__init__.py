@@ -23,7 +23,7 @@ def send_telemetry(machine):
         status = "TELEMETRY",
         payload={"value": 1}
     )
-    machine.postman.send(telemetry_message.serialize())
+    machine.postman.send_message(telemetry_message)
 
 
 # 1. Create the state machine instance for the subsystem
@@ -35,9 +35,10 @@ machine = StateMachine(init_state='Initialize', name='STIRPLATE')
 # --> nothing to change here.
 machine.config = DIYSTIRPLATE_CONFIG
 machine.config['firmware_version'] = __version__
-postman = CircuitPythonPostman(params={"protocol": "serial_cp"})
+postman = CircuitPythonPostman(params={"protocol": "serial_cp", "framing": "line"})
 postman.open_channel()
 machine.postman = postman
+postman.meta_source = machine.flow_meta  # Advertise inbox credit to the host
 
 # 3. Add all the defined states to the machine
 # --> update this list with the correct states for your instrument
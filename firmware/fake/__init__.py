@@ -24,7 +24,7 @@ def send_fake_device_telemetry(machine):
         status="TELEMETRY",
         payload={"analog_value": analog_value}
     )
-    machine.postman.send(telemetry_message.serialize())
+    machine.postman.send_message(telemetry_message)
 
 # 1. Create the state machine instance
 machine = StateMachine(init_state='Initialize', name='FAKE')
@@ -32,9 +32,10 @@ machine = StateMachine(init_state='Initialize', name='FAKE')
 # 2. Attach Configuration and the Postman
 machine.config = FAKE_CONFIG
 machine.config['firmware_version'] = __version__
-postman = CircuitPythonPostpostman = CircuitPythonPostman(params={"protocol": "serial_cp"})
+postman = CircuitPythonPostpostman = CircuitPythonPostman(params={"protocol": "serial_cp", "framing": "line"})
 postman.open_channel()
 machine.postman = postman
+postman.meta_source = machine.flow_meta  # Advertise inbox credit to the host
 
 # 3. Add all the defined states
 machine.add_state(states.Initialize())
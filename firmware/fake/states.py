@@ -6,6 +6,7 @@ import digitalio
 import analogio
 from shared_lib.statemachine import State
 from shared_lib.messages import Message
+from firmware.common.common_states import receive_instructions
 
 class Initialize(State):
     """
@@ -66,6 +67,7 @@ class Blinking(State):
         Called repeatedly. Checks the timer and toggles the LED or returns
         to Idle when complete.
         """
+        receive_instructions(machine) # Queue instructions that arrive while blinking
         # This check will now work correctly.
         if time.monotonic() >= self.next_toggle_time:
             # Toggle the LED
@@ -84,9 +86,10 @@ class Blinking(State):
                 response = Message.create_message(
                     subsystem_name=machine.name,
                     status="SUCCESS",
-                    payload={"detail": f"Completed {machine.flags.get('blink_count', 0)} blinks."}
+                    payload={"detail": f"Completed {machine.flags.get('blink_count', 0)} blinks."},
+                    origin=machine.current_origin
                 )
-                machine.postman.send(response.serialize())
+                machine.postman.send_message(response)
                 
                 # Clean up and transition back to Idle
                 machine.flags['blink_count'] = 0
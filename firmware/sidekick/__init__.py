@@ -13,6 +13,8 @@ from firmware.common.command_library import register_common_commands
 from . import states
 from . import handlers
 from . import kinematics
+from . import config
+from . import well_table
 
 # ============================================================================
 # 1. INSTRUMENT CONFIGURATION
@@ -20,62 +22,17 @@ from . import kinematics
 SUBSYSTEM_NAME = "SIDEKICK"
 SUBSYSTEM_VERSION = "1.1.0" 
 SUBSYSTEM_INIT_STATE = "Initialize"
-SUBSYSTEM_CONFIG = {
-    "pins": {
-        # M1 is the top motor, controls A1 (arm with arrow)
-        "motor1_step": board.GP1, "motor1_dir": board.GP0, "motor1_enable": board.GP7,
-        "motor2_step": board.GP10, "motor2_dir": board.GP9, "motor2_enable": board.GP16,
-        "motor1_m0": board.GP6, "motor1_m1": board.GP5,
-        "motor2_m0": board.GP15, "motor2_m1": board.GP14,
-        "endstop_m1": board.GP18, "endstop_m2": board.GP19,
-        "user_button": board.GP20,
-        "pump1": board.GP27, "pump2": board.GP26, "pump3": board.GP22, "pump4": board.GP21,
-    },
-    "motor_settings": {
-        "step_angle_degrees": 0.9, "microsteps": 8, "max_speed_sps": 200,
-    },
-    "pump_timings": {
-        "aspirate_time": 0.25, "dispense_time": 0.25, "increment_ul": 10.0,
-    },
-    "kinematics": {
-        "L1": 7.0, "L2": 3.0, "L3": 10, "Ln": 0.5,
-    },
-    "safe_limits": {
-        # These are placeholder values and need to be updated.
-        "m1_max_steps": 1600, "m2_max_steps": 1600,
-    },
-    "homing_settings": {
-        # The number of steps for M1 to back off endstop 2.
-        "joint_backoff_steps": 20,
-        # Set the position of the arm after homing
-        "park_move_x": 10.0, # cm
-        "park_move_y": 7.0, # cm
-    },
-        "operational_limits_degrees": {
-        "m1_min": 0.0,
-        "m1_max": 160.0,
-        "m2_min": 80.0,
-        "m2_max": 180.0
-    },
-    "plate_geometry": {
-        "well_pitch_cm": 0.9,
-        "rows": "ABCDEFGH",
-        "columns": 12
-    },
-    "A1_offset": {
-        "dx": 7.59, #7.24, 
-        "dy": -5.3, #-5.57
-    },
-    "step_correction":{
-        "m1e": -4,
-        "m2e": 29,
-    },
-    # End effector orientation may not be the same as sidekick
-    "pump_offsets": {
-        "p1": {"dx": 1.09, "dy": -0.6}, "p2": {"dx": 1.09, "dy": -0.2},
-        "p3": {"dx": 1.09, "dy": 0.2}, "p4": {"dx": 1.09, "dy": 0.6},
-    },
-   
+# Geometry, motion and plate settings are shared with host tools (see config.py)
+SUBSYSTEM_CONFIG = config.SUBSYSTEM_CONFIG
+SUBSYSTEM_CONFIG["pins"] = {
+    # M1 is the top motor, controls A1 (arm with arrow)
+    "motor1_step": board.GP1, "motor1_dir": board.GP0, "motor1_enable": board.GP7,
+    "motor2_step": board.GP10, "motor2_dir": board.GP9, "motor2_enable": board.GP16,
+    "motor1_m0": board.GP6, "motor1_m1": board.GP5,
+    "motor2_m0": board.GP15, "motor2_m1": board.GP14,
+    "endstop_m1": board.GP18, "endstop_m2": board.GP19,
+    "user_button": board.GP20,
+    "pump1": board.GP27, "pump2": board.GP26, "pump3": board.GP22, "pump4": board.GP21,
 }
 
 # ============================================================================
@@ -90,17 +47,19 @@ def send_telemetry(machine):
     theta1, theta2 = kinematics.steps_to_degrees(machine, m1_steps, m2_steps)
     x_pos, y_pos = kinematics.forward_kinematics(machine, theta1, theta2)
 
+    data = {
+        "x(world)": x_pos,
+        "y(world)": y_pos
+    }
+    data.update(states.position_report(machine))
     telemetry_message = Message(
         subsystem_name=machine.name,
         status="TELEMETRY",
         payload={
-            "data": {
-                "x(world)": x_pos,
-                "y(world)": y_pos
-            }
+            "data": data
         }
     )
-    machine.postman.send(telemetry_message.serialize())
+    machine.postman.send_message(telemetry_message)
 
 def build_status(machine):
     """
@@ -119,6 +78,7 @@ def build_status(machine):
     # 3. Return the complete, detailed status dictionary
     return {
         "is_homed": machine.flags.get('is_homed', False),
+        "homing_generation": machine.flags.get('homing_generation', 0),
         "raw_motor_steps": {
             "m1": m1_steps,
             "m2": m2_steps
@@ -143,9 +103,14 @@ machine = StateMachine(
 )
 
 # --- Attach Communication Channel ---
-postman = CircuitPythonPostman(params={"protocol": "serial_cp"})
+postman = CircuitPythonPostman(params={"protocol": "serial_cp", "framing": "line"})
 postman.open_channel()
 machine.postman = postman
+postman.meta_source = machine.flow_meta  # Advertise inbox credit to the host
+
+# --- Load the host-generated well -> steps table (None falls back to IK) ---
+machine.well_table = well_table.load_well_table(
+    machine, __file__.rsplit("/", 1)[0] + "/" + well_table.WELL_TABLE_FILE)
 
 # --- Add States ---
 machine.add_state(states.Initialize())
@@ -153,7 +118,10 @@ machine.add_state(GenericIdle(telemetry_callback=send_telemetry))
 machine.add_state(states.Homing())
 machine.add_state(states.Moving())
 machine.add_state(states.Dispensing())
-machine.add_state(GenericErrorWithButton(reset_pin=machine.config['pins']['user_button'], reset_state_name='Idle'))
+machine.add_state(states.ReportProgress())
+machine.add_state(states.Holding())
+machine.add_state(GenericErrorWithButton(reset_pin=machine.config['pins']['user_button'], reset_state_name='Idle',
+                                         on_enter=lambda m: states.invalidate_homing(m, "entered Error state")))
 
 # --- Define Command Interface ---
 # The common commands are registered here, but their `ai_enabled` flag is set to False by default.
@@ -165,6 +133,15 @@ machine.add_command("home", handlers.handle_home, {
     "ai_enabled": True,
     "effects": ["arm is now in a known, safe park position", "is_homed flag is now true"]
 })
+machine.add_command("home_if_needed", handlers.handle_home_if_needed, {
+    "description": "Homes only if the arm's position is not trusted (after a power cycle, fault or error); otherwise returns at once.",
+    "args": [
+        {"name": "generation", "type": "int", "description": "Optional: the homing_generation last seen; homes again if the device has re-homed since.", "default": None}
+    ],
+    "ai_enabled": True,
+    "effects": ["arm position is known", "is_homed flag is now true"],
+    "usage_notes": "Use at the start of a plan instead of 'home'. The arm is NOT moved to the park position when homing is skipped."
+})
 machine.add_command("move_to", handlers.handle_move_to, {
     "description": "Moves the arm's center point to an absolute (x, y) coordinate.",
     "args": [
@@ -210,6 +187,14 @@ machine.add_command("steps", handlers.handle_steps, {
     ],
     "ai_enabled": False
 })
+machine.add_command("to_steps", handlers.handle_to_steps, {
+    "description": "Moves motors to absolute step positions. FOR TESTING AND CALIBRATION.",
+    "args": [
+        {"name": "m1", "type": "int", "description": "Absolute steps for motor 1"},
+        {"name": "m2", "type": "int", "description": "Absolute steps for motor 2"}
+    ],
+    "ai_enabled": False
+})
 machine.add_command("to_well", handlers.handle_to_well, {
     "description": "Moves to a specified well on a 96-well plate",
     "args": [
@@ -221,6 +206,34 @@ machine.add_command("to_well", handlers.handle_to_well, {
     "usage_notes": "To prepare for a 'dispense' action, you MUST use the 'pump' argument in this command. To prepare for a 'measure' action, the 'pump' argument should be omitted to center the arm."
 })
 
+machine.add_command("to_wells", handlers.handle_to_wells, {
+    "description": "Visits an ordered list of wells in one sequence, optionally dispensing at each. Sends a progress TELEMETRY message after every well.",
+    "args": [
+        {"name": "wells", "type": "list", "description": "Wells in visit order. Each entry is a well string (e.g., 'B6') or an object {'well', 'pump', 'vol'}."},
+        {"name": "pump", "type": "str|int", "description": "Optional: default pump nozzle for entries that do not name one.", "default": None},
+        {"name": "vol", "type": "float", "description": "Optional: default volume (uL) to dispense at each well. Omit to only move.", "default": None}
+    ],
+    "ai_enabled": True,
+    "effects": ["arm visits each well in order", "liquid is added to every well that has a volume"],
+    "usage_notes": "Prefer this over repeated 'to_well'/'dispense' calls when the same operation is applied to many wells. The final SUCCESS arrives after the last well."
+})
+
+machine.add_command("scan", handlers.handle_scan, {
+    "description": "Visits a list of absolute motor step positions, holding at each until released. FOR CALIBRATION.",
+    "args": [
+        {"name": "points", "type": "list", "description": "[m1, m2] absolute step positions in visit order."},
+        {"name": "dwell", "type": "float", "description": "Optional: seconds to hold at each point. Omit to hold until 'scan_next'.", "default": None},
+        {"name": "timeout", "type": "float", "description": "Seconds to wait for 'scan_next' before aborting the scan.", "default": 60.0}
+    ],
+    "ai_enabled": False,
+    "usage_notes": "A 'scan_point' TELEMETRY message is sent on arrival at each point. SUCCESS is sent after the last point is released."
+})
+machine.add_command("scan_next", handlers.handle_scan_next, {
+    "description": "Releases the current scan point so the arm moves to the next one. Sends no reply.",
+    "args": [],
+    "ai_enabled": False
+})
+
 # Override common commands to ensure they are not used by the AI
 machine.supported_commands['help']['ai_enabled'] = False
 machine.supported_commands['ping']['ai_enabled'] = False
@@ -232,6 +245,7 @@ machine.add_flag('error_message', '')
 machine.add_flag('telemetry_interval', 60.0)
 # --- Public flags are available via get_info ---
 machine.add_flag('is_homed', False)
+machine.add_flag('homing_generation', 0) # Successful homings since boot
 # --- Positioning flags ---
 machine.add_flag('current_m1_steps', 0)
 machine.add_flag('current_m2_steps', 0)
@@ -0,0 +1,66 @@
+# firmware/sidekick/config.py
+# type: ignore
+"""
+Board-independent Sidekick configuration: geometry, motion and plate settings.
+Pin assignments live in __init__.py. Host tools (e.g. host/calibration/well_table.py)
+read this file, so it must not import CircuitPython modules.
+"""
+
+SUBSYSTEM_CONFIG = {
+    "motor_settings": {
+        "step_angle_degrees": 0.9, "microsteps": 8, "max_speed_sps": 200,
+        # Moving: trapezoid from start_speed_sps up to move_speed_sps (longer axis),
+        # and the most steps run in one loop when it falls behind
+        "move_speed_sps": 2000, "start_speed_sps": 200, "acceleration_sps2": 4000,
+        "max_steps_per_update": 8,
+        # Step pulses: "loop" toggles pins from the main loop; "pio" plays a
+        # hardware-timed pulse train on the RP2040 (needs adafruit_pioasm)
+        "pulse_backend": "loop",
+    },
+    "pump_timings": {
+        "aspirate_time": 0.25, "dispense_time": 0.25, "increment_ul": 10.0,
+    },
+    "kinematics": {
+        "L1": 7.0, "L2": 3.0, "L3": 10, "Ln": 0.5,
+    },
+    "safe_limits": {
+        # These are placeholder values and need to be updated.
+        "m1_max_steps": 1600, "m2_max_steps": 1600,
+    },
+    "homing_settings": {
+        # The number of steps for M1 to back off endstop 2.
+        "joint_backoff_steps": 20,
+        # Each endstop: fast seek, back off, then re-approach slowly for precision
+        "seek_speed_sps": 800,
+        "reapproach_backoff_steps": 40,
+        "reapproach_speed_sps": 100,
+        # Set the position of the arm after homing
+        "park_move_x": 10.0, # cm
+        "park_move_y": 7.0, # cm
+    },
+    "operational_limits_degrees": {
+        "m1_min": 0.0,
+        "m1_max": 160.0,
+        "m2_min": 80.0,
+        "m2_max": 180.0
+    },
+    "plate_geometry": {
+        "well_pitch_cm": 0.9,
+        "rows": "ABCDEFGH",
+        "columns": 12
+    },
+    "A1_offset": {
+        "dx": 7.59, #7.24, 
+        "dy": -5.3, #-5.57
+    },
+    "step_correction":{
+        "m1e": -4,
+        "m2e": 29,
+    },
+    # End effector orientation may not be the same as sidekick
+    "pump_offsets": {
+        "p1": {"dx": 1.09, "dy": -0.6}, "p2": {"dx": 1.09, "dy": -0.2},
+        "p3": {"dx": 1.09, "dy": 0.2}, "p4": {"dx": 1.09, "dy": 0.6},
+    },
+}
+
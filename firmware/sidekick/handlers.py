@@ -2,6 +2,8 @@
 # type: ignore
 from shared_lib.messages import Message, send_problem, send_success
 from . import kinematics
+from . import well_table
+from . import states
 import math
 from shared_lib.error_handling import try_wrapper
 import re
@@ -71,6 +73,19 @@ def parse_well_designation(machine, well_str: str):
     
     return (row_index, col_index)
 
+def well_to_world(machine, well_str: str):
+    """
+    Returns the world (x, y) coordinates in cm of a well's center, using the
+    plate geometry and fixed A1 offset. Returns None if the designation is invalid.
+    """
+    parsed_indices = parse_well_designation(machine, well_str)
+    if parsed_indices is None:
+        return None
+    row_idx, col_idx = parsed_indices
+    pitch = machine.config['plate_geometry']['well_pitch_cm']
+    a1_offset = machine.config.get('A1_offset', {'dx': 0, 'dy': 0})
+    return (row_idx * pitch) + a1_offset['dx'], (col_idx * pitch) + a1_offset['dy']
+
 def calculate_dispense_cycles(machine, volume, pump):
     """
     Calculates the number of cycles to perform to dispense liquid
@@ -97,40 +112,23 @@ def calculate_angles(machine, pump_key, target_x, target_y):
     """
 
     # Determine if centering the end effector or a pump
-    pump = None
-    if pump_key is not None and pump_key != 0 and pump_key != "0":
-        # A number (1,2,3,4) or pump string ("p1", "p2", "p3", "p4") is valid
-        pump = f"p{pump_key}" if isinstance(pump_key,int) else str(pump_key).lower()
+    # A number (1,2,3,4) or pump string ("p1", "p2", "p3", "p4") is valid
+    pump = well_table.pump_name(pump_key)
 
     if pump:
         # If offsets cannot be found, then bail since pump_key was not valid
         pump_offset = machine.config['pump_offsets'].get(pump)
-        dx = pump_offset['dx']
-        dy = pump_offset['dy']
         if pump_offset is None:
             send_problem(machine, f"Invalid pump specified: '{pump_key}'.")
             return None
         
         # Pump Offset logic: Guess and Refine
         machine.log.info(f"Starting 2-pass move for pump '{pump}'...")
-        machine.log.info(f" -> Estimating orientation for center ({target_x}, {target_y}).")
-        guessed_angles = kinematics.inverse_kinematics(machine, target_x, target_y)
-        if guessed_angles is None:
+        center_target = kinematics.pump_center_target(machine, pump_offset, target_x, target_y)
+        if center_target is None:
             send_problem(machine, "Target position is likely unreachable (IK Pass 1 failed).")
             return None
-        
-        _theta1_guess, theta2_guess = guessed_angles
-        machine.log.info(f" -> Estimated orientation angle (theta2) = {theta2_guess:.2f} degrees.")
-
-        orientation_rad = math.radians(theta2_guess)
-        cos_theta = math.cos(orientation_rad)
-        sin_theta = math.sin(orientation_rad)
-
-        x_offset_rotated = dx * cos_theta - dy * sin_theta
-        y_offset_rotated = dx * sin_theta + dy * cos_theta
-
-        x_center_target = target_x + x_offset_rotated
-        y_center_target = target_y + y_offset_rotated
+        x_center_target, y_center_target = center_target
 
         machine.log.info(f" -> Corrected center target is ({x_center_target:.3f}, {y_center_target:.3f}).")
         machine.log.info(f"Solving final IK for corrected center target.")
@@ -156,6 +154,24 @@ def handle_home(machine, payload):
     machine.log.info("Home command received.")
     machine.go_to_state('Homing')
 
+@try_wrapper
+def handle_home_if_needed(machine, payload):
+    """
+    Homes only when the position is not trusted. It is trusted from a successful
+    homing until an endstop fault during a move, the Error state or a power
+    cycle (see states.invalidate_homing). The optional 'generation' arg is
+    the homing_generation the caller last saw; if the device has homed since, it
+    homes again. A skipped homing answers SUCCESS at once with the position.
+    """
+    generation = payload.get("args", {}).get("generation")
+    if machine.flags.get('is_homed') and (generation is None or generation == machine.flags.get('homing_generation')):
+        machine.log.info("Home requested, but the position is trusted. Skipping homing.")
+        data = states.position_report(machine)
+        data["homing_skipped"] = True
+        send_success(machine, "Position trusted; homing skipped.", data=data)
+        return
+    handle_home(machine, payload)
+
 @try_wrapper
 def handle_move_to(machine, payload):
     """
@@ -405,6 +421,34 @@ def handle_steps(machine, payload):
     }
     machine.sequencer.start(sequence, initial_context=context)
 
+@try_wrapper
+def handle_to_steps(machine, payload):
+    """
+    Handles the low-level 'to_steps' command: moves both motors to absolute step
+    positions. Unlike 'steps', the host does not need to know the current position.
+    """
+    if not check_homed(machine): return
+
+    # 1. Extract and Validate Arguments
+    args = payload.get("args", {})
+    try:
+        target_m1 = int(args["m1"])
+        target_m2 = int(args["m2"])
+    except (KeyError, ValueError, TypeError):
+        send_problem(machine, "Missing or invalid 'm1'/'m2'; both must be integers.")
+        return
+
+    machine.log.info(f"to_steps command accepted. Moving to absolute ({target_m1}, {target_m2}).")
+
+    # 2. Set Context and Start the Sequencer
+    sequence = [{"state": "Moving"}]
+    context = {
+        "name": "to_steps",
+        "target_m1_steps": target_m1,
+        "target_m2_steps": target_m2
+    }
+    machine.sequencer.start(sequence, initial_context=context)
+
 def handle_to_well(machine, payload):
     """
     Moves end effector to a specified well on a 96-well plate using a fixed A1 offset.
@@ -421,6 +465,17 @@ def handle_to_well(machine, payload):
         send_problem(machine, "Missing required 'well' argument.")
         return
 
+    # Precomputed steps from the well table skip parsing and IK entirely
+    table_steps = well_table.lookup_well_steps(machine.well_table, well_designation, pump_arg)
+    if table_steps is not None:
+        machine.log.info(f"Targeting '{well_designation}' from well table: {table_steps}")
+        machine.sequencer.start([{"state":"Moving"}], initial_context={
+            "name": "move_to",
+            "target_m1_steps": table_steps[0],
+            "target_m2_steps": table_steps[1]
+        })
+        return
+
     # 2. Parse well designation to grid indices
     parsed_indices = parse_well_designation(machine, well_designation)
     if parsed_indices is None:
@@ -536,3 +591,127 @@ def handle_to_well_with_pumps(machine, payload):
         }
 
     machine.sequencer.start(sequence, initial_context=context)
+
+def handle_scan(machine, payload):
+    """
+    Visits a list of absolute step positions in one sequence, holding at each one.
+    The host is told of every arrival by a 'scan_point' TELEMETRY message and
+    releases the hold with 'scan_next', or passes 'dwell' (s) to advance on a timer.
+    """
+    if not check_homed(machine):
+        return
+
+    # 1. Extract and Validate Arguments
+    args = payload.get("args", {})
+    points = args.get("points")
+    dwell = args.get("dwell")
+    timeout = args.get("timeout", 60.0)
+
+    if not isinstance(points, list) or not points:
+        send_problem(machine, "'points' must be a non-empty list of [m1, m2] step positions.")
+        return
+    try:
+        points = [(int(m1), int(m2)) for m1, m2 in points]
+        dwell = None if dwell is None else float(dwell)
+        timeout = float(timeout)
+    except (ValueError, TypeError):
+        send_problem(machine, "Invalid scan arguments; points must be [m1, m2] integer pairs and dwell/timeout numbers.")
+        return
+
+    # 2. Build one Moving + Holding pair per point
+    sequence = []
+    total = len(points)
+    for index, (m1, m2) in enumerate(points):
+        sequence.append({"state": "Moving", "context": {"target_m1_steps": m1, "target_m2_steps": m2}})
+        sequence.append({"state": "Holding", "context": {
+            "index": index,
+            "total": total,
+            "dwell": dwell,
+            "timeout": timeout
+        }})
+
+    # 3. Start the Sequencer
+    machine.log.info(f"Scan accepted: {total} points, dwell={dwell}.")
+    machine.sequencer.start(sequence, initial_context={"name": "scan"})
+
+def handle_scan_next(machine, payload):
+    """
+    Releases the current scan point. A scan's Holding state consumes this
+    instruction itself, so reaching the handler means no scan was holding.
+    No reply is sent; the next 'scan_point' TELEMETRY is the acknowledgement.
+    """
+    machine.log.warning("scan_next received, but no scan is holding. Ignored.")
+
+def handle_to_wells(machine, payload):
+    """
+    Visits an ordered list of wells in one sequence. Each entry is a well string
+    or a dict {"well", "pump", "vol"}; top-level 'pump' and 'vol' are the defaults.
+    Every entry is validated and solved before the arm moves. Each well becomes
+    Moving (+ Dispensing when a volume is given) followed by a progress report.
+    """
+    if not check_homed(machine):
+        return
+
+    # 1. Extract and Validate Arguments
+    args = payload.get("args", {})
+    wells = args.get("wells")
+    default_pump = args.get("pump")
+    default_vol = args.get("vol")
+
+    if not isinstance(wells, list) or not wells:
+        send_problem(machine, "'wells' must be a non-empty list.")
+        return
+
+    # 2. Expand every entry into steps; nothing runs unless all of them are valid
+    sequence = []
+    total = len(wells)
+    for index, entry in enumerate(wells):
+        if not isinstance(entry, dict):
+            entry = {"well": entry}
+        well_designation = entry.get("well")
+        pump_arg = entry.get("pump", default_pump)
+        vol = entry.get("vol", default_vol)
+        if vol is not None and pump_arg is None:
+            send_problem(machine, f"Missing 'pump' for '{well_designation}'; required when 'vol' is provided.")
+            return
+        pump = well_table.pump_name(pump_arg)
+        if vol is not None and pump not in machine.config['pump_offsets']:
+            # Also catches pump 0, which names the end effector center rather than a pump
+            valid_pumps = list(machine.config["pump_offsets"].keys())
+            send_problem(machine, f"Invalid pump specified for '{well_designation}': {pump_arg}. Choose from {valid_pumps}")
+            return
+
+        table_steps = well_table.lookup_well_steps(machine.well_table, well_designation, pump_arg)
+        if table_steps is not None:
+            target_m1_steps, target_m2_steps = table_steps
+        else:
+            target = well_to_world(machine, well_designation)
+            if target is None:
+                send_problem(machine, f"Invalid 'well' designation: '{well_designation}' (entry {index}).")
+                return
+            target_angles = calculate_angles(machine, pump_arg, target[0], target[1])
+            if target_angles is None:
+                send_problem(machine, f"Inverse kinematics failed for '{well_designation}'. Target may be unreachable.")
+                return
+            target_m1_steps, target_m2_steps = kinematics.degrees_to_steps(machine, *target_angles)
+
+        sequence.append({"state": "Moving", "label": well_designation, "context": {
+            "target_m1_steps": target_m1_steps,
+            "target_m2_steps": target_m2_steps
+        }})
+        if vol is not None:
+            cycles = calculate_dispense_cycles(machine, vol, pump)
+            if cycles <= 0: return # Error already sent by calc function
+            sequence.append({"state": "Dispensing", "label": well_designation, "context": {
+                "dispense_pump": pump,
+                "dispense_cycles": cycles
+            }})
+        sequence.append({"state": "ReportProgress", "context": {
+            "well": well_designation,
+            "index": index,
+            "total": total
+        }})
+
+    # 3. Start the Sequencer
+    machine.log.info(f"to_wells accepted: {total} wells, {len(sequence)} steps.")
+    machine.sequencer.start(sequence, initial_context={"name": "to_wells"})
@@ -29,126 +29,97 @@ def degrees_to_steps(machine, theta1, theta2):
     return m1_steps, m2_steps
 
 # ============================================================================
-# CORE KINEMATICS LOGIC (Adapted from kinematicsfunctions.py)
+# CORE KINEMATICS LOGIC
 # ============================================================================
 
-def _find_standard_position_angle(point):
-    """Calculates the angle of a vector in a 360-degree system."""
-    x, y = point[0], point[1]
-    if x == 0:
-        return 90 if y > 0 else 270
-    
-    ref_angle = math.degrees(math.atan(y / x))
-    
-    if x > 0 and y >= 0: quadrant = 1 # Q1
-    elif x < 0 and y >= 0: quadrant = 2 # Q2
-    elif x < 0 and y < 0: quadrant = 3 # Q3
-    else: quadrant = 4 # Q4
-
-    if quadrant == 1: return ref_angle
-    if quadrant == 2 or quadrant == 3: return 180 + ref_angle
-    if quadrant == 4: return 360 + ref_angle
-
-def _get_intersections(x0, y0, r0, x1, y1, r1):
-    """Calculates the intersection points of two circles."""
-    d = math.sqrt((x1 - x0)**2 + (y1 - y0)**2)
-
-    if d > r0 + r1 or d < abs(r0 - r1) or d == 0:
-        return None  # No solution
-
-    a = (r0**2 - r1**2 + d**2) / (2 * d)
-    h = math.sqrt(r0**2 - a**2)
-    x2 = x0 + a * (x1 - x0) / d
-    y2 = y0 + a * (y1 - y0) / d
-
-    x3 = x2 + h * (y1 - y0) / d
-    y3 = y2 - h * (x1 - x0) / d
-    x4 = x2 - h * (y1 - y0) / d
-    y4 = y2 + h * (x1 - x0) / d
-    return (x3, y3, x4, y4)
+_RAD_TO_DEG = 180.0 / math.pi
 
 def inverse_kinematics(machine, target_x, target_y):
     """
-    Calculates the required motor angles (theta1, theta2) to reach a
+    Calculates the required motor angles (theta1, theta2) in degrees to reach a
     Cartesian coordinate (target_x, target_y).
-    
-    Returns a tuple (theta1, theta2) on success, or None on failure.
-    """
-
-    # # Apply calibration transformation
-    # corrected_x, corrected_y = apply_calibration_transform(machine, target_x, target_y)
-    
-    # # Log the transformation for debugging, but only if a change occurred.
-    # if abs(target_x - corrected_x) > 0.001 or abs(target_y - corrected_y) > 0.001:
-    #     machine.log.info(f"Calibration applied: ({target_x:.3f}, {target_y:.3f}) -> ({corrected_x:.3f}, {corrected_y:.3f})")
-    # else:
-    #     machine.log.info("Calibration was not needed")
-
-    # # Update the local variables to use the corrected values.
-    # target_x, target_y = corrected_x, corrected_y
 
-    # # -- Calibration complete --
+    Closed form: the elbow P1 lies where the circle of radius L1 about the origin
+    meets the circle of radius L3 about the target. theta1 is the angle of P1 and
+    theta2 the angle of the vector from the target to P1 (the L2 link is parallel
+    to it). Of the two conformations within the operational limits, the one needing
+    the fewest steps on the busier motor from the current position (and so the
+    quicker move at the configured step rate) is returned, elbow-back on a tie.
 
+    Returns a tuple (theta1, theta2) on success, or None on failure.
+    """
     cfg = machine.config['kinematics']
-    L1, L2, L3 = cfg['L1'], cfg['L2'], cfg['L3']
-    op_limits = machine.config['operational_limits_degrees']
+    L1 = cfg['L1']
+    L3 = cfg['L3']
 
-    # The origin is assumed to be (0, 0)
-    p4 = (target_x, target_y)
-    
-    # Find possible locations for joint P1 (elbow of the upper arm)
-    p1_intersections = _get_intersections(p4[0], p4[1], L3, 0, 0, L1)
-    if p1_intersections is None:
+    d_sq = target_x * target_x + target_y * target_y
+    d = math.sqrt(d_sq)
+    if d == 0 or d > L1 + L3 or d < abs(L1 - L3):
         machine.log.error("IK Error: Target coordinate is physically unreachable.")
         return None
 
-    # Two possible arm conformations exist. We must check which is valid.
-    p1a = (p1_intersections[0], p1_intersections[1])
-    p1b = (p1_intersections[2], p1_intersections[3])
-    
-    possible_solutions = []
-
-    for p1 in [p1a, p1b]:
-        # Calculate theta1 for this conformation
-        theta1 = _find_standard_position_angle(p1)
-        
-        # Calculate the vector for the lower arm linkage
-        p3_vector = (p4[0] - p1[0], p4[1] - p1[1])
-        p3_angle = _find_standard_position_angle(p3_vector)
-        
-        # The joint P2 is parallel to P3, but offset by L2
-        # We find its position by moving backwards from the origin along the p3_angle
-        p2_x = 0 + L2 * math.cos(math.radians(p3_angle + 180))
-        p2_y = 0 + L2 * math.sin(math.radians(p3_angle + 180))
-        
-        # Calculate theta2 for this conformation
-        theta2 = _find_standard_position_angle((p2_x, p2_y))
-        
-        # # *** Angle calibration attempt
-        # corrected_theta1, corrected_theta2 = apply_angle_calibration_transform(machine, theta1, theta2)
-        
-        # # Log the change for debugging.
-        # if abs(theta1 - corrected_theta1) > 0.01 or abs(theta2 - corrected_theta2) > 0.01:
-        #     machine.log.info(f"Angle Calib Applied: ({theta1:.2f}, {theta2:.2f}) -> ({corrected_theta1:.2f}, {corrected_theta2:.2f})")
-        # else:
-        #     machine.log.info(f"No Angle calibration needed")
-
-        # # The rest of the checks will now use the corrected angles.
-        # theta1, theta2 = corrected_theta1, corrected_theta2
-        # # *** End angle calibration attempt        
-
-        # Safety Check: Is this solution within operational limits?
-        if (op_limits['m1_min'] <= theta1 <= op_limits['m1_max'] and
-            op_limits['m2_min'] <= theta2 <= op_limits['m2_max']):
-            possible_solutions.append((theta1, theta2))
-
-    if not possible_solutions:
-        machine.log.error("IK Error: All solutions violate operational angle limits.")
+    # Walk from the target toward the origin by a to the chord joining both
+    # elbow solutions, then out along the chord by h either way
+    a = (L3 * L3 - L1 * L1 + d_sq) / (2 * d)
+    h = math.sqrt(max(L3 * L3 - a * a, 0.0))
+    ux = target_x / d
+    uy = target_y / d
+    chord_x = target_x - a * ux
+    chord_y = target_y - a * uy
+
+    # Conformation A (elbow-back) and B
+    p1_x = chord_x - h * uy
+    p1_y = chord_y + h * ux
+    theta1_a = (math.atan2(p1_y, p1_x) * _RAD_TO_DEG) % 360
+    theta2_a = (math.atan2(p1_y - target_y, p1_x - target_x) * _RAD_TO_DEG) % 360
+    p1_x = chord_x + h * uy
+    p1_y = chord_y - h * ux
+    theta1_b = (math.atan2(p1_y, p1_x) * _RAD_TO_DEG) % 360
+    theta2_b = (math.atan2(p1_y - target_y, p1_x - target_x) * _RAD_TO_DEG) % 360
+
+    # Safety Check: Is each solution within operational limits?
+    op_limits = machine.config['operational_limits_degrees']
+    m1_min = op_limits['m1_min']; m1_max = op_limits['m1_max']
+    m2_min = op_limits['m2_min']; m2_max = op_limits['m2_max']
+    a_ok = m1_min <= theta1_a <= m1_max and m2_min <= theta2_a <= m2_max
+    b_ok = m1_min <= theta1_b <= m1_max and m2_min <= theta2_b <= m2_max
+
+    if a_ok and b_ok:
+        # Both motors step together, so a move takes as many ticks as its larger
+        # step count (see motion.move_cost); compare the step targets themselves
+        current_m1 = machine.flags.get('current_m1_steps', 0)
+        current_m2 = machine.flags.get('current_m2_steps', 0)
+        m1_a, m2_a = degrees_to_steps(machine, theta1_a, theta2_a)
+        m1_b, m2_b = degrees_to_steps(machine, theta1_b, theta2_b)
+        travel_a = max(abs(m1_a - current_m1), abs(m2_a - current_m2))
+        travel_b = max(abs(m1_b - current_m1), abs(m2_b - current_m2))
+        if travel_b < travel_a:
+            return theta1_b, theta2_b
+        return theta1_a, theta2_a
+    if a_ok:
+        return theta1_a, theta2_a
+    if b_ok:
+        return theta1_b, theta2_b
+
+    machine.log.error("IK Error: All solutions violate operational angle limits.")
+    return None
+
+def pump_center_target(machine, pump_offset, target_x, target_y):
+    """
+    Returns the arm center (x, y) that puts a pump nozzle over (target_x, target_y).
+    The nozzle offset {'dx', 'dy'} turns with the end effector, whose orientation is
+    theta2, so the orientation is estimated from an IK solve for the target itself.
+    Returns None if that solve fails.
+    """
+    guessed_angles = inverse_kinematics(machine, target_x, target_y)
+    if guessed_angles is None:
         return None
-    
-    # If multiple solutions are valid, prefer the first one (elbow-back).
-    # More advanced logic could choose the one requiring less travel.
-    return possible_solutions[0]
+    orientation_rad = math.radians(guessed_angles[1])
+    cos_theta = math.cos(orientation_rad)
+    sin_theta = math.sin(orientation_rad)
+    dx = pump_offset['dx']
+    dy = pump_offset['dy']
+    return target_x + dx * cos_theta - dy * sin_theta, target_y + dx * sin_theta + dy * cos_theta
 
 def forward_kinematics(machine, theta1, theta2):
     """
@@ -0,0 +1,158 @@
+# firmware/sidekick/motion.py
+# type: ignore
+"""
+Step scheduling for the Sidekick's two motors. Board-free: states feed it the
+clock (time.monotonic_ns()) and pulse the pins themselves, so the host tests
+run it against a simulated clock.
+
+A move is a DDAStepper (which motor steps on each tick) driven by a profile
+(when each tick is due). plan_move() builds both from 'motor_settings';
+move_cost() estimates how long such a move takes, for planners.
+"""
+import math
+
+NS_PER_S = 1000000000
+
+class ConstantRateProfile:
+    """Ticks evenly spaced at rate_sps."""
+
+    def __init__(self, rate_sps):
+        self.tick_interval_ns = NS_PER_S // rate_sps
+
+    def tick_time(self, tick):
+        """Time, in ns from the start of the move, at which tick (0-based) is due."""
+        return tick * self.tick_interval_ns
+
+class TrapezoidProfile:
+    """
+    Trapezoidal velocity profile over total_ticks ticks: start at start_speed_sps,
+    accelerate at accel_sps2 (> 0) up to max_speed_sps, cruise, and decelerate back to
+    start_speed_sps for the last tick. Moves too short to reach max_speed_sps
+    turn at the midpoint (a triangle). The phase boundaries are computed once;
+    each tick's time is then a closed form, so nothing is stored per tick.
+    """
+
+    def __init__(self, total_ticks, max_speed_sps, accel_sps2, start_speed_sps):
+        # Tick 0 fires at t = 0, so the profile covers total_ticks - 1 intervals
+        self.distance = max(total_ticks - 1, 0)
+        self.start_speed = min(start_speed_sps, max_speed_sps)
+        self.accel = accel_sps2
+        # Ticks needed to reach max speed, capped at half the move
+        ramp = (max_speed_sps * max_speed_sps - self.start_speed * self.start_speed) / (2 * accel_sps2)
+        if 2 * ramp > self.distance:
+            ramp = self.distance / 2
+        self.ramp = ramp
+        self.peak_speed = math.sqrt(self.start_speed * self.start_speed + 2 * accel_sps2 * ramp)
+        self.ramp_time = self._ramp_time(ramp)
+        cruise = self.distance - 2 * ramp
+        self.duration = 2 * self.ramp_time + (cruise / self.peak_speed if cruise > 0 else 0.0)
+
+    def _ramp_time(self, position):
+        """Seconds from the start of a ramp to position ticks along it."""
+        if position <= 0:
+            return 0.0
+        return (math.sqrt(self.start_speed * self.start_speed + 2 * self.accel * position) - self.start_speed) / self.accel
+
+    def tick_time(self, tick):
+        """Time, in ns from the start of the move, at which tick (0-based) is due."""
+        if tick <= self.ramp:
+            seconds = self._ramp_time(tick)
+        elif tick < self.distance - self.ramp:
+            seconds = self.ramp_time + (tick - self.ramp) / self.peak_speed
+        else:
+            # Deceleration mirrors the acceleration ramp
+            seconds = self.duration - self._ramp_time(self.distance - tick)
+        return int(seconds * NS_PER_S)
+
+class DDAStepper:
+    """
+    Coordinated two-axis move by Bresenham DDA. The move is split into as many
+    ticks as the longer axis has steps; every tick each axis adds its step count
+    to an accumulator and steps when it reaches the tick count. The longer axis
+    steps on every tick and the shorter one evenly in between, so both arrive on
+    the last tick and the joint path stays straight in step space.
+
+    Ticks are due when the profile says (a ConstantRateProfile or a
+    TrapezoidProfile, timed from start()), not once per main loop. steps_due()
+    returns how many ticks the caller should run now: several if the loop fell
+    behind, at most max_burst. A larger backlog is dropped rather than replayed
+    at the end of a long stall.
+    """
+
+    def __init__(self, delta_m1, delta_m2, profile, max_burst=8):
+        self.steps_m1 = abs(delta_m1)
+        self.steps_m2 = abs(delta_m2)
+        self.total_ticks = max(self.steps_m1, self.steps_m2)
+        self.profile = profile
+        self.max_burst = max_burst
+        self.ticks_done = 0
+        # Start half way so the shorter axis' steps are centred in the move
+        self._acc_m1 = self.total_ticks // 2
+        self._acc_m2 = self.total_ticks // 2
+        self._start_ns = 0
+
+    @property
+    def done(self):
+        return self.ticks_done >= self.total_ticks
+
+    def start(self, now_ns):
+        """Starts the schedule; the first tick is due immediately."""
+        self._start_ns = now_ns
+
+    def steps_due(self, now_ns):
+        """Number of ticks to run now, between 0 and max_burst."""
+        tick_time = self.profile.tick_time
+        elapsed = now_ns - self._start_ns
+        due = 0
+        while (self.ticks_done + due < self.total_ticks and due < self.max_burst
+               and tick_time(self.ticks_done + due) <= elapsed):
+            due += 1
+        if due == self.max_burst and self.ticks_done + due < self.total_ticks \
+                and tick_time(self.ticks_done + due) <= elapsed:
+            # Still behind after a full burst: restart the schedule from the
+            # tick after this burst instead of racing to catch up
+            self._start_ns = now_ns - tick_time(self.ticks_done + due)
+        return due
+
+    def next_step(self):
+        """Advances one tick and returns (step_m1, step_m2) for it."""
+        self.ticks_done += 1
+        step_m1 = False
+        step_m2 = False
+        self._acc_m1 += self.steps_m1
+        if self._acc_m1 >= self.total_ticks:
+            self._acc_m1 -= self.total_ticks
+            step_m1 = True
+        self._acc_m2 += self.steps_m2
+        if self._acc_m2 >= self.total_ticks:
+            self._acc_m2 -= self.total_ticks
+            step_m2 = True
+        return step_m1, step_m2
+
+def _profile(motor_settings, total_ticks):
+    move_speed = motor_settings['move_speed_sps']
+    accel = motor_settings.get('acceleration_sps2', 0)
+    if accel:
+        return TrapezoidProfile(total_ticks, move_speed, accel, motor_settings.get('start_speed_sps', move_speed))
+    return ConstantRateProfile(move_speed)
+
+def plan_move(motor_settings, delta_m1, delta_m2):
+    """
+    A DDAStepper for a move of (delta_m1, delta_m2) steps. With 'acceleration_sps2'
+    set the longer axis follows a trapezoid from 'start_speed_sps' to
+    'move_speed_sps'; without it, the move runs at 'move_speed_sps' throughout.
+    """
+    total_ticks = max(abs(delta_m1), abs(delta_m2))
+    profile = _profile(motor_settings, total_ticks)
+    return DDAStepper(delta_m1, delta_m2, profile, motor_settings.get('max_steps_per_update', 8))
+
+def move_cost(motor_settings, from_steps, to_steps):
+    """
+    Seconds plan_move() takes to go from one (m1, m2) step position to another:
+    the time of the move's last tick, set by the busier motor's step count and
+    the profile. Excludes settling and serial round trips.
+    """
+    total_ticks = max(abs(to_steps[0] - from_steps[0]), abs(to_steps[1] - from_steps[1]))
+    if total_ticks < 2:
+        return 0.0
+    return _profile(motor_settings, total_ticks).tick_time(total_ticks - 1) / NS_PER_S
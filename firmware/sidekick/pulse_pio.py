@@ -0,0 +1,78 @@
+# firmware/sidekick/pulse_pio.py
+# type: ignore
+"""
+RP2040 PIO step pulse backend. Each motor's step pin gets a PIO state machine
+that plays 32-bit words from its TX FIFO: bit 0 is the step level for a tick
+and the upper bits the delay until the next tick, in microseconds. Buffers are
+fed by background (DMA) writes, so the pulse train keeps its timing while the
+main loop logs, reads serial or runs handlers.
+
+The motors' step pins are not adjacent (GP1, GP10), so one PIO program cannot
+drive both; the two state machines play the same tick sequence in lockstep.
+Needs rp2pio (RP2040 boards) and the adafruit_pioasm library.
+"""
+import array
+import rp2pio
+import adafruit_pioasm
+from .pulses import BufferedPulseBackend
+
+PIO_FREQUENCY = 1000000 # One cycle per microsecond
+CYCLES_PER_TICK = 8 # Fixed cost of one tick in the program below
+
+STEP_PROGRAM = adafruit_pioasm.assemble("""
+.program sidekick_step
+    pull block
+    out pins, 1 [3]
+    set pins, 0
+    out x, 31
+delay:
+    jmp x-- delay
+""")
+
+class PioPulseBackend(BufferedPulseBackend):
+    """Hardware-timed pulse trains for both motors from two rp2pio state machines."""
+
+    def __init__(self, step_pin_m1, step_pin_m2, chunk_ticks=64):
+        super().__init__(chunk_ticks)
+        self._machines = [self._make_machine(pin) for pin in (step_pin_m1, step_pin_m2)]
+        # Two buffers per motor: one playing while the other is refilled
+        self._buffers = [[array.array("L", [0] * chunk_ticks) for _ in range(2)] for _ in self._machines]
+        self._next_buffer = 0
+        self._single = array.array("L", [0])
+
+    @staticmethod
+    def _make_machine(pin):
+        return rp2pio.StateMachine(
+            STEP_PROGRAM,
+            frequency=PIO_FREQUENCY,
+            first_out_pin=pin,
+            initial_out_pin_direction=1,
+            first_set_pin=pin,
+            initial_set_pin_direction=1,
+            out_shift_right=True,
+        )
+
+    def pulse(self, step_m1, step_m2):
+        for sm, step in zip(self._machines, (step_m1, step_m2)):
+            self._single[0] = 1 if step else 0
+            sm.write(self._single)
+
+    def _can_queue(self):
+        # pending counts buffers not yet started; the other buffer is free
+        return all(sm.pending == 0 for sm in self._machines)
+
+    def _queue(self, chunk):
+        index = self._next_buffer
+        self._next_buffer = 1 - index
+        for motor, sm in enumerate(self._machines):
+            buffer = self._buffers[motor][index]
+            for i, tick in enumerate(chunk):
+                delay = tick[2] // 1000 - CYCLES_PER_TICK
+                buffer[i] = ((delay if delay > 0 else 0) << 1) | (1 if tick[motor] else 0)
+            words = buffer if len(chunk) == self.chunk_ticks else memoryview(buffer)[:len(chunk)]
+            sm.background_write(once=words)
+
+    def _clear(self):
+        for sm in self._machines:
+            sm.stop_background_write()
+            sm.restart()
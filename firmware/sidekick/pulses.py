@@ -0,0 +1,142 @@
+# firmware/sidekick/pulses.py
+# type: ignore
+"""
+Step pulse backends for the Sidekick motors. Moving and Homing hand their step
+schedule (a motion.DDAStepper) or single pulses to machine.pulses and never
+touch the step pins themselves.
+
+    start(stepper, now_ns)  begin a move
+    poll(now_ns)            call every update; True once the move has finished
+    stop()                  abandon the move (e.g. an endstop fault)
+    pulse(step_m1, step_m2) one immediate step, for homing
+
+LoopPulseBackend toggles the pins from the main loop. Buffered backends queue
+ticks ahead with their times, so the pulse train keeps its rate however the
+loop is delayed: pulse_pio.PioPulseBackend on the device, SimulatedPulseBackend
+on the host. Board-free; the PIO backend lives in its own module.
+"""
+
+class LoopPulseBackend:
+    """Pulses step pins (anything with a .value) from Python as ticks fall due."""
+
+    def __init__(self, step_pin_m1, step_pin_m2):
+        self.step_pin_m1 = step_pin_m1
+        self.step_pin_m2 = step_pin_m2
+        self.stepper = None
+
+    def pulse(self, step_m1, step_m2):
+        if step_m1:
+            self.step_pin_m1.value = True
+        if step_m2:
+            self.step_pin_m2.value = True
+        # Both pins rise before either falls, so joint steps stay together
+        self.step_pin_m1.value = False
+        self.step_pin_m2.value = False
+
+    def start(self, stepper, now_ns):
+        self.stepper = stepper
+        stepper.start(now_ns)
+
+    def poll(self, now_ns):
+        stepper = self.stepper
+        for _ in range(stepper.steps_due(now_ns)):
+            step_m1, step_m2 = stepper.next_step()
+            self.pulse(step_m1, step_m2)
+        return stepper.done
+
+    def stop(self):
+        self.stepper = None
+
+
+class BufferedPulseBackend:
+    """
+    Base for backends that play a timed pulse train from a buffer. poll() keeps
+    the buffer topped up with chunks of chunk_ticks ticks, each tick given as
+    (step_m1, step_m2, ns until the next tick); the move has finished once every
+    tick is queued and the last one is due. Subclasses implement _can_queue(),
+    _queue(chunk) and _clear().
+    """
+
+    def __init__(self, chunk_ticks=64):
+        self.chunk_ticks = chunk_ticks
+        self.stepper = None
+        self._start_ns = 0
+        self._end_ns = 0
+
+    def start(self, stepper, now_ns):
+        self.stepper = stepper
+        stepper.start(now_ns)
+        self._start_ns = now_ns
+        self._end_ns = now_ns + stepper.profile.tick_time(max(stepper.total_ticks - 1, 0))
+        self._fill()
+
+    def poll(self, now_ns):
+        self._fill()
+        return self.stepper.done and now_ns >= self._end_ns
+
+    def stop(self):
+        self._clear()
+        self.stepper = None
+
+    def _fill(self):
+        stepper = self.stepper
+        tick_time = stepper.profile.tick_time
+        while not stepper.done and self._can_queue():
+            chunk = []
+            while not stepper.done and len(chunk) < self.chunk_ticks:
+                tick = stepper.ticks_done
+                step_m1, step_m2 = stepper.next_step()
+                interval = tick_time(tick + 1) - tick_time(tick) if not stepper.done else 0
+                chunk.append((step_m1, step_m2, interval))
+            self._queue(chunk)
+
+    def _can_queue(self):
+        raise NotImplementedError("Implementation specific queue check not implemented")
+
+    def _queue(self, chunk):
+        raise NotImplementedError("Implementation specific queueing not implemented")
+
+    def _clear(self):
+        raise NotImplementedError("Implementation specific clear not implemented")
+
+
+class SimulatedPulseBackend(BufferedPulseBackend):
+    """
+    Host stand-in for a hardware pulse train. Ticks play at their scheduled
+    times and are recorded in events as (time_ns, step_m1, step_m2); at most
+    depth_chunks chunks are queued ahead, like a double-buffered DMA.
+    """
+
+    def __init__(self, chunk_ticks=64, depth_chunks=2):
+        super().__init__(chunk_ticks)
+        self.depth_chunks = depth_chunks
+        self.events = []
+        self.chunks_queued = 0
+        self._next_ns = 0
+        self._now_ns = 0
+
+    def start(self, stepper, now_ns):
+        self._now_ns = now_ns
+        self._next_ns = now_ns
+        super().start(stepper, now_ns)
+
+    def poll(self, now_ns):
+        self._now_ns = now_ns
+        return super().poll(now_ns)
+
+    def pulse(self, step_m1, step_m2):
+        self.events.append((self._now_ns, step_m1, step_m2))
+
+    def _can_queue(self):
+        ahead = sum(1 for event in self.events if event[0] > self._now_ns)
+        return ahead < self.chunk_ticks * (self.depth_chunks - 1)
+
+    def _queue(self, chunk):
+        self.chunks_queued += 1
+        for step_m1, step_m2, interval in chunk:
+            self.events.append((self._next_ns, step_m1, step_m2))
+            self._next_ns += interval
+
+    def _clear(self):
+        # Drop the ticks that had not played yet
+        self.events = [event for event in self.events if event[0] <= self._now_ns]
@@ -4,8 +4,42 @@ import time
 import digitalio
 from shared_lib.statemachine import State
 from shared_lib.messages import Message
-from firmware.common.common_states import listen_for_instructions
+from firmware.common.common_states import listen_for_instructions, receive_instructions
 from . import kinematics
+from . import motion
+from . import pulses
+
+def position_report(machine):
+    """
+    The commanded absolute motor position and the homing generation it belongs to.
+    The generation counts successful homings since boot; the host drops its copy
+    of the position when it changes.
+    """
+    return {
+        "steps": {
+            "m1": machine.flags.get('current_m1_steps', 0),
+            "m2": machine.flags.get('current_m2_steps', 0)
+        },
+        "homing_generation": machine.flags.get('homing_generation', 0)
+    }
+
+def invalidate_homing(machine, reason):
+    """
+    Stops trusting the homed position: 'home_if_needed' will home again. Called
+    on an endstop fault during a move (which also disables the motors) and on
+    entering Error; Homing clears the flag itself and a power cycle starts
+    untrusted. Nothing else disables the motors, so a drift they cannot see
+    (the arm forced by hand, skipped steps) needs an explicit 'home'.
+    """
+    if machine.flags.get('is_homed'):
+        machine.log.warning(f"Homed position no longer trusted: {reason}")
+    machine.flags['is_homed'] = False
+
+def disable_motors(machine, reason):
+    """Releases both motors and invalidates the homed position."""
+    machine.hardware['motor1_enable'].value = True # HIGH = off
+    machine.hardware['motor2_enable'].value = True
+    invalidate_homing(machine, reason)
 
 class Initialize(State):
     @property
@@ -19,8 +53,6 @@ class Initialize(State):
             
             # Setup Motors and Endstops
             for i in [1, 2]:
-                machine.hardware[f'motor{i}_step'] = digitalio.DigitalInOut(pin_config[f'motor{i}_step'])
-                machine.hardware[f'motor{i}_step'].direction = digitalio.Direction.OUTPUT
                 machine.hardware[f'motor{i}_dir'] = digitalio.DigitalInOut(pin_config[f'motor{i}_dir'])
                 machine.hardware[f'motor{i}_dir'].direction = digitalio.Direction.OUTPUT
                 machine.hardware[f'motor{i}_enable'] = digitalio.DigitalInOut(pin_config[f'motor{i}_enable'])
@@ -30,6 +62,16 @@ class Initialize(State):
                 machine.hardware[f'endstop_m{i}'] = digitalio.DigitalInOut(pin_config[f'endstop_m{i}'])
                 machine.hardware[f'endstop_m{i}'].direction = digitalio.Direction.INPUT
                 machine.hardware[f'endstop_m{i}'].pull = digitalio.Pull.UP
+
+            # Step pins belong to the pulse backend (see pulses.py)
+            if machine.config['motor_settings'].get('pulse_backend') == 'pio':
+                from .pulse_pio import PioPulseBackend
+                machine.pulses = PioPulseBackend(pin_config['motor1_step'], pin_config['motor2_step'])
+            else:
+                for i in [1, 2]:
+                    machine.hardware[f'motor{i}_step'] = digitalio.DigitalInOut(pin_config[f'motor{i}_step'])
+                    machine.hardware[f'motor{i}_step'].direction = digitalio.Direction.OUTPUT
+                machine.pulses = pulses.LoopPulseBackend(machine.hardware['motor1_step'], machine.hardware['motor2_step'])
             
             # Setup Pumps
             machine.hardware['pumps'] = {}
@@ -67,55 +109,104 @@ class Idle(State):
 
 class Homing(State):
     """
-    Homing procedure
+    Homing procedure. Each endstop is found with a fast seek, a short backoff and
+    a slow re-approach, so the switch point is repeatable without crawling the
+    whole way at low speed. Speeds are set in 'homing_settings'.
     """
     @property
     def name(self): return 'Homing'
 
     def enter(self, machine, context=None):
         super().enter(machine,context)
-        machine.log.info("Starting corrected homing routine...")
+        machine.log.info("Starting two-speed homing routine...")
         machine.flags['is_homed'] = False
+        self._start_time = time.monotonic()
 
         # Load settings
-        self._backoff_steps = machine.config['homing_settings']['joint_backoff_steps']
+        settings = machine.config['homing_settings']
+        max_speed = machine.config['motor_settings']['max_speed_sps']
+        self._backoff_steps = settings['joint_backoff_steps']
+        self._reapproach_steps = settings.get('reapproach_backoff_steps', 0)
+        self._fast_delay_ns = motion.NS_PER_S // settings.get('seek_speed_sps', max_speed)
+        self._slow_delay_ns = motion.NS_PER_S // settings.get('reapproach_speed_sps', max_speed)
         self._max_homing_steps = machine.config['safe_limits']['m1_max_steps'] + 2000
         
         # Internal state management
         self._homing_stage = 'START_M1'
         self._steps_taken = 0
-        self._step_delay = 1 / machine.config['motor_settings']['max_speed_sps']
-        self._next_step_time = time.monotonic()
+        self._next_step_ns = time.monotonic_ns()
 
         machine.hardware['motor1_enable'].value = False
         machine.hardware['motor2_enable'].value = False
 
+    def _set_direction(self, machine, toward_endstop):
+        for pin in self._dir_pins:
+            machine.hardware[pin].value = self._seek_dir if toward_endstop else not self._seek_dir
+
+    def _start_approach(self, machine, dir_pins, seek_dir, step_m1, step_m2):
+        """Prepares a two-speed approach: which motors step and which way is 'toward'."""
+        self._dir_pins = dir_pins
+        self._seek_dir = seek_dir
+        self._step_m1 = step_m1
+        self._step_m2 = step_m2
+        self._approach = 'FAST'
+        self._net_steps = 0 # Toward the endstop, less the steps backed off
+        self._steps_taken = 0 # Timeout counter
+        self._step_delay_ns = self._fast_delay_ns
+        self._set_direction(machine, True)
+
+    def _approach_endstop(self, machine, endstop):
+        """
+        Advances the approach by at most one step. Returns True once the endstop
+        is pressed on the slow re-approach (or on the fast seek if re-approach is off).
+        """
+        pressed = not machine.hardware[endstop].value # False when pressed due to Pull.UP
+        if self._approach == 'FAST' and pressed:
+            if self._reapproach_steps <= 0:
+                return True
+            self._approach = 'BACKOFF'
+            self._backoff_left = self._reapproach_steps
+            self._set_direction(machine, False)
+        elif self._approach == 'BACKOFF' and self._backoff_left == 0:
+            self._approach = 'SLOW'
+            self._step_delay_ns = self._slow_delay_ns
+            self._set_direction(machine, True)
+        elif self._approach == 'SLOW' and pressed:
+            return True
+
+        now = time.monotonic_ns()
+        if now >= self._next_step_ns:
+            machine.pulses.pulse(self._step_m1, self._step_m2)
+            self._next_step_ns = now + self._step_delay_ns
+            if self._approach == 'BACKOFF':
+                self._backoff_left -= 1
+                self._net_steps -= 1
+            else:
+                self._net_steps += 1
+                self._steps_taken += 1
+        return False
+
     def update(self, machine):
         super().update(machine)
+        if self.task_complete or machine.state is not self:
+            return
+        receive_instructions(machine) # Queue instructions that arrive while homing
 
         # --- Phase 1: Home M1 (CW) ---
         if self._homing_stage == 'START_M1':
             machine.log.info("Phase 1: Homing Motor 1 (CW) with M2 disabled.")
             machine.hardware['motor2_enable'].value = True
-            machine.hardware['motor1_dir'].value = True
-            self._steps_taken = 0
+            self._start_approach(machine, ('motor1_dir',), True, True, False)
             self._homing_stage = 'RUNNING_M1'
 
         elif self._homing_stage == 'RUNNING_M1':
-            if not machine.hardware['endstop_m1'].value:
+            if self._approach_endstop(machine, 'endstop_m1'):
                 # ABSOLUTE POSITION DEFINED
                 
                 machine.flags['current_m1_steps'] = 0 # step offset added later
                 machine.log.info(f"M1 endstop reached. Position DEFINED as {machine.flags['current_m1_steps']} steps.")
                 self._homing_stage = 'START_M2_JOINT'
                 return
-            
-            # (Pulse and timeout logic remains the same)
-            if time.monotonic() >= self._next_step_time:
-                step_pin = machine.hardware['motor1_step']
-                step_pin.value = True; step_pin.value = False
-                self._steps_taken += 1
-                self._next_step_time = time.monotonic() + self._step_delay
             if self._steps_taken > self._max_homing_steps:
                 machine.flags['error_message'] = "FAULT: Homing timeout on Motor 1!"
                 machine.go_to_state('Error')
@@ -124,29 +215,19 @@ class Homing(State):
         elif self._homing_stage == 'START_M2_JOINT':
             machine.log.info("Phase 2: Joint CCW move to find M2 endstop.")
             machine.hardware['motor2_enable'].value = False
-            machine.hardware['motor1_dir'].value = False
-            machine.hardware['motor2_dir'].value = False
-            self._steps_taken = 0 # Timeout counter
+            self._start_approach(machine, ('motor1_dir', 'motor2_dir'), False, True, True)
             self._homing_stage = 'RUNNING_M2_JOINT'
 
         elif self._homing_stage == 'RUNNING_M2_JOINT':
-            if not machine.hardware['endstop_m2'].value:
+            if self._approach_endstop(machine, 'endstop_m2'):
                 # ABSOLUTE POSITION DEFINED
                 step_offset = machine.config.get('step_correction', {'m1e':0, 'm2e':0})
                 machine.flags['current_m2_steps'] = 1600 + step_offset['m2e'] # We know M2 is 1600 steps from M1 at the endstop, so we use that as our reference point.
-                # M1's position is its starting point (0) plus the steps taken in this phase
-                machine.flags['current_m1_steps'] = step_offset['m1e'] + self._steps_taken
+                # M1's position is its starting point (0) plus the net steps taken in this phase
+                machine.flags['current_m1_steps'] = step_offset['m1e'] + self._net_steps
                 machine.log.info(f"M2 endstop reached. Positions DEFINED as M1={machine.flags['current_m1_steps']}, M2={machine.flags['current_m2_steps']}.")
                 self._homing_stage = 'START_JOINT_BACKOFF'
                 return
-
-            # (Pulse and timeout logic remains the same)
-            if time.monotonic() >= self._next_step_time:
-                m1_pin = machine.hardware['motor1_step']; m2_pin = machine.hardware['motor2_step']
-                m1_pin.value = True; m2_pin.value = True
-                m1_pin.value = False; m2_pin.value = False
-                self._steps_taken += 1
-                self._next_step_time = time.monotonic() + self._step_delay
             if self._steps_taken > self._max_homing_steps:
                 machine.flags['error_message'] = "FAULT: Homing timeout on M2 joint move!"
                 machine.go_to_state('Error')
@@ -157,17 +238,16 @@ class Homing(State):
             machine.hardware['motor1_dir'].value = True
             machine.hardware['motor2_dir'].value = True
             self._steps_taken = self._backoff_steps
+            self._step_delay_ns = self._fast_delay_ns
             self._homing_stage = 'RUNNING_JOINT_BACKOFF'
 
         elif self._homing_stage == 'RUNNING_JOINT_BACKOFF':
             if self._steps_taken > 0:
-                # (Backoff pulse logic remains the same)
-                 if time.monotonic() >= self._next_step_time:
-                    m1_pin = machine.hardware['motor1_step']; m2_pin = machine.hardware['motor2_step']
-                    m1_pin.value = True; m2_pin.value = True
-                    m1_pin.value = False; m2_pin.value = False
+                now = time.monotonic_ns()
+                if now >= self._next_step_ns:
+                    machine.pulses.pulse(True, True)
                     self._steps_taken -= 1
-                    self._next_step_time = time.monotonic() + self._step_delay
+                    self._next_step_ns = now + self._step_delay_ns
             else:
                 # --- CORRECTED POSITION UPDATE ---
                 # The new position is the old position MINUS the backoff steps.
@@ -203,13 +283,25 @@ class Homing(State):
             machine.flags['target_m1_steps'] = target_m1_steps
             machine.flags['target_m2_steps'] = target_m2_steps
             machine.flags['on_move_complete'] = 'Idle'
+            machine.flags['homing_generation'] = machine.flags.get('homing_generation', 0) + 1
+            homing_time = round(time.monotonic() - self._start_time, 2)
+            machine.log.info(f"Endstops found in {homing_time} s.")
 
-            # Send success message to host *before* starting the move
+            # Send success message to host *before* starting the move.
+            # The reported position is the park target the arm is commanded to.
             response = Message.create_message(
                 subsystem_name=machine.name, status="SUCCESS",
-                payload={"detail": "Homing successful. Moving to park position."}
+                payload={
+                    "detail": "Homing successful. Moving to park position.",
+                    "data": {
+                        "steps": {"m1": target_m1_steps, "m2": target_m2_steps},
+                        "homing_generation": machine.flags['homing_generation'],
+                        "homing_time_s": homing_time # Endstop search only, not the park move
+                    }
+                },
+                origin=machine.current_origin
             )
-            machine.postman.send(response.serialize())
+            machine.postman.send_message(response)
             machine.go_to_state('Moving')
 
     def exit(self, machine):
@@ -229,22 +321,22 @@ class Moving(State):
         """
         super().enter(machine,context)
         
-        # 1. Read start and target positions from the machine's flags
+        # 1. Read start and target positions. A step's own context wins over the
+        # sequence context, which wins over the machine's flags.
         start_m1 = machine.flags['current_m1_steps']
         start_m2 = machine.flags['current_m2_steps']
-        self.target_m1 = machine.sequencer.context.get('target_m1_steps',
-            machine.flags.get('target_m1_steps'))
-        self.target_m2 = machine.sequencer.context.get('target_m2_steps',
-            machine.flags.get('target_m2_steps'))
+        self.target_m1 = self.local_context.get('target_m1_steps',
+            machine.sequencer.context.get('target_m1_steps', machine.flags.get('target_m1_steps')))
+        self.target_m2 = self.local_context.get('target_m2_steps',
+            machine.sequencer.context.get('target_m2_steps', machine.flags.get('target_m2_steps')))
         
         machine.log.info(f"Moving from ({start_m1}, {start_m2}) to ({self.target_m1}, {self.target_m2}).")
 
-        # 2. Calculate the plan: steps and direction for each motor
+        # 2. Calculate the plan: a coordinated DDA so both joints arrive together,
+        # timed by an acceleration profile from 'motor_settings'
         delta_m1 = self.target_m1 - start_m1
         delta_m2 = self.target_m2 - start_m2
-        
-        self.steps_left_m1 = abs(delta_m1)
-        self.steps_left_m2 = abs(delta_m2)
+        self.stepper = motion.plan_move(machine.config['motor_settings'], delta_m1, delta_m2)
         
         # Set motor direction pins (True/False may need to be adjusted for your wiring)
         machine.hardware['motor1_dir'].value = False if delta_m1 > 0 else True
@@ -255,48 +347,38 @@ class Moving(State):
         machine.hardware['motor1_enable'].value = False
         machine.hardware['motor2_enable'].value = False
         time.sleep(0.01) # Short delay to ensure drivers are fully enabled
+        machine.pulses.start(self.stepper, time.monotonic_ns())
 
     def update(self, machine):
         """
         Called on every loop. This is the core stepper pulse generator.
-        This is a simple implementation that steps both motors on each loop.
-        A more advanced version would use Bresenham's algorithm for smoother lines.
+        The pulse backend runs the planned ticks: from this loop for the default
+        backend (several per update if the loop fell behind), or from hardware
+        for a buffered one, which this loop only keeps fed.
         """
         super().update(machine)
+        if self.task_complete or machine.state is not self:
+            return
+        receive_instructions(machine) # Queue instructions that arrive mid-move
         
         # Check for unexpected endstops (Safety First!)
         # Note: Endstop value is False when pressed due to Pull.UP
         if not machine.hardware['endstop_m1'].value or not machine.hardware['endstop_m2'].value:
-            machine.hardware['motor1_enable'].value = True # Immediately disable motors
-            machine.hardware['motor2_enable'].value = True
-            machine.flags['is_homed'] = False # We no longer know our position
+            machine.pulses.stop()
+            # Immediately disable motors; we no longer know our position
+            disable_motors(machine, "endstop triggered during move")
             machine.flags['error_message'] = "FAULT: Endstop triggered during move!"
             machine.go_to_state('Error')
             return # Stop processing immediately
 
-        move_is_done = True
-        
-        # Pulse Motor 1 if it still has steps to go
-        if self.steps_left_m1 > 0:
-            step_pin = machine.hardware['motor1_step']
-            step_pin.value = True
-            step_pin.value = False # This pulse is very short
-            self.steps_left_m1 -= 1
-            move_is_done = False
-        
-        # Pulse Motor 2 if it still has steps to go
-        if self.steps_left_m2 > 0:
-            step_pin = machine.hardware['motor2_step']
-            step_pin.value = True
-            step_pin.value = False
-            self.steps_left_m2 -= 1
-            move_is_done = False
-            
         # If both motors have completed their moves
-        if move_is_done:
+        if machine.pulses.poll(time.monotonic_ns()):
             # Update the final position in the machine's flags
             machine.flags['current_m1_steps'] = self.target_m1
             machine.flags['current_m2_steps'] = self.target_m2
+            # Returned with the sequence's SUCCESS so the host can track the position
+            if machine.sequencer.is_active:
+                machine.sequencer.context['result'] = position_report(machine)
 
             self.task_complete = True
             
@@ -310,12 +392,12 @@ class Dispensing(State):
     def enter(self, machine, context=None):
         super().enter(machine, context)
 
-        # Read parameters from the sequencer context first, falling back to machine flags
-        # for compatibility if needed. This makes the state work with the new handlers.
-        self.pump_key = machine.sequencer.context.get('dispense_pump', 
-            machine.flags.get('dispense_pump'))
-        self.cycles_left = machine.sequencer.context.get('dispense_cycles', 
-            machine.flags.get('dispense_cycles'))
+        # Read parameters from the step's context, then the sequencer context, falling
+        # back to machine flags for compatibility if needed.
+        self.pump_key = self.local_context.get('dispense_pump',
+            machine.sequencer.context.get('dispense_pump', machine.flags.get('dispense_pump')))
+        self.cycles_left = self.local_context.get('dispense_cycles',
+            machine.sequencer.context.get('dispense_cycles', machine.flags.get('dispense_cycles')))
 
         # Check that parameters were successfully loaded
         if self.pump_key is None or self.cycles_left is None:
@@ -334,6 +416,9 @@ class Dispensing(State):
 
     def update(self, machine):
         super().update(machine)
+        if self.task_complete or machine.state is not self:
+            return
+        receive_instructions(machine) # Queue instructions that arrive while dispensing
         if time.monotonic() >= self._next_toggle_time:
             if self.pump_state == 'aspirating':
                 self.pump_pin.value = False
@@ -357,4 +442,88 @@ class Dispensing(State):
         super().exit(machine)
         # Ensure the pump is off when we leave the state
         if hasattr(self, 'pump_pin'):
-            self.pump_pin.value = False
\ No newline at end of file
+            self.pump_pin.value = False
+
+class ReportProgress(State):
+    """Sequencer State: Sends a progress TELEMETRY message for a multi-well sequence."""
+    @property
+    def name(self): return 'ReportProgress'
+
+    def enter(self, machine, context=None):
+        super().enter(machine, context)
+        progress = Message(
+            subsystem_name=machine.name,
+            status="TELEMETRY",
+            payload={
+                "metadata": {
+                    "data_type": "progress",
+                    "source_instruction_id": machine.sequencer.origin
+                },
+                "data": {
+                    "name": machine.sequencer.context.get('name'),
+                    "well": self.local_context.get('well'),
+                    "completed": self.local_context.get('index', 0) + 1,
+                    "total": self.local_context.get('total')
+                }
+            }
+        )
+        machine.postman.send_message(progress)
+        self.task_complete = True
+
+    def update(self, machine):
+        super().update(machine)
+
+class Holding(State):
+    """
+    Sequencer State: One point of a scan. Announces the arrival with a 'scan_point'
+    TELEMETRY message, then holds until a 'scan_next' instruction releases it
+    (or, when the step has a 'dwell', until the dwell time has passed).
+    Any other instruction at the head of the inbox stops the scan; it runs afterwards.
+    """
+    @property
+    def name(self): return 'Holding'
+
+    def enter(self, machine, context=None):
+        super().enter(machine, context)
+        self._dwell = self.local_context.get('dwell')
+        self._deadline = self.entered_at + (self._dwell if self._dwell is not None
+            else self.local_context.get('timeout', 60.0))
+        arrival = Message(
+            subsystem_name=machine.name,
+            status="TELEMETRY",
+            payload={
+                "metadata": {
+                    "data_type": "scan_point",
+                    "source_instruction_id": machine.sequencer.origin
+                },
+                "data": {
+                    "index": self.local_context.get('index'),
+                    "total": self.local_context.get('total'),
+                    "m1": machine.flags['current_m1_steps'],
+                    "m2": machine.flags['current_m2_steps']
+                }
+            }
+        )
+        machine.postman.send_message(arrival)
+
+    def update(self, machine):
+        super().update(machine)
+        if self.task_complete or machine.state is not self:
+            return
+        receive_instructions(machine)
+
+        waiting = machine.inbox.peek()
+        if waiting is not None:
+            func = waiting.payload.get("func") if isinstance(waiting.payload, dict) else None
+            if func == "scan_next":
+                machine.inbox.get()
+                self.task_complete = True
+            else:
+                machine.sequencer.abort(f"Scan interrupted by '{func}'")
+            return
+
+        if time.monotonic() >= self._deadline:
+            if self._dwell is not None:
+                self.task_complete = True
+            else:
+                machine.sequencer.abort("Timed out waiting for scan_next")
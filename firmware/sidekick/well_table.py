@@ -0,0 +1,78 @@
+# firmware/sidekick/well_table.py
+# type: ignore
+"""
+Precomputed well -> motor step lookup, generated on the host by
+host/calibration/well_table.py and loaded once at boot. A hit makes 'to_well'
+a dictionary lookup with no parsing or floating-point math on the device.
+Board-free so host tools and tests can load it.
+"""
+import json
+
+WELL_TABLE_FILE = "well_table.json"
+WELL_TABLE_VERSION = 1
+
+# Config a table's steps depend on. A table generated for different values is
+# ignored so the device never moves to stale positions. Of 'motor_settings'
+# only the step resolution counts; speeds and the pulse backend do not move wells.
+SIGNATURE_KEYS = ("kinematics", "operational_limits_degrees",
+                  "plate_geometry", "A1_offset", "pump_offsets", "step_correction")
+SIGNATURE_MOTOR_KEYS = ("step_angle_degrees", "microsteps")
+
+# Table column for the end effector center (no pump)
+CENTER = "center"
+
+def config_signature(config):
+    """The parts of config a well table was generated for."""
+    signature = {key: config.get(key) for key in SIGNATURE_KEYS}
+    motor_settings = config.get('motor_settings') or {}
+    signature['motor_settings'] = {key: motor_settings.get(key) for key in SIGNATURE_MOTOR_KEYS}
+    return signature
+
+def pump_name(pump_key):
+    """
+    Normalizes a pump argument (None, 0, 2, "P2", "p2") to the name used in
+    config['pump_offsets'] ("p2"), or None for the end effector center.
+    """
+    if pump_key is None or pump_key == 0 or pump_key == "0":
+        return None
+    return f"p{pump_key}" if isinstance(pump_key, int) else str(pump_key).lower()
+
+def load_well_table(machine, path):
+    """
+    Reads a well table and returns it with a 'pump_index' column map added, or
+    None if the file is missing, malformed or generated for another configuration.
+    Without a table, well commands fall back to inverse kinematics.
+    """
+    try:
+        with open(path, "r") as f:
+            table = json.load(f)
+    except (OSError, ValueError) as e:
+        machine.log.info(f"No well table loaded ({e}). Wells will use IK.")
+        return None
+
+    if not isinstance(table, dict) or table.get("version") != WELL_TABLE_VERSION:
+        machine.log.warning("Well table has an unsupported version. Wells will use IK.")
+        return None
+    if table.get("signature") != config_signature(machine.config):
+        machine.log.warning("Well table was generated for a different configuration. Wells will use IK.")
+        return None
+
+    table["pump_index"] = {pump: i for i, pump in enumerate(table["pumps"])}
+    machine.log.info(f"Well table loaded: {len(table['wells'])} wells, source '{table.get('source')}'.")
+    return table
+
+def lookup_well_steps(table, well_str, pump_key=None):
+    """
+    Returns the absolute (m1, m2) steps that put the pump (or the center) over the
+    well, or None if there is no table or it has no entry for that well and pump.
+    """
+    if table is None or not isinstance(well_str, str):
+        return None
+    row = table["wells"].get(well_str.upper().strip())
+    if row is None:
+        return None
+    pump = pump_name(pump_key)
+    index = table["pump_index"].get(CENTER if pump is None else pump)
+    if index is None or row[2 * index] is None:
+        return None
+    return row[2 * index], row[2 * index + 1]
@@ -0,0 +1,298 @@
+# host/ai/plan_optimizer.py
+"""
+Reorders a plan's Sidekick visits to cut arm travel.
+
+LLM-written plans visit wells in whatever order the model wrote them, which
+often zigzags across the plate. The plan is split into groups: a positioning
+step ('to_well', 'move_to' or 'dispense_at') plus the steps that act at that
+position: 'dispense', and 'measure' or 'read_all' after a centered move (the
+colorimeter sits at the arm center). Every other step ('home', 'set_settings',
+'to_wells', ...) is a barrier that stays where it is, and no group moves
+across one. A measurement taken with a pump over the well reads some other
+spot, so it and the move before it stay in place as barriers too.
+
+Between barriers the groups are reordered by nearest neighbour and then 2-opt,
+costed with the firmware's move time model. Groups at the same well keep their
+original order, so a dispense still comes before the measurement of that
+well. Coordinate targets count as the well they are over; one that is not
+clearly over a well is a barrier, since its dependencies cannot be known.
+
+Costs use the nominal geometry from firmware/sidekick/config.py, so they are
+estimates of motion time only (no dispensing, settling or serial round trips).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+
+from host.kinematics import sidekick as host_kinematics
+from host.calibration.well_table import load_sidekick_module
+
+pump_name = load_sidekick_module("well_table").pump_name
+
+POSITIONING_COMMANDS = ("to_well", "move_to", "dispense_at")
+# Steps that act wherever the arm is and travel with the positioning step before them
+ATTACHED_STEPS = (("sidekick", "dispense"),)
+# As above, but only when the arm center (not a pump nozzle) is over the well
+CENTERED_STEPS = (("colorimeter", "measure"), ("colorimeter", "read_all"))
+# Sidekick steps after which the arm is somewhere the plan does not say
+UNTRACKED_MOVES = ("move_rel", "steps", "scan")
+
+class StepTargets:
+    """Motor step targets for plan steps, from the host kinematics."""
+
+    def __init__(self, config):
+        self.config = config
+        names, pumps, steps, valid = host_kinematics.well_steps(config)
+        self._well_names, self._well_x, self._well_y = host_kinematics.well_positions(config)
+        self._pitch = config['plate_geometry']['well_pitch_cm']
+        self._wells = {name: i for i, name in enumerate(names)}
+        self._pumps = {pump: i for i, pump in enumerate(pumps)}
+        self._steps = steps
+        self._valid = valid
+        homing = config['homing_settings']
+        self.park = self.for_point(homing['park_move_x'], homing['park_move_y'])
+
+    def for_well(self, well, pump=None):
+        """(m1, m2) that puts the pump (or the center) over the well, or None."""
+        row = self._wells.get(str(well).strip().upper())
+        column = self._pumps.get(pump_name(pump) or "center")
+        if row is None or column is None or not self._valid[row, column]:
+            return None
+        return tuple(int(s) for s in self._steps[row, column])
+
+    def well_at(self, x, y):
+        """The well whose center is within half a pitch of (x, y) cm, or None."""
+        distance = np.hypot(self._well_x - x, self._well_y - y)
+        nearest = int(np.argmin(distance))
+        return self._well_names[nearest] if distance[nearest] < self._pitch / 2 else None
+
+    def for_point(self, x, y, pump=None):
+        """(m1, m2) that puts the pump (or the center) over (x, y) cm, or None."""
+        name = pump_name(pump)
+        if name is not None:
+            offset = self.config['pump_offsets'].get(name)
+            if offset is None:
+                return None
+            x, y, ok = host_kinematics.pump_center_target(self.config, offset, np.array([x], dtype=float), np.array([y], dtype=float))
+            if not ok[0]:
+                return None
+        theta1, theta2, valid = host_kinematics.inverse_kinematics(self.config, np.atleast_1d(np.asarray(x, dtype=float)),
+                                                                   np.atleast_1d(np.asarray(y, dtype=float)))
+        if not valid[0]:
+            return None
+        m1, m2 = host_kinematics.degrees_to_steps(self.config, theta1, theta2)
+        return int(m1[0]), int(m2[0])
+
+    def for_step(self, step):
+        """
+        (well, (m1, m2), centered) for a positioning step, or None if it is not
+        one, its target cannot be resolved or its coordinates are not over a
+        well. centered is True when no pump nozzle is named.
+        """
+        if step.get('device') != "sidekick" or step.get('command') not in POSITIONING_COMMANDS:
+            return None
+        args = step.get('args') or {}
+        try:
+            pump = args.get('pump')
+            if 'well' in args:
+                key = str(args['well']).strip().upper()
+                steps = self.for_well(key, pump)
+            else:
+                x, y = float(args['x']), float(args['y'])
+                # The nozzle (or center) lands on (x, y), so that is the well touched
+                key = self.well_at(x, y)
+                steps = self.for_point(x, y, pump) if key is not None else None
+        except (KeyError, TypeError, ValueError):
+            return None
+        return None if steps is None else (key, steps, pump_name(pump) is None)
+
+def split_plan(plan, targets):
+    """
+    Splits a plan into segments of reorderable groups separated by barriers.
+    Returns a list of items: ('barrier', step) or ('groups', [group, ...]), where
+    each group is a dict with 'key', 'steps' (m1, m2), 'centered' and 'plan_steps'.
+    """
+    items = []
+    current = None
+    for step in plan:
+        target = targets.for_step(step)
+        if target is not None:
+            if current is None:
+                current = []
+                items.append(("groups", current))
+            current.append({"key": target[0], "steps": target[1], "centered": target[2], "plan_steps": [step]})
+        elif current and _attaches(step, current[-1]):
+            current[-1]['plan_steps'].append(step)
+        elif current and (step.get('device'), step.get('command')) in CENTERED_STEPS:
+            # Reads wherever the arm center is: pin the group it follows
+            pinned = current.pop()
+            if not current:
+                items.pop()
+            items.extend(("barrier", plan_step) for plan_step in pinned['plan_steps'] + [step])
+            current = None
+        else:
+            items.append(("barrier", step))
+            current = None
+    return items
+
+def _attaches(step, group):
+    kind = (step.get('device'), step.get('command'))
+    return kind in ATTACHED_STEPS or (kind in CENTERED_STEPS and group['centered'])
+
+def _position_after_barrier(step, position, targets):
+    """Where the arm is after a barrier step, or None if the plan cannot tell."""
+    if step.get('device') != "sidekick":
+        return position
+    command = step.get('command')
+    args = step.get('args') or {}
+    if command in POSITIONING_COMMANDS:
+        target = targets.for_step(step)
+        if target is not None:
+            return target[1]
+        if 'well' in args:
+            return None
+        # Coordinates away from the plate are still a known position
+        try:
+            return targets.for_point(float(args['x']), float(args['y']), args.get('pump'))
+        except (KeyError, TypeError, ValueError):
+            return None
+    if command in ("home", "home_if_needed"):
+        return targets.park
+    if command == "to_steps":
+        try:
+            return int(args['m1']), int(args['m2'])
+        except (KeyError, TypeError, ValueError):
+            return None
+    if command == "to_wells":
+        wells = args.get('wells') or []
+        if not wells:
+            return position
+        last = wells[-1]
+        if isinstance(last, dict):
+            return targets.for_well(last.get('well'), last.get('pump', args.get('pump')))
+        return targets.for_well(last, args.get('pump'))
+    if command in UNTRACKED_MOVES:
+        return None
+    return position
+
+def _path_cost(order, start_costs, costs):
+    """Travel time of visiting order from the start (start_costs) or, if None, from its first group."""
+    if not order:
+        return 0.0
+    total = start_costs[order[0]] if start_costs is not None else 0.0
+    for a, b in zip(order, order[1:]):
+        total += costs[a, b]
+    return float(total)
+
+def _nearest_neighbour(keys, start_costs, costs):
+    """Greedy visit order that only takes a group once every earlier group at its well is done."""
+    queues = {}
+    for index, key in enumerate(keys):
+        queues.setdefault(key, []).append(index)
+    order = []
+    last = None
+    while len(order) < len(keys):
+        available = sorted(queue[0] for queue in queues.values() if queue)
+        if last is not None:
+            row = costs[last]
+        elif start_costs is not None:
+            row = start_costs
+        else:
+            # No start position: begin where the plan did
+            row = np.zeros(len(keys))
+        # min() keeps the earliest group on a tie
+        last = min(available, key=lambda index: row[index])
+        queues[keys[last]].pop(0)
+        order.append(last)
+    return order
+
+def _two_opt(order, keys, start_costs, costs):
+    """
+    Reverses stretches of the order while that shortens the path. A stretch
+    holding two groups at the same well would swap them, so it is skipped.
+    """
+    order = list(order)
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            seen = {keys[order[i]]}
+            for j in range(i + 1, n):
+                if keys[order[j]] in seen:
+                    # Any longer stretch contains the same pair
+                    break
+                seen.add(keys[order[j]])
+                first, last = order[i], order[j]
+                if i > 0:
+                    before = costs[order[i - 1], last] - costs[order[i - 1], first]
+                elif start_costs is not None:
+                    before = start_costs[last] - start_costs[first]
+                else:
+                    before = 0.0
+                after = costs[first, order[j + 1]] - costs[last, order[j + 1]] if j + 1 < n else 0.0
+                if before + after < -1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+                    break
+    return order
+
+def optimize_groups(groups, start, config):
+    """
+    Visit order for one segment of groups, starting from start (m1, m2) or,
+    when start is None, from wherever the first group is. Returns
+    (order, original_s, optimized_s); the original order is kept unless the
+    new one is quicker.
+    """
+    keys = [group['key'] for group in groups]
+    positions = np.array([group['steps'] for group in groups], dtype=np.int64)
+    costs = host_kinematics.move_cost(config, positions[:, None], positions[None, :])
+    start_costs = host_kinematics.move_cost(config, np.array(start), positions) if start is not None else None
+
+    original = list(range(len(groups)))
+    original_s = _path_cost(original, start_costs, costs)
+    order = _two_opt(_nearest_neighbour(keys, start_costs, costs), keys, start_costs, costs)
+    optimized_s = _path_cost(order, start_costs, costs)
+    if optimized_s >= original_s:
+        return original, original_s, original_s
+    return order, original_s, optimized_s
+
+def optimize_plan(plan, config=None, start_steps=None):
+    """
+    Reorders the plan's visit groups to reduce Sidekick travel time.
+
+    Args:
+        plan (list): Plan steps ({'device', 'command', 'args'}).
+        config (dict): Sidekick SUBSYSTEM_CONFIG; read from the firmware when None.
+        start_steps (tuple): (m1, m2) where the arm starts, if known.
+
+    Returns:
+        (list, dict): The reordered plan and a report with 'groups', 'moved'
+        (groups whose position changed), 'original_s', 'optimized_s' and 'saved_s'.
+    """
+    config = config or host_kinematics.load_firmware_config()
+    targets = StepTargets(config)
+
+    new_plan = []
+    report = {"groups": 0, "moved": 0, "original_s": 0.0, "optimized_s": 0.0}
+    position = tuple(start_steps) if start_steps is not None else None
+    for kind, item in split_plan(plan, targets):
+        if kind == "barrier":
+            new_plan.append(item)
+            position = _position_after_barrier(item, position, targets)
+            continue
+        order, original_s, optimized_s = optimize_groups(item, position, config)
+        for group in (item[index] for index in order):
+            new_plan.extend(group['plan_steps'])
+        report['groups'] += len(item)
+        report['moved'] += sum(1 for slot, index in enumerate(order) if slot != index)
+        report['original_s'] += original_s
+        report['optimized_s'] += optimized_s
+        position = item[order[-1]]['steps']
+
+    report['saved_s'] = report['original_s'] - report['optimized_s']
+    return new_plan, report
@@ -3,6 +3,7 @@ import re
 import json
 from host.lab.sidekick_plate_manager import PlateManager
 from host.ai.vertext_agent import Agent
+from host.ai.plan_optimizer import optimize_plan
 from host.gui.console import C
 
 class Planner:
@@ -55,7 +56,7 @@ This is the real-time status of the 96-well plate.
   3. Use the 'colorimeter' to perform the measurement on that same well. The 'measure' command is preferred as it is a complete action.
 
 # 5. RULES
-- Always start a new sequence of movements with a 'sidekick' 'home' command.
+- Always start a new sequence of movements with a 'sidekick' 'home_if_needed' command. It only homes when the arm's position is not trusted. Use 'home' only if the user asks to re-home.
 - When dispensing a liquid, use the 'standard_dispense_ul' from the WORLD CONFIGURATION unless the user specifies a different volume.
 - When a well is needed and not specified by the user, you MUST select one from the 'empty_wells' list.
 - Before planning a dispense action, you MUST verify the target well has capacity.
@@ -67,7 +68,7 @@ Example of a valid response:
 [
   {{
     "device": "sidekick",
-    "command": "home",
+    "command": "home_if_needed",
     "args": {{}}
   }},
   {{
@@ -83,8 +84,11 @@ Based on all the information and workflow definitions above, generate a complete
 """
         return prompt
 
-    def create_plan(self, user_prompt: str):
-        # ... (This method remains unchanged)
+    def create_plan(self, user_prompt: str, optimize: bool = True):
+        """
+        Asks the LLM for a plan and validates it. With optimize, independent well
+        visits are then reordered to cut arm travel (see host.ai.plan_optimizer).
+        """
         if not self.world_model.get('reagents'):
             print(f"{C.ERR}[Planner] Cannot create a plan. No reagents have been defined in the world model.{C.END}")
             return None
@@ -109,6 +113,8 @@ Based on all the information and workflow definitions above, generate a complete
             
             if isinstance(plan, list) and all('device' in step and 'command' in step for step in plan):
                  print(f"{C.OK}[Planner] Plan generated and validated successfully.{C.END}")
+                 if optimize:
+                     plan = self._optimize(plan)
                  return plan
             else:
                 raise ValueError("Parsed JSON is not in the correct format (list of steps).")
@@ -117,4 +123,17 @@ Based on all the information and workflow definitions above, generate a complete
             print(f"{C.ERR}[Planner] Failed to parse a valid plan from the AI's response.{C.END}")
             print(f"  -> Error: {e}")
             print(f"  -> Raw AI Response:\n{response_text}")
-            return None
\ No newline at end of file
+            return None
+
+    def _optimize(self, plan):
+        """Reorders the plan's well visits and reports the estimated time saved."""
+        try:
+            optimized, report = optimize_plan(plan)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"{C.WARN}[Planner] Visit order left as generated: {e}{C.END}")
+            return plan
+        if report['moved']:
+            print(f"{C.INFO}[Planner] Reordered {report['moved']} of {report['groups']} well visits: "
+                  f"est. arm travel {report['original_s']:.1f} s -> {report['optimized_s']:.1f} s "
+                  f"(saves {report['saved_s']:.1f} s).{C.END}")
+        return optimized
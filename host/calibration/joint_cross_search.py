@@ -3,14 +3,14 @@ import time
 import argparse
 import json
 from pathlib import Path
-import queue
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 # Project root setup
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
 
-from host.core.device_manager import DeviceManager
-from shared_lib.messages import Message
+from host.core.device_manager import DeviceManager, DeviceProblemError, INCOMING_QUEUE_SIZE
+from host.calibration.scan import run_scan
 from host.firmware_db import get_device_name
 from host.gui.console import C
 
@@ -26,47 +26,29 @@ def find_devices(manager: DeviceManager):
     return devices
 
 def send_and_wait(manager, port, payload, wait_for_status="SUCCESS", timeout=30):
-    msg = Message("TEST_SCRIPT", "INSTRUCTION", payload=payload)
-    manager.send_message(port, msg)
-    
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            msg_type, msg_port, msg_data = manager.incoming_message_queue.get(timeout=0.1)
-            if msg_port == port:
-                if msg_data.status == wait_for_status:
-                    return msg_data.payload
-                elif msg_data.status == "PROBLEM":
-                    print(f"{C.ERR}Device Problem: {msg_data.payload}{C.END}")
-                    return None
-        except queue.Empty:
-            continue
-    print(f"{C.ERR}Timeout waiting for {wait_for_status} on {port}{C.END}")
-    return None
-
-def get_current_steps(manager, sidekick_port):
-    """Queries Sidekick for current absolute steps."""
-    resp = send_and_wait(manager, sidekick_port, {"func": "get_info"}, "DATA_RESPONSE")
-    if resp and 'data' in resp:
-        return resp['data'].get('raw_motor_steps', {'m1': 0, 'm2': 0})
-    return None
+    future = manager.request(port, payload, expect=wait_for_status, subsystem_name="TEST_SCRIPT")
+    try:
+        return future.result(timeout=timeout).payload
+    except DeviceProblemError as e:
+        print(f"{C.ERR}Device Problem: {e.message.payload}{C.END}")
+        return None
+    except FutureTimeoutError:
+        future.cancel()
+        print(f"{C.ERR}Timeout waiting for {wait_for_status} on {port}{C.END}")
+        return None
+    except ConnectionError as e:
+        print(f"{C.ERR}{e}{C.END}")
+        return None
 
 def move_to_absolute_steps(manager, port, target_m1, target_m2):
     """
-    Calculates the relative delta needed to reach an absolute step position
-    and executes the move using the 'steps' command.
+    Moves to an absolute step position with the 'to_steps' command. The move is
+    skipped when the host's tracked position says the arm is already there.
     """
-    current = get_current_steps(manager, port)
-    if not current: return False
-
-    d_m1 = int(target_m1) - int(current['m1'])
-    d_m2 = int(target_m2) - int(current['m2'])
-    
-    if d_m1 == 0 and d_m2 == 0:
+    target = (int(target_m1), int(target_m2))
+    if manager.devices[port].position_steps == target:
         return True
-
-    # print(f"  -> Moving {d_m1}, {d_m2} steps...")
-    return send_and_wait(manager, port, {"func": "steps", "args": {"m1": d_m1, "m2": d_m2}})
+    return send_and_wait(manager, port, {"func": "to_steps", "args": {"m1": target[0], "m2": target[1]}})
 
 def scan_joint(manager, sk_port, cm_port, joint_name, start_m1, start_m2, range_steps, step_size):
     """
@@ -78,19 +60,15 @@ def scan_joint(manager, sk_port, cm_port, joint_name, start_m1, start_m2, range_
     # Generate the list of target offsets relative to the center
     # e.g., if range=100, step=10 -> -100, -90, ... 0 ... 90, 100
     offsets = list(range(-range_steps, range_steps + 1, step_size))
+    points = [(start_m1 + (offset if joint_name == 'm1' else 0), start_m2 + (offset if joint_name == 'm2' else 0))
+              for offset in offsets]
     
     print(f"\n{C.INFO}Scanning {joint_name.upper()}... ({len(offsets)} points){C.END}")
     
-    for offset in offsets:
-        # Calculate target absolute positions
-        target_m1 = start_m1 + (offset if joint_name == 'm1' else 0)
-        target_m2 = start_m2 + (offset if joint_name == 'm2' else 0)
-        
-        # 1. Move
-        if not move_to_absolute_steps(manager, sk_port, target_m1, target_m2):
-            print("Move failed."); break
-            
-        # 2. Measure
+    def measure_point(index, target_m1, target_m2):
+        # The Sidekick holds at this point until released
+        offset = offsets[index]
+        # Measure
         resp = send_and_wait(manager, cm_port, {"func": "measure", "args": {}}, "DATA_RESPONSE")
         intensity = 0
         if resp and 'data' in resp:
@@ -105,6 +83,12 @@ def scan_joint(manager, sk_port, cm_port, joint_name, start_m1, start_m2, range_
             "intensity": intensity
         })
 
+    # The Sidekick walks every point from one 'scan' instruction
+    try:
+        run_scan(manager, sk_port, points, measure_point, subsystem_name="TEST_SCRIPT")
+    except (DeviceProblemError, FutureTimeoutError, ConnectionError) as e:
+        print(f"Scan failed: {e}")
+
     return results
 
 def find_valley_center(data):
@@ -134,9 +118,11 @@ def main():
     parser.add_argument("--step", type=int, default=10, help="Step size steps (default 10)")
     parser.add_argument("--max_iterations", type=int, default=1, help="Max iterations to refine center (default 1)")
     parser.add_argument("--output", type=str, default="joint_search_result.json")
+    parser.add_argument("--rehome", action="store_true", help="Home even if the Sidekick's position is still trusted.")
     args = parser.parse_args()
 
-    manager = DeviceManager()
+    # Only request() is used, so nothing drains the incoming queue
+    manager = DeviceManager(incoming_queue_size=INCOMING_QUEUE_SIZE)
     manager.start()
     
     try:
@@ -152,7 +138,7 @@ def main():
 
         # 1. Home first to establish coordinate system
         print(f"\n{C.INFO}Homing Sidekick...{C.END}")
-        send_and_wait(manager, sk, {"func": "home"}, timeout=20)
+        send_and_wait(manager, sk, {"func": "home" if args.rehome else "home_if_needed"}, timeout=20)
 
         # 2. Set Gain on Colorimeter
         print(f"\n{C.INFO}Setting Colorimeter Gain to 64x and intensity to 10 mA...{C.END}")
@@ -185,10 +171,6 @@ def main():
             # Update best M1 immediately
             current_best_m1 = best_m1 
             
-            # Move to center of M1 valley to prepare for M2 scan
-            print(f"Centering M1 on {current_best_m1}...")
-            move_to_absolute_steps(manager, sk, current_best_m1, current_best_m2)
-
             # --- Scan M2 (keeping M1 fixed at new best) ---
             m2_data = scan_joint(manager, sk, cm, 'm2', current_best_m1, current_best_m2, args.range, args.step)
             _, best_m2 = find_valley_center(m2_data)
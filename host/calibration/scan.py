@@ -0,0 +1,47 @@
+# host/calibration/scan.py
+"""
+Host side of the Sidekick 'scan' command. The arm walks a list of absolute step
+positions on its own and holds at each one while the host takes a measurement,
+so a point costs one 'scan_point' notification and one one-way 'scan_next'
+instead of get_info + steps round trips.
+"""
+from concurrent.futures import wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+
+from shared_lib.messages import Message
+
+def is_scan_point(message: Message) -> bool:
+    """True for the TELEMETRY message the Sidekick sends on arrival at a scan point."""
+    payload = message.payload if isinstance(message.payload, dict) else {}
+    return message.status == "TELEMETRY" and payload.get("metadata", {}).get("data_type") == "scan_point"
+
+def run_scan(manager, port, points, at_point, timeout=30.0, subsystem_name="HOST"):
+    """
+    Moves the Sidekick on port through points ([m1, m2] absolute steps) with one
+    'scan' instruction. at_point(index, m1, m2) is called at each arrival, while the
+    arm holds, and its return values are returned in order.
+
+    Raises DeviceProblemError if the device aborts the scan and
+    concurrent.futures.TimeoutError if no arrival is reported within timeout seconds.
+    """
+    results = []
+    arrival = manager.wait_for(port, is_scan_point)
+    scan = manager.request(port, {"func": "scan", "args": {"points": [list(point) for point in points], "timeout": timeout}},
+                           subsystem_name=subsystem_name)
+    try:
+        for _ in points:
+            done, _not_done = wait((arrival, scan), timeout=timeout, return_when=FIRST_COMPLETED)
+            if arrival not in done:
+                if scan in done:
+                    scan.result() # Raises the device's PROBLEM
+                    raise RuntimeError("Scan finished before every point was reported.")
+                raise FutureTimeoutError(f"No scan point reported by {port} within {timeout} s.")
+            data = arrival.result().payload["data"]
+            results.append(at_point(data["index"], data["m1"], data["m2"]))
+            # Watch for the next arrival before releasing the arm toward it
+            arrival = manager.wait_for(port, is_scan_point)
+            manager.send_message(port, Message(subsystem_name, "INSTRUCTION", payload={"func": "scan_next"}))
+        scan.result(timeout=timeout)
+    finally:
+        arrival.cancel()
+        scan.cancel()
+    return results
@@ -4,15 +4,15 @@ import time
 import argparse
 import json
 from pathlib import Path
-import queue
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 
 # Project root setup
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(PROJECT_ROOT))
 
-from host.core.device_manager import DeviceManager
-from shared_lib.messages import Message
+from host.core.device_manager import DeviceManager, DeviceProblemError, INCOMING_QUEUE_SIZE
+from host.calibration.scan import run_scan
 from host.firmware_db import get_device_name
 from host.gui.console import C
 
@@ -36,48 +36,30 @@ def find_devices(manager: DeviceManager):
 
 def send_and_wait(manager, port, payload, wait_for_status="SUCCESS", timeout=30):
     """Sends a command and waits for a specific response status."""
-    msg = Message("TRANSECT_SCRIPT", "INSTRUCTION", payload=payload)
-    manager.send_message(port, msg)
-    
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            msg_type, msg_port, msg_data = manager.incoming_message_queue.get(timeout=0.1)
-            if msg_port == port:
-                if msg_data.status == wait_for_status:
-                    return msg_data.payload
-                elif msg_data.status == "PROBLEM":
-                    print(f"{C.ERR}Device Problem: {msg_data.payload}{C.END}")
-                    return None
-        except queue.Empty:
-            continue
-    print(f"{C.ERR}Timeout waiting for {wait_for_status} on {port}{C.END}")
-    return None
+    future = manager.request(port, payload, expect=wait_for_status, subsystem_name="TRANSECT_SCRIPT")
+    try:
+        return future.result(timeout=timeout).payload
+    except DeviceProblemError as e:
+        print(f"{C.ERR}Device Problem: {e.message.payload}{C.END}")
+        return None
+    except FutureTimeoutError:
+        future.cancel()
+        print(f"{C.ERR}Timeout waiting for {wait_for_status} on {port}{C.END}")
+        return None
+    except ConnectionError as e:
+        print(f"{C.ERR}{e}{C.END}")
+        return None
 
 def get_current_steps(manager, sidekick_port):
-    """Queries Sidekick for current absolute steps."""
+    """Returns the Sidekick's absolute steps, asking with get_info only if the host is not tracking them."""
+    known = manager.devices[sidekick_port].position_steps
+    if known is not None:
+        return {'m1': known[0], 'm2': known[1]}
     resp = send_and_wait(manager, sidekick_port, {"func": "get_info"}, "DATA_RESPONSE")
     if resp and 'data' in resp:
         return resp['data'].get('raw_motor_steps', {'m1': 0, 'm2': 0})
     return None
 
-def move_to_absolute_steps(manager, port, target_m1, target_m2):
-    """
-    Calculates the relative delta needed to reach an absolute step position
-    and executes the move using the 'steps' command.
-    """
-    current = get_current_steps(manager, port)
-    if not current: return False
-
-    d_m1 = int(target_m1) - int(current['m1'])
-    d_m2 = int(target_m2) - int(current['m2'])
-    
-    if d_m1 == 0 and d_m2 == 0:
-        return True
-
-    # print(f"  -> Moving delta: {d_m1}, {d_m2}")
-    return send_and_wait(manager, port, {"func": "steps", "args": {"m1": d_m1, "m2": d_m2}})
-
 def run_transect(manager, sk_port, cm_port, axis, center_m1, center_m2, range_steps, step_size):
     """
     Performs a linear scan along one axis (m1 or m2) centered on the provided coordinates.
@@ -87,20 +69,15 @@ def run_transect(manager, sk_port, cm_port, axis, center_m1, center_m2, range_st
     
     # Generate offsets: -range ... 0 ... +range
     offsets = list(range(-range_steps, range_steps + 1, step_size))
+    points = [(center_m1 + (offset if axis == 'm1' else 0), center_m2 + (offset if axis == 'm2' else 0))
+              for offset in offsets]
     
     print(f"\n{C.INFO}Starting {axis.upper()} Transect around ({center_m1}, {center_m2})...{C.END}")
     
-    for offset in offsets:
-        # Calculate target position for this step
-        target_m1 = center_m1 + (offset if axis == 'm1' else 0)
-        target_m2 = center_m2 + (offset if axis == 'm2' else 0)
-        
-        # 1. Move Sidekick
-        if not move_to_absolute_steps(manager, sk_port, target_m1, target_m2):
-            print(f"{C.ERR}Move failed at offset {offset}. Aborting transect.{C.END}")
-            break
-            
-        # 2. Measure Colorimeter
+    def measure_point(index, target_m1, target_m2):
+        # The Sidekick has moved itself to this point and holds until we release it
+        offset = offsets[index]
+        # Measure Colorimeter
         # We wait for DATA_RESPONSE which contains the full spectrum
         resp = send_and_wait(manager, cm_port, {"func": "measure", "args": {}}, "DATA_RESPONSE")
         
@@ -120,6 +97,14 @@ def run_transect(manager, sk_port, cm_port, axis, center_m1, center_m2, range_st
             "spectral_data": scan_data
         })
 
+    # One 'scan' instruction walks every point; no get_info/steps round trips per point
+    try:
+        run_scan(manager, sk_port, points, measure_point, subsystem_name="TRANSECT_SCRIPT")
+    except DeviceProblemError as e:
+        print(f"{C.ERR}Scan aborted by device: {e.message.payload}. Keeping {len(results)} points.{C.END}")
+    except (FutureTimeoutError, ConnectionError) as e:
+        print(f"{C.ERR}{e} Keeping {len(results)} points.{C.END}")
+
     return results
 
 def main():
@@ -128,6 +113,7 @@ def main():
     parser.add_argument("--range", type=int, default=10, help="Scan range +/- steps (default 10).")
     parser.add_argument("--step", type=int, default=1, help="Step size in steps (default 1).")
     parser.add_argument("--output", type=str, default=None, help="Output JSON filename.")
+    parser.add_argument("--rehome", action="store_true", help="Home even if the Sidekick's position is still trusted.")
     args = parser.parse_args()
 
     # Generate default filename if not provided
@@ -135,7 +121,8 @@ def main():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         args.output = f"transect_{args.well}_{timestamp}.json"
 
-    manager = DeviceManager()
+    # Only request() is used, so nothing drains the incoming queue
+    manager = DeviceManager(incoming_queue_size=INCOMING_QUEUE_SIZE)
     manager.start()
     
     try:
@@ -151,7 +138,7 @@ def main():
 
         # 1. Home
         print(f"\n{C.INFO}Homing Sidekick...{C.END}")
-        if not send_and_wait(manager, sk, {"func": "home"}, timeout=30):
+        if not send_and_wait(manager, sk, {"func": "home" if args.rehome else "home_if_needed"}, timeout=30):
             print("Homing failed."); return
 
         # 2. Go to Well
@@ -172,14 +159,10 @@ def main():
         # 4. Perform M1 Transect
         m1_data = run_transect(manager, sk, cm, 'm1', center_m1, center_m2, args.range, args.step)
 
-        # 5. Return to Center (Critical for M2 scan validity)
-        print(f"\n{C.INFO}Returning to center ({center_m1}, {center_m2})...{C.END}")
-        move_to_absolute_steps(manager, sk, center_m1, center_m2)
-
-        # 6. Perform M2 Transect
+        # 5. Perform M2 Transect (scan points are absolute, so no return to center is needed)
         m2_data = run_transect(manager, sk, cm, 'm2', center_m1, center_m2, args.range, args.step)
 
-        # 7. Save Data
+        # 6. Save Data
         final_output = {
             "target_well": args.well,
             "center_steps": {"m1": center_m1, "m2": center_m2},
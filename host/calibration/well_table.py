@@ -0,0 +1,162 @@
+# host/calibration/well_table.py
+"""
+Generates the Sidekick's well -> motor step table (firmware/sidekick/well_table.json).
+
+For every well on the plate and every pump (plus the end effector center) the
+table holds the absolute (m1, m2) steps that put that nozzle over the well, so
+the device answers 'to_well' with a lookup instead of parsing and two-pass IK.
+Steps come from the firmware's own kinematics, or from the affine transform in
+sidekick_calibration.json when --calibration is given (pump offsets still use IK).
+Copy the output next to the firmware's __init__.py; the device ignores it if the
+configuration changes.
+"""
+import sys
+import json
+import logging
+import argparse
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+# Project root setup
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+
+SIDEKICK_DIR = PROJECT_ROOT / "firmware" / "sidekick"
+
+def load_sidekick_module(name):
+    """
+    Imports firmware/sidekick/<name>.py on its own. The package __init__ needs
+    CircuitPython's 'board', so board-free modules are loaded from their files.
+    """
+    spec = importlib.util.spec_from_file_location(f"sidekick_{name}", SIDEKICK_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+kinematics = load_sidekick_module("kinematics")
+well_table = load_sidekick_module("well_table")
+
+def _solve3(a, b):
+    """Solves the 3x3 system a @ x = b by Cramer's rule."""
+    def det(m):
+        return (m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1])
+                - m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0])
+                + m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]))
+    d = det(a)
+    if abs(d) < 1e-12:
+        raise ValueError("Calibration reference wells must not lie on one line.")
+    return [det([row[:i] + [b[r]] + row[i + 1:] for r, row in enumerate(a)]) / d for i in range(3)]
+
+def load_calibration(path, rows):
+    """
+    Reads a calibration file (e.g. sidekick_calibration.json) and returns a
+    function (row_idx, col_idx) -> (m1, m2) float steps for the end effector center.
+
+    The file's 'transformation_matrix' maps [x, y, 1] cm in the calibration's own
+    plate frame to steps. That frame is recovered from the 'reference_points'
+    (well, goal_coords_cm) by least squares, so the table reproduces the measured
+    steps at the reference wells whatever axes the firmware config uses.
+    """
+    with open(path, "r") as f:
+        calibration = json.load(f)
+    matrix = calibration["transformation_matrix"]
+    if len(matrix) != 2 or any(len(row) != 3 for row in matrix):
+        raise ValueError(f"{path}: 'transformation_matrix' must be 2x3.")
+
+    # Fit goal = origin + row_idx * row_vector + col_idx * col_vector per axis
+    normal = [[0.0] * 3 for _ in range(3)]
+    rhs = [[0.0] * 3 for _ in range(2)]
+    for point in calibration["reference_points"]:
+        well = point["well"].upper()
+        basis = [1.0, float(rows.index(well[0])), float(int(well[1:]) - 1)]
+        for i in range(3):
+            for j in range(3):
+                normal[i][j] += basis[i] * basis[j]
+            for axis in range(2):
+                rhs[axis][i] += basis[i] * point["goal_coords_cm"][axis]
+    frame = [_solve3(normal, rhs[axis]) for axis in range(2)]
+
+    def well_steps(row_idx, col_idx):
+        x, y = (c0 + c1 * row_idx + c2 * col_idx for c0, c1, c2 in frame)
+        return tuple(m[0] * x + m[1] * y + m[2] for m in matrix)
+    return well_steps
+
+def build_well_table(config, calibration=None, source_name=None):
+    """
+    Builds the well table for a Sidekick configuration, using the firmware's own
+    well_to_world placement, pump offset correction and IK.
+
+    With calibration (from load_calibration) the center column comes from the
+    calibration instead, and each pump column adds the IK step difference between
+    that pump and the center at the same well. Entries the IK cannot reach are
+    None, so the device falls back to IK for them and reports the failure.
+    """
+    log = logging.getLogger("well_table")
+    machine = SimpleNamespace(config=config, log=log,
+                              flags={"current_m1_steps": 0, "current_m2_steps": 0})
+    plate = config["plate_geometry"]
+    pitch = plate["well_pitch_cm"]
+    a1_offset = config.get("A1_offset", {"dx": 0, "dy": 0})
+    pumps = [well_table.CENTER] + sorted(config["pump_offsets"])
+
+    def ik_steps(x, y):
+        angles = kinematics.inverse_kinematics(machine, x, y)
+        return None if angles is None else kinematics.degrees_to_steps(machine, *angles)
+
+    wells = {}
+    for row_idx, row in enumerate(plate["rows"]):
+        for col_idx in range(plate["columns"]):
+            # Same axes as the firmware's well_to_world: x = rows, y = columns
+            x = row_idx * pitch + a1_offset["dx"]
+            y = col_idx * pitch + a1_offset["dy"]
+            center_steps = ik_steps(x, y)
+            entry = []
+            for pump in pumps:
+                if pump == well_table.CENTER:
+                    steps = center_steps
+                else:
+                    target = kinematics.pump_center_target(machine, config["pump_offsets"][pump], x, y)
+                    steps = None if target is None else ik_steps(*target)
+                if steps is not None and calibration is not None:
+                    if center_steps is None:
+                        steps = None
+                    else:
+                        m1, m2 = calibration(row_idx, col_idx)
+                        steps = (round(m1 + steps[0] - center_steps[0]), round(m2 + steps[1] - center_steps[1]))
+                entry.extend(steps if steps is not None else (None, None))
+            wells[f"{row}{col_idx + 1}"] = entry
+
+    return {
+        "version": well_table.WELL_TABLE_VERSION,
+        "source": source_name or ("calibration" if calibration is not None else "ik"),
+        "generated": datetime.now(timezone.utc).isoformat(),
+        "signature": well_table.config_signature(config),
+        "pumps": pumps,
+        "wells": wells,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the Sidekick well -> steps lookup table.")
+    parser.add_argument("--calibration", type=Path, default=None,
+                        help="Calibration JSON with a 'transformation_matrix' (e.g. sidekick_calibration.json). Default: firmware IK.")
+    parser.add_argument("--output", type=Path, default=SIDEKICK_DIR / well_table.WELL_TABLE_FILE,
+                        help="Where to write the table (default: firmware/sidekick/well_table.json).")
+    args = parser.parse_args()
+
+    config = load_sidekick_module("config").SUBSYSTEM_CONFIG
+    calibration = load_calibration(args.calibration, config["plate_geometry"]["rows"]) if args.calibration else None
+    table = build_well_table(config, calibration,
+                             source_name=f"calibration:{args.calibration.name}" if calibration else None)
+
+    missing = [well for well, entry in table["wells"].items() if None in entry]
+    # Compact separators: the table is parsed on the microcontroller
+    with open(args.output, "w") as f:
+        json.dump(table, f, separators=(",", ":"))
+    print(f"Wrote {len(table['wells'])} wells x {len(table['pumps'])} targets to {args.output} (source: {table['source']}).")
+    if missing:
+        print(f"Unreachable entries (device will use IK and report them): {', '.join(missing)}")
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,13 @@ class Device:
     Represents the state and communication channel for a single connected instrument.
     This is the 'Model' in our MVC architecture. It is UI-agnostic.
     """
-    def __init__(self, port, vid, pid):
+    def __init__(self, port, vid, pid, framing="line", coalesce_latency=None):
         # --- Core Identity ---
         self.port = port
         self.vid = vid
         self.pid = pid
+        self.framing = framing  # Must match the firmware's postman (see communicate/framing.py)
+        self.coalesce_latency = coalesce_latency  # Seconds to hold outgoing messages for one write; None sends at once
         self.postman = None
         
         # --- State Attributes (using standard Python types) ---
@@ -27,13 +29,18 @@ class Device:
         self.status_info = {}
         self.supported_commands = {}
         self.last_telemetry = {} # <-- ADDED: To store the most recent telemetry payload
+        # --- Position tracking (firmware that reports 'steps', e.g. the Sidekick) ---
+        self.position_steps = None     # Last reported absolute (m1, m2); None when unknown
+        self.homing_generation = None  # Homing count the position belongs to
 
     def connect(self):
         """Creates and opens the serial postman for this device."""
         if self.is_connected:
             return True
         try:
-            params = {"protocol": "serial", "port": self.port, "baudrate": 115200, "timeout": 0.1}
+            params = {"protocol": "serial", "port": self.port, "baudrate": 115200, "timeout": 0.1, "framing": self.framing}
+            if self.coalesce_latency is not None:
+                params.update(coalesce=True, max_latency=self.coalesce_latency)
             self.postman = SerialPostman(params)
             self.postman.open_channel()
             self.postman.channel.reset_input_buffer()
@@ -57,7 +64,31 @@ class Device:
         """Sends a message using this device's postman."""
         if not self.is_connected:
             raise RuntimeError("Cannot send message, device is not connected.")
-        self.postman.send(message.serialize())
+        self.postman.send_message(message)
+        if message.status == "INSTRUCTION" and isinstance(message.payload, dict) \
+                and message.payload.get("func") in ("home", "home_if_needed"):
+            # Homing redefines the coordinate system; wait for the device to report
+            # again (a skipped home_if_needed reports the unchanged position at once)
+            self.position_steps = None
+
+    def track_position(self, msg: Message):
+        """
+        Records the absolute step position carried by SUCCESS, DATA_RESPONSE and
+        TELEMETRY messages ('steps' or get_info's 'raw_motor_steps', with
+        'homing_generation'). Messages without a position are ignored.
+        """
+        payload = msg.payload if isinstance(msg.payload, dict) else {}
+        data = payload.get('data')
+        if not isinstance(data, dict):
+            return
+        steps = data.get('steps') or data.get('raw_motor_steps')
+        if not isinstance(steps, dict) or 'm1' not in steps or 'm2' not in steps:
+            return
+        generation = data.get('homing_generation')
+        if generation is not None and self.homing_generation is not None and generation != self.homing_generation:
+            log.info(f"[{self.port}] Homing generation changed {self.homing_generation} -> {generation}.")
+        self.position_steps = (int(steps['m1']), int(steps['m2']))
+        self.homing_generation = generation
 
     # --- REVISED METHOD ---
     def update_from_message(self, msg: Message):
@@ -1,35 +1,137 @@
 import threading
 import queue
 import time
+import selectors
+import socket
+import sys
+import asyncio
+from collections import deque
+from concurrent.futures import Future
 from .device import Device # <-- IMPORT THE NEW CLASS
 from host.core.discovery import find_data_comports
 from shared_lib.messages import Message
-import json
+from communicate.wire_codec import decode_message, CODEC_NAMES
+from communicate.framing import FRAMINGS
 import logging
 
 log = logging.getLogger(__name__)
 
+# Supported ways of listening to connected devices:
+#   'threaded' - one polling listener thread per device (original behavior)
+#   'reactor'  - a single selector thread that wakes only when a port has bytes
+IO_MODES = ("threaded", "reactor")
+
+# Statuses that end an INSTRUCTION's exchange with a device (see messaging.md)
+RESPONSE_STATUSES = ("SUCCESS", "DATA_RESPONSE", "PROBLEM")
+
+# A limit on incoming_message_queue for callers that never drain it (scripts that
+# only use request()). The queue is unbounded unless a limit is asked for.
+INCOMING_QUEUE_SIZE = 1000
+
+class DeviceProblemError(Exception):
+    """Raised through a request Future when the device answers with PROBLEM."""
+    def __init__(self, port: str, message: Message):
+        self.port = port
+        self.message = message
+        super().__init__(f"[{port}] {message.payload}")
+
+class PendingRequest:
+    """Bookkeeping for one INSTRUCTION sent with DeviceManager.request()."""
+    def __init__(self, request_id: str, expect: tuple, future: Future):
+        self.request_id = request_id
+        self.expect = expect
+        self.future = future
+
+class CreditWindow:
+    """
+    Host side of credit-based flow control for one device (see messaging.md).
+
+    The device reports 'credit' (free inbox slots) and 'rx' (instructions it has
+    received) in the meta of every message. Instructions are written only while
+    the number in flight (sent - rx) is below credit; the rest wait in 'held'.
+    Devices that never report credit are not limited.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.sent = 0      # INSTRUCTIONs written to the device
+        self.rx = 0        # INSTRUCTIONs the device reports having received
+        self.credit = 0    # Free inbox slots at the device's last report
+        self.held = deque()
+
+    def can_send(self) -> bool:
+        return not self.enabled or self.sent - self.rx < self.credit
+
+    def update(self, meta: dict):
+        credit = meta.get("credit")
+        rx = meta.get("rx")
+        if credit is None or rx is None:
+            return
+        if not self.enabled or rx < self.rx or rx > self.sent:
+            # First report, a device reboot, or instructions we did not count: resync
+            self.sent = rx
+        self.enabled = True
+        self.credit = credit
+        self.rx = rx
+
 class DeviceManager:
     """
     Manages the lifecycle of Device objects and routes messages to them.
     This is the 'Controller' in our MVC architecture.
     """
-    def __init__(self):
+    def __init__(self, io_mode: str = "threaded", framing: str = "line", coalesce_latency: float = None,
+                 incoming_queue_size: int = None):
+        if io_mode not in IO_MODES:
+            raise ValueError(f"io_mode must be one of {IO_MODES}, not '{io_mode}'")
+        if framing not in FRAMINGS:
+            raise ValueError(f"framing must be one of {FRAMINGS}, not '{framing}'")
+        # Framing is static: it has to match what the firmware was deployed with
+        self.framing = framing
+        # When set, instructions sent within this many seconds share one USB write
+        self.coalesce_latency = coalesce_latency
+        if io_mode == "reactor" and sys.platform == "win32":
+            # Serial handles on Windows cannot be waited on with select().
+            log.warning("Reactor I/O is not available on Windows. Falling back to threaded listeners.")
+            io_mode = "threaded"
+        self.io_mode = io_mode
+
         self.devices = {}  # {port: Device object}
         self.listener_threads = {}
         self.stop_events = {}
-        self.incoming_message_queue = queue.Queue()
-        
+        # When a size is given, the oldest entries are dropped (and counted) once it is full
+        self.incoming_message_queue = queue.Queue(maxsize=incoming_queue_size or 0)
+        self.dropped_messages = 0
+
+        # --- Outstanding request() calls, oldest first: {port: [PendingRequest, ...]} ---
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        # --- Outstanding wait_for() calls: {port: [(predicate, Future), ...]} ---
+        self._watchers = {}
+
+        # --- Flow control: {port: CreditWindow} ---
+        self._credit = {}
+        self._credit_lock = threading.Lock()
+
+        # --- Reactor mode resources (created by start()) ---
+        self._selector = None
+        self._reactor_thread = None
+        self._reactor_stop = threading.Event()
+        self._reactor_lock = threading.Lock()
+        self._wakeup_recv = None
+        self._wakeup_send = None
+
 
     def start(self):
         """Starts the message processing thread."""
-
-        log.info("DeviceManager started")
+        if self.io_mode == "reactor":
+            self._start_reactor()
+        log.info(f"DeviceManager started ({self.io_mode} I/O)")
 
     def stop(self):
         """Stops all threads and disconnects all devices."""
         log.info("DeviceManager stopping...")
         self.disconnect_all()
+        if self.io_mode == "reactor":
+            self._stop_reactor()
         log.info("DeviceManager stopped.")
 
     def scan_for_devices(self):
@@ -42,14 +144,19 @@ class DeviceManager:
             return
 
         log.info(f"Creating device model for {port}...")
-        device = Device(port, vid, pid)
-        
+        device = Device(port, vid, pid, framing=self.framing, coalesce_latency=self.coalesce_latency)
+
         if device.connect():
             self.devices[port] = device
+            with self._credit_lock:
+                self._credit[port] = CreditWindow()
+            if self.io_mode == "reactor":
+                self._register_device(device)
+                return True
             stop_event = threading.Event()
             thread = threading.Thread(
-                target=self._listen_for_messages, 
-                args=(device, stop_event), 
+                target=self._listen_for_messages,
+                args=(device, stop_event),
                 daemon=True
             )
             self.stop_events[port] = stop_event
@@ -64,13 +171,21 @@ class DeviceManager:
             return
 
         log.info(f"Disconnecting from {port}...")
-        self.stop_events[port].set()
-        self.listener_threads[port].join(timeout=2)
+        if self.io_mode == "reactor":
+            self._unregister_device(self.devices[port])
+        else:
+            self.stop_events[port].set()
+            # A future callback on the listener's own thread may disconnect its device
+            if self.listener_threads[port] is not threading.current_thread():
+                self.listener_threads[port].join(timeout=2)
+            del self.listener_threads[port]
+            del self.stop_events[port]
         self.devices[port].disconnect()
-        
+        with self._credit_lock:
+            self._credit.pop(port, None)
+        self._fail_pending(port, ConnectionError(f"Device on {port} was disconnected."))
+
         del self.devices[port]
-        del self.listener_threads[port]
-        del self.stop_events[port]
         log.info(f"Disconnected and cleaned up resources for {port}.")
 
     def disconnect_all(self):
@@ -78,32 +193,362 @@ class DeviceManager:
             self.disconnect_device(port)
 
     def send_message(self, port: str, message: Message):
+        """
+        Sends a message to a device. Returns True if it was written to the port,
+        or held until the device has inbox credit for it (INSTRUCTIONs only).
+        """
         if port not in self.devices:
             log.error(f"Cannot send message. No device at {port}.")
-            return
-            
+            return False
+        if message.status != "INSTRUCTION":
+            return self._write_message(port, message)
+
+        with self._credit_lock:
+            window = self._credit.get(port)
+            if window is None:
+                return self._write_message(port, message)
+            if window.held or not window.can_send():
+                # Keep order: nothing overtakes an instruction already waiting
+                window.held.append(message)
+                log.debug(f"Holding instruction for {port} until it has credit ({len(window.held)} held).")
+                return True
+            window.sent += 1
+            if self._write_message(port, message):
+                return True
+            window.sent -= 1
+            return False
+
+    def _write_message(self, port: str, message: Message):
+        """Writes a message to a device's port now. Returns True on success."""
         try:
             device = self.devices[port]
             device.send_message(message)
-            self.incoming_message_queue.put(('SENT', port, message))
+            self._queue_incoming(('SENT', port, message))
+            return True
         except Exception as e:
             log.error(f"Failed to send message to {port}: {e}")
+            return False
+
+    def request(self, port: str, payload: dict, expect="SUCCESS", subsystem_name: str = "HOST") -> Future:
+        """
+        Sends an INSTRUCTION and returns a Future that resolves with the device's answer.
+
+        Args:
+            port: The port of a connected device.
+            payload: The instruction payload, e.g. {"func": "to_well", "args": {"well": "A1"}}.
+            expect: A status (or tuple of statuses) that completes the request,
+                    e.g. "SUCCESS" or ("SUCCESS", "DATA_RESPONSE").
+            subsystem_name: The sender name placed on the INSTRUCTION.
+
+        The Future's result is the response Message. A PROBLEM response sets a
+        DeviceProblemError instead. Responses are matched by meta.origin when the
+        firmware echoes the instruction id; otherwise the oldest outstanding request
+        on that port that accepts the response status is resolved. Incoming messages
+        are still placed on incoming_message_queue. Cancel the Future to stop waiting.
+        """
+        if isinstance(expect, str):
+            expect = (expect,)
+        future = Future()
+        message = Message(subsystem_name, "INSTRUCTION", payload=payload)
+        request_id = message.meta["id"]
+        pending = PendingRequest(request_id, tuple(expect), future)
+
+        # Register before sending so a fast reply cannot arrive unmatched
+        with self._pending_lock:
+            self._pending.setdefault(port, []).append(pending)
+        future.add_done_callback(lambda f: self._forget_request(port, pending))
+
+        if not self.send_message(port, message):
+            self._set_future(future, exception=ConnectionError(f"Could not send instruction to {port}."))
+        return future
+
+    async def request_async(self, port: str, payload: dict, expect="SUCCESS", subsystem_name: str = "HOST") -> Message:
+        """Awaitable variant of request(); returns the response Message."""
+        return await asyncio.wrap_future(self.request(port, payload, expect, subsystem_name))
+
+    def wait_for(self, port: str, predicate) -> Future:
+        """
+        Returns a Future that resolves with the next message from port for which
+        predicate(message) is true, e.g. a TELEMETRY progress report. Unlike
+        request() nothing is sent; call this before triggering the message so it
+        cannot arrive unwatched. The message is still placed on incoming_message_queue.
+        """
+        future = Future()
+        watcher = (predicate, future)
+        with self._pending_lock:
+            self._watchers.setdefault(port, []).append(watcher)
+        future.add_done_callback(lambda f: self._forget_watcher(port, watcher))
+        return future
+
+    def negotiate_codec(self, port: str, preferred=CODEC_NAMES, timeout: float = 5.0) -> str:
+        """
+        Agrees on the most compact wire codec both sides support and switches to it.
+
+        The device lists its codecs in get_info metadata; firmware that predates
+        codecs lists none and stays on "json". Returns the codec in use afterwards.
+        Both sides decode either format, so messages in flight during the switch are safe.
+        """
+        device = self.devices[port]
+        future = self.request(port, {"func": "get_info"}, expect="DATA_RESPONSE")
+        try:
+            info = future.result(timeout)
+            supported = info.payload.get("metadata", {}).get("codecs") or ["json"]
+            choice = next((name for name in preferred if name in supported), "json")
+            if choice != device.postman.codec.name:
+                future = self.request(port, {"func": "set_codec", "args": {"codec": choice}})
+                future.result(timeout)
+                device.postman.set_codec(choice)
+        except Exception as e:
+            future.cancel()
+            log.warning(f"Codec negotiation with {port} failed, keeping {device.postman.codec.name}: {e}")
+        log.info(f"{port} is using the '{device.postman.codec.name}' codec.")
+        return device.postman.codec.name
+
+    def _forget_request(self, port: str, pending: PendingRequest):
+        with self._pending_lock:
+            requests = self._pending.get(port)
+            if requests and pending in requests:
+                requests.remove(pending)
+
+    def _forget_watcher(self, port: str, watcher):
+        with self._pending_lock:
+            watchers = self._watchers.get(port)
+            if watchers and watcher in watchers:
+                watchers.remove(watcher)
+
+    def _notify_watchers(self, port: str, message: Message):
+        with self._pending_lock:
+            watchers = list(self._watchers.get(port, ()))
+        for predicate, future in watchers:
+            try:
+                matched = predicate(message)
+            except Exception as e:
+                self._set_future(future, exception=e)
+                continue
+            if matched:
+                self._set_future(future, result=message)
+
+    def _match_request(self, port: str, message: Message):
+        """Finds (and removes) the outstanding request a response belongs to."""
+        status = message.status
+        with self._pending_lock:
+            requests = self._pending.get(port)
+            if not requests:
+                return None
+            origin = message.meta.get("origin")
+            match = None
+            for pending in requests:
+                if pending.request_id == origin:
+                    match = pending
+                    break
+            if match is None:
+                # Firmware that does not echo meta.origin answers instructions in order
+                for pending in requests:
+                    if status == "PROBLEM" or status in pending.expect:
+                        match = pending
+                        break
+            if match is not None:
+                requests.remove(match)
+            return match
+
+    def _resolve_request(self, port: str, message: Message):
+        if message.status not in RESPONSE_STATUSES:
+            return
+        pending = self._match_request(port, message)
+        if pending is None:
+            return
+        if message.status == "PROBLEM" and "PROBLEM" not in pending.expect:
+            self._set_future(pending.future, exception=DeviceProblemError(port, message))
+        else:
+            self._set_future(pending.future, result=message)
+
+    def _update_credit(self, port: str, message: Message):
+        """Applies a device's credit report and writes any held instructions it now allows."""
+        failed = []
+        with self._credit_lock:
+            window = self._credit.get(port)
+            if window is None:
+                return
+            window.update(message.meta)
+            while window.held and window.can_send():
+                held = window.held.popleft()
+                window.sent += 1
+                if not self._write_message(port, held):
+                    window.sent -= 1
+                    failed.append(held)
+        for held in failed:
+            self._fail_request(port, held.meta.get("id"), ConnectionError(f"Could not send instruction to {port}."))
+
+    def _fail_request(self, port: str, request_id: str, exception: Exception):
+        with self._pending_lock:
+            requests = self._pending.get(port, [])
+            match = next((pending for pending in requests if pending.request_id == request_id), None)
+            if match is not None:
+                requests.remove(match)
+        if match is not None:
+            self._set_future(match.future, exception=exception)
+
+    def _fail_pending(self, port: str, exception: Exception):
+        with self._pending_lock:
+            requests = self._pending.pop(port, [])
+            watchers = self._watchers.pop(port, [])
+        for pending in requests:
+            self._set_future(pending.future, exception=exception)
+        for _predicate, future in watchers:
+            self._set_future(future, exception=exception)
+
+    @staticmethod
+    def _set_future(future: Future, result=None, exception=None):
+        """Completes a Future unless the caller already cancelled it."""
+        if future.done():
+            return
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except Exception:
+            # Lost a race with cancel()
+            pass
+
+    def _queue_incoming(self, entry: tuple):
+        """Puts an entry on incoming_message_queue, dropping the oldest if it is full."""
+        while True:
+            try:
+                self.incoming_message_queue.put_nowait(entry)
+                return
+            except queue.Full:
+                try:
+                    dropped = self.incoming_message_queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self.dropped_messages += 1
+                log.warning(f"Incoming queue full. Dropped {dropped[0]} from {dropped[1]} "
+                            f"({self.dropped_messages} dropped so far).")
+
+    def _dispatch_raw(self, port: str, raw_data: str):
+        """Parses one raw line from a device and puts it on the central queue."""
+        try:
+            message = decode_message(raw_data)
+        except (ValueError, TypeError):
+            self._queue_incoming(('RAW', port, raw_data))
+            return
+        self._queue_incoming(('RECV', port, message))
+        device = self.devices.get(port)
+        if device is not None:
+            device.track_position(message)
+        self._update_credit(port, message)
+        self._resolve_request(port, message)
+        self._notify_watchers(port, message)
+
+    def _dispatch_batch(self, port: str, batch: list):
+        """Dispatches every line from one read, in order, without waiting in between."""
+        for raw_data in batch:
+            self._dispatch_raw(port, raw_data)
 
     def _listen_for_messages(self, device: Device, stop_event: threading.Event):
         """Worker that listens on one device's Postman and puts messages on the central queue."""
         port = device.port
         while not stop_event.is_set():
             try:
-                raw_data = device.postman.receive()
-                if raw_data:
-                    try:
-                        message = Message.from_json(raw_data)
-                        self.incoming_message_queue.put(('RECV', port, message))
-                    except (json.JSONDecodeError, ValueError):
-                        self.incoming_message_queue.put(('RAW', port, raw_data))
-                time.sleep(0.05)
+                batch = device.postman.receive_many()
+                if batch:
+                    self._dispatch_batch(port, batch)
+                else:
+                    time.sleep(0.05)
             except Exception as e:
                 log.error(f"Critical error in listener for {port}: {e}")
-                self.incoming_message_queue.put(('ERROR', port, str(e)))
+                self._queue_incoming(('ERROR', port, str(e)))
                 break
-    
+
+    # --- Reactor mode ---
+
+    def _start_reactor(self):
+        """Creates the selector and the single thread that services every port."""
+        if self._reactor_thread is not None:
+            return
+        self._selector = selectors.DefaultSelector()
+        # A socket pair lets other threads interrupt a blocking select() call
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ, data=None)
+        self._reactor_stop.clear()
+        self._reactor_thread = threading.Thread(target=self._run_reactor, daemon=True)
+        self._reactor_thread.start()
+
+    def _stop_reactor(self):
+        """Stops the reactor thread and releases the selector."""
+        if self._reactor_thread is None:
+            return
+        self._reactor_stop.set()
+        self._wake_reactor()
+        self._reactor_thread.join(timeout=2)
+        self._reactor_thread = None
+        self._selector.close()
+        self._wakeup_recv.close()
+        self._wakeup_send.close()
+        self._selector = None
+
+    def _wake_reactor(self):
+        try:
+            self._wakeup_send.send(b'\0')
+        except OSError:
+            pass
+
+    def _register_device(self, device: Device):
+        """Adds a connected device's serial port to the reactor's selector."""
+        if self._reactor_thread is None:
+            self._start_reactor()
+        with self._reactor_lock:
+            self._selector.register(device.postman.channel.fileno(), selectors.EVENT_READ, data=device)
+        self._wake_reactor()
+
+    def _unregister_device(self, device: Device):
+        """Removes a device from the selector. Safe to call more than once."""
+        with self._reactor_lock:
+            try:
+                self._selector.unregister(device.postman.channel.fileno())
+            except (KeyError, ValueError, OSError, AttributeError):
+                pass
+
+    def _run_reactor(self):
+        """Single worker that waits on every open port and drains whichever are readable."""
+        while not self._reactor_stop.is_set():
+            try:
+                events = self._selector.select(timeout=1.0)
+            except (OSError, ValueError) as e:
+                # A port was closed out from under the selector; the next pass will skip it.
+                log.debug(f"Reactor select interrupted: {e}")
+                continue
+            for key, _ in events:
+                if key.data is None:
+                    try:
+                        self._wakeup_recv.recv(1024)
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                with self._reactor_lock:
+                    # Skip devices that were unregistered while select() was waiting
+                    if key.fd not in self._selector.get_map():
+                        continue
+                    batch = self._service_device(key.data)
+                # Dispatch with the lock released: future callbacks and watchers
+                # may connect or disconnect devices, which takes the lock
+                if batch:
+                    self._dispatch_batch(key.data.port, batch)
+
+    def _service_device(self, device: Device):
+        """Reads every complete line currently waiting on a readable port and returns them."""
+        port = device.port
+        try:
+            return device.postman.receive_many()
+        except Exception as e:
+            log.error(f"Critical error in reactor for {port}: {e}")
+            self._queue_incoming(('ERROR', port, str(e)))
+            # Caller already holds the reactor lock, so unregister directly.
+            try:
+                self._selector.unregister(device.postman.channel.fileno())
+            except (KeyError, ValueError, OSError, AttributeError):
+                pass
+            return None
+
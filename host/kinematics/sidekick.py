@@ -0,0 +1,209 @@
+# host/kinematics/sidekick.py
+"""
+NumPy-vectorized Sidekick kinematics for host-side planning and simulation.
+
+Each function mirrors the one of the same name in firmware/sidekick/kinematics.py,
+but takes the Sidekick config dict instead of a machine and accepts arrays (or
+scalars) of targets. The arithmetic follows the firmware expression for
+expression, but NumPy's vectorized trig can differ from libm in the last bit,
+so a step target that truncates right on a step boundary may be one step off
+the firmware's. The device uses its own IK or the well table, so that is only
+ever an estimate error for planning. move_cost reuses firmware/sidekick/motion.py.
+Unreachable targets come back as NaN angles with a False entry in the validity mask.
+"""
+import math
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+SIDEKICK_DIR = Path(__file__).resolve().parents[2] / "firmware" / "sidekick"
+
+_RAD_TO_DEG = 180.0 / math.pi
+
+def _load_firmware_module(name):
+    """
+    Imports firmware/sidekick/<name>.py on its own. The firmware package itself
+    needs CircuitPython's 'board', so board-free modules are loaded from their files.
+    """
+    spec = importlib.util.spec_from_file_location(f"sidekick_{name}", SIDEKICK_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+motion = _load_firmware_module("motion")
+
+def load_firmware_config():
+    """Returns SUBSYSTEM_CONFIG from firmware/sidekick/config.py."""
+    return _load_firmware_module("config").SUBSYSTEM_CONFIG
+
+def _steps_per_rev(config):
+    cfg = config['motor_settings']
+    return (360 / cfg['step_angle_degrees']) * cfg['microsteps']
+
+# ============================================================================
+# UTILITY AND CONVERSION FUNCTIONS
+# ============================================================================
+
+def steps_to_degrees(config, m1_steps, m2_steps):
+    """Converts absolute motor steps to angles in degrees."""
+    steps_per_rev = _steps_per_rev(config)
+    theta1 = (np.asarray(m1_steps, dtype=float) / steps_per_rev) * 360
+    theta2 = (np.asarray(m2_steps, dtype=float) / steps_per_rev) * 360
+    return theta1, theta2
+
+def degrees_to_steps(config, theta1, theta2):
+    """
+    Converts motor angles in degrees to absolute step counts, truncating toward
+    zero like the firmware's int(). NaN angles (unreachable targets) become 0;
+    keep the validity mask from inverse_kinematics to tell them apart.
+    """
+    steps_per_rev = _steps_per_rev(config)
+    m1_steps = np.trunc((np.asarray(theta1, dtype=float) / 360) * steps_per_rev)
+    m2_steps = np.trunc((np.asarray(theta2, dtype=float) / 360) * steps_per_rev)
+    m1_steps[np.isnan(m1_steps)] = 0
+    m2_steps[np.isnan(m2_steps)] = 0
+    return m1_steps.astype(np.int64), m2_steps.astype(np.int64)
+
+# ============================================================================
+# CORE KINEMATICS LOGIC
+# ============================================================================
+
+def inverse_kinematics(config, target_x, target_y, current_m1_steps=0, current_m2_steps=0):
+    """
+    Motor angles (theta1, theta2) in degrees that reach each (target_x, target_y).
+    As on the device, when both elbow conformations are within the operational
+    limits the one with the fewest steps on the busier motor from the current
+    steps is chosen.
+
+    Returns (theta1, theta2, valid); theta1 and theta2 are NaN where valid is False.
+    """
+    cfg = config['kinematics']
+    L1 = cfg['L1']
+    L3 = cfg['L3']
+    target_x = np.asarray(target_x, dtype=float)
+    target_y = np.asarray(target_y, dtype=float)
+
+    d_sq = target_x * target_x + target_y * target_y
+    d = np.sqrt(d_sq)
+    reachable = (d != 0) & (d <= L1 + L3) & (d >= abs(L1 - L3))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = (L3 * L3 - L1 * L1 + d_sq) / (2 * d)
+        h = np.sqrt(np.maximum(L3 * L3 - a * a, 0.0))
+        ux = target_x / d
+        uy = target_y / d
+    chord_x = target_x - a * ux
+    chord_y = target_y - a * uy
+
+    # Conformation A (elbow-back) and B
+    p1_x = chord_x - h * uy
+    p1_y = chord_y + h * ux
+    theta1_a = np.remainder(np.arctan2(p1_y, p1_x) * _RAD_TO_DEG, 360)
+    theta2_a = np.remainder(np.arctan2(p1_y - target_y, p1_x - target_x) * _RAD_TO_DEG, 360)
+    p1_x = chord_x + h * uy
+    p1_y = chord_y - h * ux
+    theta1_b = np.remainder(np.arctan2(p1_y, p1_x) * _RAD_TO_DEG, 360)
+    theta2_b = np.remainder(np.arctan2(p1_y - target_y, p1_x - target_x) * _RAD_TO_DEG, 360)
+
+    op_limits = config['operational_limits_degrees']
+    m1_min = op_limits['m1_min']; m1_max = op_limits['m1_max']
+    m2_min = op_limits['m2_min']; m2_max = op_limits['m2_max']
+    a_ok = reachable & (m1_min <= theta1_a) & (theta1_a <= m1_max) & (m2_min <= theta2_a) & (theta2_a <= m2_max)
+    b_ok = reachable & (m1_min <= theta1_b) & (theta1_b <= m1_max) & (m2_min <= theta2_b) & (theta2_b <= m2_max)
+
+    # Both motors step together, so a move takes as many ticks as its larger step count
+    m1_a, m2_a = degrees_to_steps(config, theta1_a, theta2_a)
+    m1_b, m2_b = degrees_to_steps(config, theta1_b, theta2_b)
+    travel_a = np.maximum(np.abs(m1_a - current_m1_steps), np.abs(m2_a - current_m2_steps))
+    travel_b = np.maximum(np.abs(m1_b - current_m1_steps), np.abs(m2_b - current_m2_steps))
+    use_b = b_ok & ~(a_ok & (travel_a <= travel_b))
+
+    valid = a_ok | b_ok
+    theta1 = np.where(valid, np.where(use_b, theta1_b, theta1_a), np.nan)
+    theta2 = np.where(valid, np.where(use_b, theta2_b, theta2_a), np.nan)
+    return theta1, theta2, valid
+
+def pump_center_target(config, pump_offset, target_x, target_y, current_m1_steps=0, current_m2_steps=0):
+    """
+    Arm center (x, y) that puts a pump nozzle ({'dx', 'dy'}, scalars or arrays that
+    broadcast with the targets) over each target, with
+    the orientation estimated from an IK solve for the target itself.
+
+    Returns (x, y, valid); x and y are NaN where that solve fails.
+    """
+    _theta1, guessed_theta2, valid = inverse_kinematics(config, target_x, target_y,
+                                                        current_m1_steps, current_m2_steps)
+    orientation_rad = np.radians(guessed_theta2)
+    cos_theta = np.cos(orientation_rad)
+    sin_theta = np.sin(orientation_rad)
+    dx = pump_offset['dx']
+    dy = pump_offset['dy']
+    return target_x + dx * cos_theta - dy * sin_theta, target_y + dx * sin_theta + dy * cos_theta, valid
+
+def forward_kinematics(config, theta1, theta2):
+    """Cartesian (x, y) of the arm's center for motor angles (theta1, theta2) in degrees."""
+    cfg = config['kinematics']
+    L1, L3 = cfg['L1'], cfg['L3']
+    theta1_rad = np.radians(np.asarray(theta1, dtype=float))
+    theta2_rad = np.radians(np.asarray(theta2, dtype=float))
+
+    # Elbow p1, then the link to the center, which points opposite theta2
+    p1_x = L1 * np.cos(theta1_rad)
+    p1_y = L1 * np.sin(theta1_rad)
+    vec_p1_p4_x = -L3 * np.cos(theta2_rad)
+    vec_p1_p4_y = -L3 * np.sin(theta2_rad)
+    return p1_x + vec_p1_p4_x, p1_y + vec_p1_p4_y
+
+def move_cost(config, from_steps, to_steps):
+    """
+    Seconds a move between (m1, m2) step positions takes, from the firmware's
+    motion.move_cost. from_steps and to_steps are arrays whose last axis is
+    (m1, m2) and broadcast against each other, so
+    move_cost(config, steps[:, None], steps[None, :]) is a full cost matrix.
+    """
+    delta = np.abs(np.asarray(to_steps, dtype=np.int64) - np.asarray(from_steps, dtype=np.int64))
+    # The cost depends only on the busier motor's step count, so the firmware
+    # profile is evaluated once per distinct count
+    ticks, index = np.unique(np.max(delta, axis=-1), return_inverse=True)
+    settings = config['motor_settings']
+    costs = np.array([motion.move_cost(settings, (0, 0), (int(t), 0)) for t in ticks], dtype=float)
+    return costs[index].reshape(delta.shape[:-1])
+
+# ============================================================================
+# PLATE HELPERS
+# ============================================================================
+
+def well_positions(config):
+    """
+    World (x, y) in cm of every well center, row-major ("A1", "A2", ..., "H12"),
+    placed like the firmware's well_to_world. Returns (names, x, y).
+    """
+    plate = config['plate_geometry']
+    pitch = plate['well_pitch_cm']
+    a1_offset = config.get('A1_offset', {'dx': 0, 'dy': 0})
+    rows = np.repeat(np.arange(len(plate['rows'])), plate['columns'])
+    columns = np.tile(np.arange(plate['columns']), len(plate['rows']))
+    names = [f"{row}{column + 1}" for row in plate['rows'] for column in range(plate['columns'])]
+    return names, (rows * pitch) + a1_offset['dx'], (columns * pitch) + a1_offset['dy']
+
+def well_steps(config, current_m1_steps=0, current_m2_steps=0):
+    """
+    Step targets for every well and every target column: the end effector center
+    ("center") followed by the pumps in config['pump_offsets'] in sorted order.
+
+    Returns (names, pumps, steps, valid): steps is an int array of shape
+    (wells, pumps, 2) holding (m1, m2), and valid is (wells, pumps) booleans.
+    """
+    names, x, y = well_positions(config)
+    pumps = ["center"] + sorted(config['pump_offsets'])
+    # One solve for every (well, pump): the center is a pump with no offset,
+    # which leaves its targets unchanged
+    offsets = [{'dx': 0.0, 'dy': 0.0}] + [config['pump_offsets'][pump] for pump in pumps[1:]]
+    offset = {'dx': np.array([o['dx'] for o in offsets], dtype=float),
+              'dy': np.array([o['dy'] for o in offsets], dtype=float)}
+    target_x, target_y, target_ok = pump_center_target(config, offset, x[:, None], y[:, None],
+                                                       current_m1_steps, current_m2_steps)
+    theta1, theta2, ok = inverse_kinematics(config, target_x, target_y, current_m1_steps, current_m2_steps)
+    m1_steps, m2_steps = degrees_to_steps(config, theta1, theta2)
+    return names, pumps, np.stack((m1_steps, m2_steps), axis=-1), target_ok & ok
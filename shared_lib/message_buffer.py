@@ -1,4 +1,12 @@
 #type: ignore
+from .utility import check_if_microcontroller
+
+if check_if_microcontroller():
+    # CircuitPython's deque needs a fixed maxlen and lacks most of the API,
+    # so LinearMessageBuffer uses RingMessageBuffer there.
+    deque = None
+else:
+    from collections import deque
 
 # Base (abstract-ish) class for a buffer that will handle messages.
 class MessageBuffer():
@@ -10,8 +18,8 @@ class MessageBuffer():
         """
         Initializes the message buffer.
         """
-        self.messages = self._create_storage()  # Abstract method to create storage
         self.max_size = max_size  # Maximum capacity of the buffer (fixed)
+        self.messages = self._create_storage()  # Abstract method to create storage
         self.current_size = 0  # Track how many messages are in the buffer.  Important for Circular Buffer
         #This is for the circular buffer, but it won't hurt the others.
         self.head = 0
@@ -50,6 +58,14 @@ class MessageBuffer():
         self.current_size -= 1
         return value
 
+    def peek(self):
+        """
+        Returns the next message without removing it, or None if the buffer is empty.
+        """
+        if self.is_empty():
+            return None
+        return self._peek()
+
     def flush(self):
         """
         Empties the buffer.
@@ -75,29 +91,78 @@ class MessageBuffer():
         """Retrieves a value from the buffer, Implementation Specific"""
         raise NotImplementedError("Implementation specific retrieval not implemented")
 
+    def _peek(self):
+        """Returns the next value without removing it, Implementation Specific"""
+        return self.messages[self.head]
+
     def _flush(self):
         """flushes, implementation specific"""
         raise NotImplementedError("Implementation specific flush not implemented")
 
-class LinearMessageBuffer(MessageBuffer):
+class RingMessageBuffer(MessageBuffer):
+    """
+    A FIFO message buffer over a list of max_size slots, allocated once and
+    used as a ring (head/tail indices). store() and get() are O(1) and do not
+    allocate. Storing into a full buffer raises OverflowError.
+    """
+
+    def __init__(self, max_size: int = 100):
+        super().__init__(max_size)
+
+    def _create_storage(self):
+        return [None] * self.max_size
+
+    def _store(self, value):
+        self.messages[self.tail] = value
+        self.tail = (self.tail + 1) % self.max_size
+
+    def _get(self):
+        value = self.messages[self.head]
+        self.messages[self.head] = None  # Release the message for garbage collection
+        self.head = (self.head + 1) % self.max_size
+        return value
+
+    def _flush(self):
+        for i in range(self.max_size):
+            self.messages[i] = None
+
+
+class DequeMessageBuffer(MessageBuffer):
     """
-    A simple linear FIFO message buffer implemented using a list.
+    A FIFO message buffer backed by collections.deque (CPython only).
+    store() and get() are O(1). Storing into a full buffer raises OverflowError.
     """
 
     def __init__(self, max_size: int = 100):
         super().__init__(max_size)
-    
+
     def _create_storage(self):
-        return []
+        return deque()
 
     def _store(self, value):
         self.messages.append(value)
 
     def _get(self):
-        return self.messages.pop(0)
+        return self.messages.popleft()
+
+    def _peek(self):
+        return self.messages[0]
 
     def _flush(self):
-        self.messages = []
+        self.messages.clear()
+
+
+# Pick the O(1) FIFO available on this platform
+_LinearBase = DequeMessageBuffer if deque is not None else RingMessageBuffer
+
+class LinearMessageBuffer(_LinearBase):
+    """
+    A simple linear FIFO message buffer: a DequeMessageBuffer on CPython and a
+    RingMessageBuffer on CircuitPython. Storing into a full buffer raises OverflowError.
+    """
+
+    def __init__(self, max_size: int = 100):
+        super().__init__(max_size)
 
 
 class CircularMessageBuffer(MessageBuffer):
@@ -1,27 +1,76 @@
 #type: ignore
 import json
 import time
+import os
+import binascii
+
+# Every running program (a host script or a device's firmware) is one message
+# origin. Message ids are a random per-boot token plus that origin's sequence
+# number, which is unique enough for correlation and costs no uuid module.
+try:
+    _ORIGIN_TOKEN = binascii.hexlify(os.urandom(4)).decode()
+except (AttributeError, NotImplementedError):
+    # Boards without a hardware RNG
+    import random
+    _ORIGIN_TOKEN = "%08x" % random.getrandbits(32)
+
+try:
+    from itertools import count
+    _seq_counter = count(1)
+    def _next_seq():
+        # next() on itertools.count is atomic under the GIL
+        return next(_seq_counter)
+except ImportError:
+    # CircuitPython has no itertools, and no threads to race on the counter
+    _seq = 0
+    def _next_seq():
+        global _seq
+        _seq += 1
+        return _seq
+
+def new_meta(origin=None):
+    """Returns the meta header for a newly created message."""
+    seq = _next_seq()
+    meta = {"id": _ORIGIN_TOKEN + "-" + str(seq), "seq": seq}
+    if origin is not None:
+        meta["origin"] = origin
+    return meta
+
+_dumps = json.dumps
+_loads = json.loads
 
 class Message():
     """
     Represents a message with subsystem name, status, metadata, and payload.
     """
 
+    # Slots keep per-message memory small and attribute access fast on CPython.
+    # CircuitPython ignores __slots__, so the class behaves the same on devices.
+    __slots__ = ("_subsystem_name", "_status", "_meta", "_payload", "_timestamp")
+
     VALID_STATUS = {"DEBUG", "TELEMETRY", "INFO", "INSTRUCTION", "SUCCESS", "PROBLEM", "WARNING", "DATA_RESPONSE"}
 
-    def __init__(self, subsystem_name=None, status=None, meta=None, payload=None, timestamp=None):
-        """Initializes a Message object."""
+    def __init__(self, subsystem_name=None, status=None, meta=None, payload=None, timestamp=None, origin=None):
+        """
+        Initializes a Message object.
+
+        When meta is None a new header is generated with this program's next id and seq.
+        A meta dict that is passed in (e.g. one received over the wire) is kept as-is.
+        origin is the id of the INSTRUCTION this message answers, if any.
+        """
         self._subsystem_name = subsystem_name
         # Validate that the status provided to the method is valid
         if status is not None and status not in Message.VALID_STATUS:
            raise ValueError("Invalid Status Level")
         self._status = status
         if meta is None:
-            self._meta = {}
+            self._meta = new_meta(origin)
         elif not isinstance(meta, dict):
             raise TypeError("meta must be a dictionary")
         else:
             self._meta = meta
+            if origin is not None:
+                self._meta["origin"] = origin
         if timestamp is None:
             self._timestamp = time.time()
         else:
@@ -36,16 +85,23 @@ class Message():
     def to_dict(self):
         """Returns a dictionary representation of the message."""
         return {
-            "subsystem_name": self.subsystem_name,
-            "status": self.status,
-            "meta": self.meta,
-            "payload": self.payload,
-            "timestamp": self.timestamp
+            "subsystem_name": self._subsystem_name,
+            "status": self._status,
+            "meta": self._meta,
+            "payload": self._payload,
+            "timestamp": self._timestamp
         }
 
     def serialize(self):
         """Serializes the message to JSON."""
-        return json.dumps(self.to_dict())
+        # Hot path: encode straight from the slots, skipping to_dict() and the properties
+        return _dumps({
+            "subsystem_name": self._subsystem_name,
+            "status": self._status,
+            "meta": self._meta,
+            "payload": self._payload,
+            "timestamp": self._timestamp
+        })
 
     @classmethod
     def from_json(cls, json_string: str):
@@ -54,23 +110,44 @@ class Message():
         This is a class method.
         """
         try:
-            data = json.loads(json_string)
-            subsystem_name = data.get("subsystem_name")
-            status = data.get("status")
-            meta = data.get("meta", {})
-            payload = data.get("payload")
-            timestamp = data.get("timestamp")
-            # The validation for status is handled by the __init__ method,
-            # so we just pass the values along.
-            return cls(
-                subsystem_name=subsystem_name,
-                status=status,
-                meta=meta,
-                payload=payload,
-                timestamp=timestamp
-            )
-        except json.JSONDecodeError:
+            data = _loads(json_string)
+        except ValueError:
+            # json.JSONDecodeError is a ValueError; CircuitPython raises ValueError directly
             raise ValueError("Invalid JSON string")
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Creates a new Message instance from a decoded message dictionary.
+
+        Only the status and payload are checked. The sender's meta and timestamp
+        are kept as received, so __init__ (which would generate a new header) is skipped.
+        """
+        if type(data) is not dict:
+            raise ValueError("Message JSON must be an object")
+        status = data.get("status")
+        if status is not None and status not in cls.VALID_STATUS:
+            raise ValueError("Invalid Status Level")
+        payload = data.get("payload")
+        if payload is None:
+            payload = {}
+        elif type(payload) is not dict:
+            raise TypeError("payload must be a dictionary")
+        # Keep the sender's meta (id, seq, origin) rather than generating our own
+        meta = data.get("meta")
+        if type(meta) is not dict:
+            meta = {}
+        timestamp = data.get("timestamp")
+        if timestamp is None:
+            timestamp = time.time()
+        msg = cls.__new__(cls)
+        msg._subsystem_name = data.get("subsystem_name")
+        msg._status = status
+        msg._meta = meta
+        msg._payload = payload
+        msg._timestamp = timestamp
+        return msg
 
     @property
     def subsystem_name(self):
@@ -86,14 +163,8 @@ class Message():
 
     @property
     def meta(self):
-        # we are ignoring any meta in envelope until this is implemented
-        # Should append self._meta to the dict below.
-        fake_meta = {
-            "id": "fake UUID",
-            "seq": -1,
-            "origin": "fake UUID"
-        }
-        return fake_meta
+        """The message header: id, seq and (for responses) origin."""
+        return self._meta
 
     @meta.setter
     def meta(self, value):
@@ -116,9 +187,9 @@ class Message():
         return self._timestamp
 
     @classmethod
-    def create_message(cls, subsystem_name=None, status=None, meta=None, payload=None):
+    def create_message(cls, subsystem_name=None, status=None, meta=None, payload=None, origin=None):
         """Creates a Message instance."""
-        return cls(subsystem_name=subsystem_name, status=status, meta=meta, payload=payload)
+        return cls(subsystem_name=subsystem_name, status=status, meta=meta, payload=payload, origin=origin)
 
     @classmethod
     def get_valid_status(cls):
@@ -126,7 +197,16 @@ class Message():
 
 # Make it easy to send properly formatted messages (at least for problem and success at the moment)
 
-def send_problem(machine, msg, error = None):
+def reply_origin(machine, origin=None):
+    """
+    Returns the instruction id a response should reference in meta.origin.
+    Defaults to the instruction the machine is currently handling.
+    """
+    if origin is not None:
+        return origin
+    return getattr(machine, 'current_origin', None)
+
+def send_problem(machine, msg, error = None, origin = None):
     """A helper function to create and send a standardized PROBLEM message."""
     machine.log.error(f"msg:{msg}, error:{error}")
     payload = {"message":msg}
@@ -135,16 +215,24 @@ def send_problem(machine, msg, error = None):
     response = Message.create_message(
         subsystem_name=machine.name,
         status="PROBLEM",
-        payload=payload
+        payload=payload,
+        origin=reply_origin(machine, origin)
     )
-    machine.postman.send(response.serialize())
+    machine.postman.send_message(response)
 
-def send_success(machine, msg):
-    """A helper function to create and send a standardize SUCCESS message."""
+def send_success(machine, msg, origin = None, data = None):
+    """
+    A helper function to create and send a standardize SUCCESS message.
+    data, when given, is sent alongside the message (e.g. the position after a move).
+    """
     machine.log.info(msg)
+    payload = {"message": msg}
+    if data is not None:
+        payload["data"] = data
     response = Message(
         subsystem_name=machine.name,
         status="SUCCESS",
-        payload = {"message": msg}
+        payload = payload,
+        origin=reply_origin(machine, origin)
     )
-    machine.postman.send(response.serialize())
\ No newline at end of file
+    machine.postman.send_message(response)
\ No newline at end of file
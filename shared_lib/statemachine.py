@@ -74,6 +74,8 @@ class StateMachine:
         self.command_handlers = {}
         self.supported_commands = {}
         self.running = False
+        # meta.id of the INSTRUCTION being handled; responses echo it as meta.origin
+        self.current_origin = None
         self.is_microcontroller = check_if_microcontroller()
         self.sequencer = StateSequencer(self)
 
@@ -81,7 +83,10 @@ class StateMachine:
         self.build_status_info = status_callback if status_callback is not None else lambda m: {}
 
         # Each state machine has an inbox
-        self.inbox = LinearMessageBuffer()
+        self.inbox = LinearMessageBuffer(config.get('inbox_size', 100) if config else 100)
+        # INSTRUCTIONs taken off the wire so far; with the inbox's free space this is
+        # the credit the host needs for flow control (see flow_meta)
+        self.instructions_received = 0
         # TODO: Create a custom handler or other solution to address that adafruit_logging doesn't have basicConfig
         if not self.is_microcontroller:
             logging.basicConfig(level=logging.DEBUG, format='%(asctime)s [%(name)s] %(levelname)s : %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
@@ -108,14 +113,40 @@ class StateMachine:
     def idle_state(self):
         return self._idle_state
 
+    def flow_meta(self):
+        """
+        Flow control fields added to the meta of every message the device sends.
+        credit: free inbox slots. rx: INSTRUCTIONs received since boot.
+        The host keeps (instructions sent - rx) below credit.
+        """
+        return {"credit": self.inbox.max_size - self.inbox.current_size, "rx": self.instructions_received}
+
+    def handle_next_instruction(self):
+        """
+        Runs the oldest INSTRUCTION waiting in the inbox.
+        Returns True if one was handled, False if the inbox was empty.
+        """
+        message = self.inbox.get()
+        if message is None:
+            return False
+        try:
+            self.handle_instruction(message.payload, origin=message.meta.get("id"))
+        except Exception as e:
+            self.log.error(f"Could not process instruction: '{message.payload}'. Error: {e}")
+        return True
+
     def add_command(self, name: str, handler, doc: dict):
         """Adds a command handler and its documentation to the machine."""
         self.command_handlers[name] = handler
         self.supported_commands[name] = doc
         
-    def handle_instruction(self, payload: dict):
-        """Dispatches an instruction payload to the correct handler."""
+    def handle_instruction(self, payload: dict, origin=None):
+        """
+        Dispatches an instruction payload to the correct handler.
+        origin is the instruction's meta.id, referenced by any responses it produces.
+        """
         # Handler should set any flags and move to a different state
+        self.current_origin = origin
         
         func_name = payload.get("func") if isinstance(payload, dict) else None
         
@@ -189,6 +220,10 @@ class StateMachine:
             raise Exception('State machine must be running to do this.')
         if self.state:
             self.state.update(self)
+        # Send everything this tick produced in one write (when the postman coalesces)
+        postman = getattr(self, 'postman', None)
+        if postman is not None:
+            postman.flush()
 
     def run(self, state_name=None):
         """
@@ -351,6 +386,7 @@ class StateSequencer:
         self.machine = machine
         self.queue = []
         self.context = {}
+        self.origin = None # meta.id of the INSTRUCTION that started the sequence
         self._is_active = False
         self._persistent = False # Default to transient behavior
 
@@ -372,6 +408,7 @@ class StateSequencer:
         
         self.machine.log.info(f"Starting sequence: {sequence_list} -> persistent ='{persistent}'")
         self._is_active = True
+        self.origin = self.machine.current_origin
         self.queue = sequence_list[:] # Make a copy
         self._persistent = persistent
         self.context = initial_context if initial_context is not None else {}
@@ -379,7 +416,7 @@ class StateSequencer:
     
     def abort(self, reason: str):
         """ Gracefully abort an active sequence. """
-        send_problem(self.machine, f"Sequence aborted: {reason}")
+        send_problem(self.machine, f"Sequence aborted: {reason}", origin=self.origin)
         self._reset()
         self.machine.go_to_state(self.machine.idle_state)
 
@@ -417,12 +454,16 @@ class StateSequencer:
         """
         self.machine.log.info("Sequence complete.")
         sequence_name = self.context.get('name','Unnamed')
-        send_success(self.machine, f"Sequence {sequence_name} completed successfully")
+        # States may leave a 'result' in the context to be returned with the SUCCESS
+        send_success(self.machine, f"Sequence {sequence_name} completed successfully", origin=self.origin,
+                     data=self.context.get('result'))
         
         was_persistent_sequence = self._persistent
         self._reset()
 
         if not was_persistent_sequence:
+            # Idle runs the next queued instruction on its next tick, once the
+            # finishing state's update() has returned
             self.machine.go_to_state(self.machine.idle_state)
     
     def _reset(self):
@@ -430,4 +471,5 @@ class StateSequencer:
         self._is_active = False
         self.queue.clear()
         self.context.clear()
+        self.origin = None
         self._persistent = False
\ No newline at end of file
@@ -0,0 +1,115 @@
+# tests/communicate/test_framing.py
+import random
+import unittest
+from communicate.framing import (
+    crc16, cobs_encode, cobs_decode, encode_frame, decode_frame, FrameDecoder, LineAssembler
+)
+
+
+class TrickleChannel:
+    """A serial channel whose bytes arrive a few at a time, like USB CDC packets."""
+    def __init__(self):
+        self.arrived = bytearray()
+
+    def arrive(self, data):
+        self.arrived.extend(data)
+
+    @property
+    def in_waiting(self):
+        return len(self.arrived)
+
+    def readinto(self, buf):
+        count = min(len(buf), len(self.arrived))
+        buf[:count] = self.arrived[:count]
+        del self.arrived[:count]
+        return count
+
+
+class TestCobs(unittest.TestCase):
+
+    def test_round_trip(self):
+        rng = random.Random(6)
+        cases = [b"", b"\x00", b"\x00\x00", b"abc", b"\x01" * 254, b"\x01" * 254 + b"\x00", b"\x02" * 600]
+        cases += [bytes(rng.randrange(4) for _ in range(rng.randrange(700))) for _ in range(50)]
+        for data in cases:
+            encoded = cobs_encode(data)
+            self.assertNotIn(0, encoded)
+            self.assertEqual(cobs_decode(encoded), data)
+
+    def test_invalid_encoding(self):
+        with self.assertRaises(ValueError):
+            cobs_decode(b"\x05ab")
+
+    def test_crc16_check_value(self):
+        # CRC-16/CCITT-FALSE reference check value
+        self.assertEqual(crc16(b"123456789"), 0x29B1)
+
+
+class TestFrameDecoder(unittest.TestCase):
+
+    def test_frames_split_across_reads(self):
+        stream = encode_frame(b"first\x00frame") + encode_frame(b"second")
+        decoder = FrameDecoder()
+        frames = []
+        for i in range(0, len(stream), 3):
+            frames += decoder.feed(stream[i:i + 3])
+        self.assertEqual(frames, [b"first\x00frame", b"second"])
+
+    def test_corrupt_frame_dropped_and_resynced(self):
+        bad = bytearray(encode_frame(b"corrupted"))
+        bad[3] ^= 0x40
+        decoder = FrameDecoder()
+        frames = decoder.feed(b"noise" + bytes(bad) + encode_frame(b"good"))
+        self.assertEqual(frames, [b"good"])
+        # Leading noise and the damaged frame share one delimiter, so one frame is dropped
+        self.assertEqual(decoder.bad_frames, 1)
+
+    def test_overlong_garbage_is_discarded(self):
+        decoder = FrameDecoder(max_frame=16)
+        self.assertEqual(decoder.feed(b"\x01" * 40), [])
+        self.assertEqual(decoder.feed(encode_frame(b"ok")), [b"ok"])
+
+    def test_decode_frame_rejects_short_body(self):
+        self.assertIsNone(decode_frame(b"\x01"))
+
+
+class TestLineAssembler(unittest.TestCase):
+
+    def setUp(self):
+        self.channel = TrickleChannel()
+        self.assembler = LineAssembler(size=32)
+
+    def poll(self):
+        line = self.assembler.next_line()
+        if line is None:
+            self.assembler.fill(self.channel)
+            line = self.assembler.next_line()
+        return line
+
+    def test_partial_line_returns_none_until_complete(self):
+        self.channel.arrive(b'{"status": ')
+        self.assertIsNone(self.poll())
+        self.channel.arrive(b'"INFO"}\n')
+        self.assertEqual(self.poll(), b'{"status": "INFO"}')
+        self.assertIsNone(self.poll())
+
+    def test_several_lines_in_one_read(self):
+        self.channel.arrive(b"one\ntwo\nthr")
+        self.assertEqual([self.poll(), self.poll(), self.poll()], [b"one", b"two", None])
+        self.channel.arrive(b"ee\n")
+        self.assertEqual(self.poll(), b"three")
+
+    def test_never_reads_more_than_waiting(self):
+        self.channel.arrive(b"abc")
+        self.assertEqual(self.assembler.fill(self.channel), 3)
+        self.assertEqual(self.assembler.fill(self.channel), 0)
+
+    def test_overlong_line_is_skipped(self):
+        self.channel.arrive(b"x" * 80 + b"\nok\n")
+        lines = [self.poll() for _ in range(6)]
+        self.assertEqual([line for line in lines if line is not None], [b"ok"])
+        self.assertEqual(self.assembler.overflows, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# tests/communicate/test_serial_postman.py
+import os
+import time
+import unittest
+from communicate.serial_postman import SerialPostman
+from communicate.framing import encode_frame
+
+HAS_PTY = hasattr(os, "openpty")
+
+
+@unittest.skipUnless(HAS_PTY, "Requires a POSIX pseudo-terminal.")
+class TestSerialPostmanReceiveMany(unittest.TestCase):
+    FRAMING = "line"
+
+    def setUp(self):
+        self.master_fd, self.slave_fd = os.openpty()
+        self.postman = SerialPostman({"protocol": "serial", "port": os.ttyname(self.slave_fd),
+                                      "timeout": 0.1, "framing": self.FRAMING})
+        self.postman.open_channel()
+
+    def tearDown(self):
+        self.postman.close_channel()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+    def arrive(self, data: bytes):
+        os.write(self.master_fd, data)
+        # Give the pty a moment to make the bytes readable
+        deadline = time.monotonic() + 1.0
+        while self.postman.channel.in_waiting < len(data) and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_returns_all_complete_lines(self):
+        self.arrive(b"one\ntwo\nthree\nfou")
+        self.assertEqual(self.postman.receive_many(), ["one", "two", "three"])
+        self.arrive(b"r\n")
+        self.assertEqual(self.postman.receive_many(), ["four"])
+
+    def test_nothing_waiting(self):
+        self.assertEqual(self.postman.receive_many(), [])
+
+    def test_receive_after_receive_many_keeps_partial_line(self):
+        self.arrive(b"alpha\nbe")
+        self.assertEqual(self.postman.receive_many(), ["alpha"])
+        self.arrive(b"ta\n")
+        self.assertEqual(self.postman.receive(), "beta")
+
+
+class TestSerialPostmanReceiveManyCobs(TestSerialPostmanReceiveMany):
+    FRAMING = "cobs"
+
+    def test_returns_all_complete_lines(self):
+        self.arrive(encode_frame(b"one") + encode_frame(b"\x00two") + encode_frame(b"three"))
+        self.arrive(encode_frame(b"four")[:3])
+        self.assertEqual(self.postman.receive_many(), [b"one", b"\x00two", b"three"])
+        self.arrive(encode_frame(b"four")[3:])
+        self.assertEqual(self.postman.receive_many(), [b"four"])
+
+    def test_receive_after_receive_many_keeps_partial_line(self):
+        self.arrive(encode_frame(b"alpha") + encode_frame(b"beta")[:2])
+        self.assertEqual(self.postman.receive_many(), [b"alpha"])
+        self.arrive(encode_frame(b"beta")[2:])
+        self.assertEqual(self.postman.receive(), b"beta")
+
+
+@unittest.skipUnless(HAS_PTY, "Requires a POSIX pseudo-terminal.")
+class TestSerialPostmanCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        self.master_fd, self.slave_fd = os.openpty()
+        self.postman = SerialPostman({"protocol": "serial", "port": os.ttyname(self.slave_fd),
+                                      "coalesce": True, "max_latency": 0.05})
+        self.postman.open_channel()
+        os.set_blocking(self.master_fd, False)
+
+    def tearDown(self):
+        self.postman.close_channel()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+    def written(self):
+        try:
+            return os.read(self.master_fd, 4096)
+        except BlockingIOError:
+            return b""
+
+    def test_sends_held_until_flush(self):
+        for word in ("one", "two", "three"):
+            self.postman.send(word)
+        self.assertEqual(self.written(), b"")
+        self.postman.flush()
+        time.sleep(0.01)
+        self.assertEqual(self.written(), b"one\ntwo\nthree\n")
+
+    def test_max_latency_flushes(self):
+        self.postman.send("late")
+        time.sleep(0.2)
+        self.assertEqual(self.written(), b"late\n")
+
+    def test_limit_flushes_immediately(self):
+        self.postman.coalesce_limit = 8
+        self.postman.send("0123456789")
+        time.sleep(0.01)
+        self.assertEqual(self.written(), b"0123456789\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# tests/communicate/test_wire_codec.py
+import unittest
+from communicate.wire_codec import (
+    CODECS, PACKED_MARKER, get_codec, decode_message, pack_message, unpack_message
+)
+from communicate.postman import DummyPostman
+from shared_lib.messages import Message
+
+SPECTRUM = {
+    "metadata": {"data_type": "color_spectrum"},
+    "data": {"violet": 1203, "indigo": 2204, "blue": 3105, "cyan": 4006, "green": 5907,
+             "yellow": 6808, "orange": 7709, "red": 8600, "clear": 9501, "nir": 402}
+}
+
+
+class TestPackedFormat(unittest.TestCase):
+
+    def test_values_round_trip(self):
+        payload = {
+            "none": None, "flags": [True, False], "small": 5, "negative": -7,
+            "wide": 70000, "very_negative": -3000000000, "big": 2 ** 40,
+            "float": 12.5, "text": "x" * 40, "long_text": "y" * 300,
+            "nested": {"list": list(range(20)), "unicode": "µL"},
+            "message": "tagged key", "data": {str(i): i for i in range(20)},
+        }
+        sent = Message("SIDEKICK", "TELEMETRY", payload=payload, origin="abcd1234-1")
+        received = unpack_message(pack_message(sent))
+        self.assertEqual(received.to_dict(), sent.to_dict())
+
+    def test_non_string_keys_match_json(self):
+        sent = Message("SIDEKICK", "TELEMETRY", payload={"data": {1: "a", 2.5: "b", None: "d"}, "flags": {True: "c"}})
+        received = unpack_message(pack_message(sent))
+        self.assertEqual(received.payload, Message.from_json(sent.serialize()).payload)
+        self.assertEqual(received.payload, {"data": {"1": "a", "2.5": "b", "null": "d"}, "flags": {"true": "c"}})
+
+    def test_large_values_round_trip(self):
+        payload = {
+            "long_text": "z" * 70000, "long_list": list(range(70000)),
+            "long_map": {str(i): i for i in range(70000)},
+            "uint64": 2 ** 64 - 1, "int64": -2 ** 63,
+        }
+        sent = Message("SIDEKICK", "TELEMETRY", payload=payload)
+        self.assertEqual(unpack_message(pack_message(sent)).to_dict(), sent.to_dict())
+
+    def test_unpackable_message_falls_back_to_json(self):
+        sent = Message("SIDEKICK", "TELEMETRY", payload={"huge": 2 ** 70, "negative": -2 ** 70})
+        codec = get_codec("packed")
+        for encoded in (codec.encode(sent), codec.encode_binary(sent)):
+            self.assertEqual(decode_message(encoded).to_dict(), sent.to_dict())
+
+    def test_packed_is_smaller_than_json(self):
+        msg = Message("COLORIMETER", "DATA_RESPONSE", payload=SPECTRUM, origin="abcd1234-1")
+        self.assertLess(len(get_codec("packed").encode(msg)) * 2, len(get_codec("json").encode(msg)))
+
+    def test_malformed_packed_raises_value_error(self):
+        data = pack_message(Message("SIDEKICK", "SUCCESS"))
+        for broken in (data[:-3], data + b"\x01", b"\xc1"):
+            with self.assertRaises(ValueError):
+                unpack_message(broken)
+        with self.assertRaises(ValueError):
+            decode_message(PACKED_MARKER + "!!!")
+
+
+class TestCodecSelection(unittest.TestCase):
+
+    def test_decode_detects_either_format(self):
+        msg = Message("COLORIMETER", "DATA_RESPONSE", payload=SPECTRUM)
+        for codec in CODECS.values():
+            self.assertEqual(decode_message(codec.encode(msg)).to_dict(), msg.to_dict())
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            get_codec("xml")
+
+    def test_postman_send_message_uses_codec(self):
+        postman = DummyPostman({"protocol": "dummy"})
+        postman.open_channel()
+        msg = Message("HOST", "INSTRUCTION", payload={"func": "ping"})
+        postman.send_message(msg)
+        postman.set_codec("packed")
+        postman.send_message(msg)
+        json_line, packed_line = postman.get_sent_values()
+        self.assertTrue(json_line.startswith("{"))
+        self.assertTrue(packed_line.startswith(PACKED_MARKER))
+        self.assertEqual(decode_message(packed_line).payload, {"func": "ping"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,309 @@
+# tests/host_app/test_device_manager.py
+import os
+import select
+import queue
+import asyncio
+import unittest
+import threading
+from host.core.device_manager import DeviceManager, DeviceProblemError
+from shared_lib.messages import Message
+from communicate.wire_codec import decode_message, PACKED_MARKER, PACKED_TAG
+from communicate.framing import encode_frame, decode_frame
+
+# A pseudo-terminal stands in for the USB CDC data port of a real instrument.
+HAS_PTY = hasattr(os, "openpty")
+
+
+@unittest.skipUnless(HAS_PTY, "Requires a POSIX pseudo-terminal.")
+class TestDeviceManagerThreaded(unittest.TestCase):
+    IO_MODE = "threaded"
+    FRAMING = "line"
+
+    def setUp(self):
+        self.master_fd, slave_fd = os.openpty()
+        self.port = os.ttyname(slave_fd)
+        self._slave_fd = slave_fd
+        self.manager = DeviceManager(io_mode=self.IO_MODE, framing=self.FRAMING)
+        self.manager.start()
+        self.assertTrue(self.manager.connect_device(self.port, 0, 0))
+
+    def tearDown(self):
+        self.manager.stop()
+        os.close(self.master_fd)
+        os.close(self._slave_fd)
+
+    def device_writes_raw(self, data: bytes):
+        """Simulates the instrument writing one line (or frame) to the host."""
+        if self.FRAMING == "cobs":
+            os.write(self.master_fd, encode_frame(data))
+        else:
+            os.write(self.master_fd, data + b"\n")
+
+    def device_writes(self, message: Message):
+        """Simulates the instrument writing one message to the host."""
+        self.device_writes_raw(message.serialize().encode("utf-8"))
+
+    def device_reads(self):
+        """Reads one line (or frame) the host wrote to the instrument."""
+        end = b"\x00" if self.FRAMING == "cobs" else b"\n"
+        line = b""
+        while not line.endswith(end):
+            line += os.read(self.master_fd, 1)
+        if self.FRAMING == "cobs":
+            return decode_frame(line[:-1])
+        return line.decode("utf-8").strip()
+
+    def negotiate_in_background(self):
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(codec=self.manager.negotiate_codec(self.port)))
+        thread.start()
+        return thread, result
+
+    def get_received(self, timeout=2.0):
+        """Returns the next RECV/RAW entry, skipping our own SENT echoes."""
+        while True:
+            entry = self.manager.incoming_message_queue.get(timeout=timeout)
+            if entry[0] != 'SENT':
+                return entry
+
+    def test_receive_message(self):
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"message": "done"}))
+        msg_type, port, message = self.get_received()
+        self.assertEqual(msg_type, 'RECV')
+        self.assertEqual(port, self.port)
+        self.assertEqual(message.status, "SUCCESS")
+        self.assertEqual(message.payload, {"message": "done"})
+
+    def test_raw_line(self):
+        self.device_writes_raw(b"not json")
+        msg_type, port, data = self.get_received()
+        self.assertEqual(msg_type, 'RAW')
+        self.assertIn(data, ("not json", b"not json"))
+
+    def test_burst_keeps_order(self):
+        for i in range(20):
+            self.device_writes(Message("SIDEKICK", "TELEMETRY", payload={"data": {"i": i}}))
+        received = [self.get_received()[2].payload["data"]["i"] for _ in range(20)]
+        self.assertEqual(received, list(range(20)))
+
+    def test_send_message(self):
+        msg = Message("HOST", "INSTRUCTION", payload={"func": "ping", "args": {}})
+        self.manager.send_message(self.port, msg)
+        entry = self.manager.incoming_message_queue.get(timeout=2.0)
+        self.assertEqual(entry[0], 'SENT')
+        self.assertEqual(decode_message(self.device_reads()).payload["func"], "ping")
+
+    def test_disconnect(self):
+        self.manager.disconnect_device(self.port)
+        self.assertNotIn(self.port, self.manager.devices)
+        with self.assertRaises(queue.Empty):
+            self.manager.incoming_message_queue.get(timeout=0.2)
+
+    def test_request_resolves_with_response(self):
+        future = self.manager.request(self.port, {"func": "ping", "args": {}})
+        self.assertFalse(future.done())
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"message": "pong"}))
+        self.assertEqual(future.result(timeout=2.0).payload, {"message": "pong"})
+
+    def test_request_problem_raises(self):
+        future = self.manager.request(self.port, {"func": "to_well", "args": {"well": "Z9"}})
+        self.device_writes(Message("SIDEKICK", "PROBLEM", payload={"message": "Invalid well"}))
+        with self.assertRaises(DeviceProblemError) as ctx:
+            future.result(timeout=2.0)
+        self.assertEqual(ctx.exception.message.payload, {"message": "Invalid well"})
+
+    def test_requests_in_flight_match_expected_status(self):
+        move = self.manager.request(self.port, {"func": "to_well", "args": {"well": "A1"}})
+        info = self.manager.request(self.port, {"func": "get_info"}, expect="DATA_RESPONSE")
+        # Telemetry is never a response; the DATA_RESPONSE must not resolve the move
+        self.device_writes(Message("SIDEKICK", "TELEMETRY", payload={"data": {}}))
+        self.device_writes(Message("SIDEKICK", "DATA_RESPONSE", payload={"data": {"m1": 1}}))
+        self.assertEqual(info.result(timeout=2.0).payload, {"data": {"m1": 1}})
+        self.assertFalse(move.done())
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"message": "moved"}))
+        self.assertEqual(move.result(timeout=2.0).status, "SUCCESS")
+
+    def test_response_matched_by_origin(self):
+        first = self.manager.request(self.port, {"func": "to_well", "args": {"well": "A1"}})
+        second = self.manager.request(self.port, {"func": "to_well", "args": {"well": "B1"}})
+        sent = []
+        while len(sent) < 2:
+            entry = self.manager.incoming_message_queue.get(timeout=2.0)
+            if entry[0] == 'SENT':
+                sent.append(entry[2])
+        # Answer the later instruction first; origin, not arrival order, decides
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"well": "B1"}, origin=sent[1].meta["id"]))
+        self.assertEqual(second.result(timeout=2.0).payload, {"well": "B1"})
+        self.assertFalse(first.done())
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"well": "A1"}, origin=sent[0].meta["id"]))
+        self.assertEqual(first.result(timeout=2.0).payload, {"well": "A1"})
+
+    def test_cancelled_request_is_forgotten(self):
+        stale = self.manager.request(self.port, {"func": "home"})
+        stale.cancel()
+        fresh = self.manager.request(self.port, {"func": "ping"})
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"message": "pong"}))
+        self.assertEqual(fresh.result(timeout=2.0).payload, {"message": "pong"})
+
+    def test_request_async(self):
+        async def run():
+            pending = asyncio.ensure_future(self.manager.request_async(self.port, {"func": "ping"}))
+            await asyncio.sleep(0.05)
+            self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"message": "pong"}))
+            return await asyncio.wait_for(pending, timeout=2.0)
+        self.assertEqual(asyncio.run(run()).payload, {"message": "pong"})
+
+    def test_disconnect_fails_pending_requests(self):
+        future = self.manager.request(self.port, {"func": "home"})
+        self.manager.disconnect_device(self.port)
+        with self.assertRaises(ConnectionError):
+            future.result(timeout=2.0)
+
+    def test_negotiate_codec_switches_to_packed(self):
+        thread, result = self.negotiate_in_background()
+        get_info = decode_message(self.device_reads())
+        self.assertEqual(get_info.payload["func"], "get_info")
+        self.device_writes(Message("SIDEKICK", "DATA_RESPONSE", origin=get_info.meta["id"],
+                                   payload={"metadata": {"codecs": ["packed", "json"]}, "data": {}}))
+        set_codec = decode_message(self.device_reads())
+        self.assertEqual(set_codec.payload, {"func": "set_codec", "args": {"codec": "packed"}})
+        self.device_writes(Message("SIDEKICK", "SUCCESS", origin=set_codec.meta["id"]))
+        thread.join(timeout=5)
+        self.assertEqual(result["codec"], "packed")
+        self.manager.send_message(self.port, Message("HOST", "INSTRUCTION", payload={"func": "ping"}))
+        sent = self.device_reads()
+        self.assertTrue(sent.startswith(PACKED_TAG if self.FRAMING == "cobs" else PACKED_MARKER))
+
+    def test_negotiate_codec_keeps_json_for_old_firmware(self):
+        thread, result = self.negotiate_in_background()
+        get_info = decode_message(self.device_reads())
+        self.device_writes(Message("SIDEKICK", "DATA_RESPONSE", origin=get_info.meta["id"],
+                                   payload={"metadata": {"firmware_name": "old"}, "data": {}}))
+        thread.join(timeout=5)
+        self.assertEqual(result["codec"], "json")
+
+    def device_reports_credit(self, credit, rx):
+        message = Message("SIDEKICK", "TELEMETRY", payload={"data": {}})
+        message.meta.update(credit=credit, rx=rx)
+        self.device_writes(message)
+        self.get_received()
+
+    def assert_nothing_written(self):
+        self.assertEqual(select.select([self.master_fd], [], [], 0.2)[0], [])
+
+    def test_tracks_reported_position(self):
+        device = self.manager.devices[self.port]
+        self.assertIsNone(device.position_steps)
+        future = self.manager.request(self.port, {"func": "to_steps", "args": {"m1": 5, "m2": 6}})
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={
+            "message": "done", "data": {"steps": {"m1": 5, "m2": 6}, "homing_generation": 1}}))
+        future.result(timeout=2.0)
+        self.assertEqual((device.position_steps, device.homing_generation), ((5, 6), 1))
+
+    def test_home_forgets_position(self):
+        device = self.manager.devices[self.port]
+        device.position_steps, device.homing_generation = (5, 6), 1
+        self.manager.request(self.port, {"func": "home"})
+        self.device_reads()
+        self.assertIsNone(device.position_steps)
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={
+            "detail": "Homing successful.", "data": {"steps": {"m1": 100, "m2": 200}, "homing_generation": 2}}))
+        self.get_received()
+        self.assertEqual((device.position_steps, device.homing_generation), ((100, 200), 2))
+
+    def test_skipped_home_keeps_position(self):
+        device = self.manager.devices[self.port]
+        device.position_steps, device.homing_generation = (5, 6), 1
+        future = self.manager.request(self.port, {"func": "home_if_needed", "args": {"generation": 1}})
+        self.device_reads()
+        # Unknown until the reply says whether the device homed
+        self.assertIsNone(device.position_steps)
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"message": "Position trusted; homing skipped.",
+            "data": {"steps": {"m1": 5, "m2": 6}, "homing_generation": 1, "homing_skipped": True}}))
+        future.result(timeout=2.0)
+        self.assertEqual((device.position_steps, device.homing_generation), ((5, 6), 1))
+
+    def test_callback_may_disconnect(self):
+        disconnected = threading.Event()
+        future = self.manager.request(self.port, {"func": "ping", "args": {}})
+        future.add_done_callback(lambda f: (self.manager.disconnect_device(self.port), disconnected.set()))
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"message": "pong"}))
+        self.assertTrue(disconnected.wait(timeout=2.0))
+        self.assertNotIn(self.port, self.manager.devices)
+
+    def test_incoming_queue_is_unbounded_by_default(self):
+        for i in range(2000):
+            self.manager._queue_incoming(('RAW', self.port, i))
+        self.assertEqual(self.manager.incoming_message_queue.qsize(), 2000)
+        self.assertEqual(self.manager.dropped_messages, 0)
+
+    def test_limited_queue_keeps_newest_and_counts_drops(self):
+        manager = DeviceManager(incoming_queue_size=10)
+        with self.assertLogs("host.core.device_manager", level="WARNING") as logs:
+            for i in range(15):
+                manager._queue_incoming(('RAW', self.port, i))
+        self.assertEqual(manager.incoming_message_queue.qsize(), 10)
+        self.assertEqual(manager.incoming_message_queue.get_nowait()[2], 5)
+        self.assertEqual(manager.dropped_messages, 5)
+        self.assertEqual(len(logs.output), 5)
+
+    def test_wait_for_matching_message(self):
+        future = self.manager.wait_for(self.port, lambda m: m.payload.get("data", {}).get("i") == 2)
+        for i in range(3):
+            self.device_writes(Message("SIDEKICK", "TELEMETRY", payload={"data": {"i": i}}))
+        self.assertEqual(future.result(timeout=2.0).payload, {"data": {"i": 2}})
+
+    def test_disconnect_fails_wait_for(self):
+        future = self.manager.wait_for(self.port, lambda m: True)
+        self.manager.disconnect_device(self.port)
+        with self.assertRaises(ConnectionError):
+            future.result(timeout=2.0)
+
+    def test_instructions_wait_for_credit(self):
+        self.device_reports_credit(credit=2, rx=0)
+        for i in range(4):
+            self.assertTrue(self.manager.send_message(self.port, Message("HOST", "INSTRUCTION", payload={"func": "ping", "args": {"i": i}})))
+        self.assertEqual([decode_message(self.device_reads()).payload["args"]["i"] for _ in range(2)], [0, 1])
+        self.assert_nothing_written()
+        # The device took both off the wire and has room again
+        self.device_reports_credit(credit=2, rx=2)
+        self.assertEqual([decode_message(self.device_reads()).payload["args"]["i"] for _ in range(2)], [2, 3])
+
+    def test_no_credit_report_means_no_limit(self):
+        for i in range(5):
+            self.manager.send_message(self.port, Message("HOST", "INSTRUCTION", payload={"func": "ping", "args": {"i": i}}))
+        self.assertEqual([decode_message(self.device_reads()).payload["args"]["i"] for _ in range(5)], list(range(5)))
+
+    def test_disconnect_fails_held_request(self):
+        self.device_reports_credit(credit=0, rx=0)
+        future = self.manager.request(self.port, {"func": "home"})
+        self.assertFalse(future.done())
+        self.manager.disconnect_device(self.port)
+        with self.assertRaises(ConnectionError):
+            future.result(timeout=2.0)
+
+
+class TestDeviceManagerReactor(TestDeviceManagerThreaded):
+    IO_MODE = "reactor"
+
+
+class TestDeviceManagerCobs(TestDeviceManagerThreaded):
+    FRAMING = "cobs"
+
+    def test_corrupt_frame_is_dropped(self):
+        frame = bytearray(encode_frame(Message("SIDEKICK", "INFO").serialize().encode("utf-8")))
+        frame[5] ^= 0xFF
+        os.write(self.master_fd, bytes(frame))
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"message": "after"}))
+        msg_type, port, message = self.get_received()
+        self.assertEqual(msg_type, 'RECV')
+        self.assertEqual(message.payload, {"message": "after"})
+        self.assertEqual(self.manager.devices[self.port].postman.bad_frames, 1)
+
+
+class TestDeviceManagerCobsReactor(TestDeviceManagerCobs):
+    IO_MODE = "reactor"
+
+
+if __name__ == '__main__':
+    unittest.main()
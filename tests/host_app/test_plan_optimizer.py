@@ -0,0 +1,139 @@
+# tests/host_app/test_plan_optimizer.py
+import random
+import unittest
+from host.ai.plan_optimizer import optimize_plan, split_plan, StepTargets
+from host.kinematics import sidekick as host_kinematics
+
+CONFIG = host_kinematics.load_firmware_config()
+
+
+def to_well(well, pump=None):
+    args = {"well": well}
+    if pump:
+        args["pump"] = pump
+    return {"device": "sidekick", "command": "to_well", "args": args}
+
+
+def dispense(pump, vol=50.0):
+    return {"device": "sidekick", "command": "dispense", "args": {"pump": pump, "vol": vol}}
+
+
+def dispense_at(well, pump, vol=50.0):
+    """A dispense_at that gives the well by its coordinates."""
+    names, x, y = host_kinematics.well_positions(CONFIG)
+    i = names.index(well)
+    return {"device": "sidekick", "command": "dispense_at", "args": {"pump": pump, "vol": vol, "x": float(x[i]), "y": float(y[i])}}
+
+
+MEASURE = {"device": "colorimeter", "command": "measure", "args": {}}
+HOME = {"device": "sidekick", "command": "home", "args": {}}
+
+
+def zigzag_plan():
+    """Dispenses into A1..A6 and H7..H12 alternately, the way an LLM might write it."""
+    plan = [HOME]
+    for a, h in zip(range(1, 7), range(12, 6, -1)):
+        plan += [to_well(f"A{a}", "p1"), dispense("p1"), to_well(f"H{h}", "p1"), dispense("p1")]
+    return plan
+
+
+class TestPlanOptimizer(unittest.TestCase):
+
+    def assert_groups_intact(self, plan):
+        """Every dispense and measurement still directly follows a positioning step of its own group."""
+        for previous, step in zip(plan, plan[1:]):
+            if step['command'] == "dispense":
+                self.assertEqual(previous['command'], "to_well")
+                self.assertEqual(previous['args'].get('pump'), step['args']['pump'])
+
+    def test_zigzag_is_shortened(self):
+        plan = zigzag_plan()
+        optimized, report = optimize_plan(plan, CONFIG)
+        self.assertEqual(sorted(map(repr, optimized)), sorted(map(repr, plan)))
+        self.assertEqual(optimized[0], HOME)
+        self.assert_groups_intact(optimized)
+        self.assertEqual(report['groups'], 12)
+        self.assertLess(report['optimized_s'], report['original_s'] * 0.6)
+        self.assertAlmostEqual(report['saved_s'], report['original_s'] - report['optimized_s'])
+        # Wells of one row are now visited together
+        rows = [step['args']['well'][0] for step in optimized if step['command'] == "to_well"]
+        self.assertEqual(sum(1 for a, b in zip(rows, rows[1:]) if a != b), 1)
+
+    def test_same_well_keeps_its_order(self):
+        plan = [HOME,
+                to_well("E6", "p1"), dispense("p1"),
+                to_well("A12", "p1"), dispense("p1"),
+                to_well("E7", "p1"), dispense("p1"),
+                to_well("E6"), MEASURE,
+                to_well("E7"), MEASURE]
+        optimized, _report = optimize_plan(plan, CONFIG)
+        self.assert_groups_intact(optimized)
+        for well in ("E6", "E7"):
+            visits = [i for i, step in enumerate(optimized) if step['args'].get('well') == well]
+            self.assertEqual(optimized[visits[0] + 1]['command'], "dispense")
+            self.assertEqual(optimized[visits[1] + 1], MEASURE)
+
+    def test_coordinates_count_as_their_well(self):
+        plan = [HOME, dispense_at("A1", "p1"),
+                to_well("H12", "p1"), dispense("p1"), to_well("A12", "p1"), dispense("p1"),
+                to_well("H1", "p1"), dispense("p1"), to_well("A2", "p1"), dispense("p1"),
+                to_well("A1"), MEASURE]
+        groups = split_plan(plan, StepTargets(CONFIG))[1][1]
+        self.assertEqual(groups[0]['key'], "A1")
+        optimized, _report = optimize_plan(plan, CONFIG)
+        self.assertLess(optimized.index(plan[1]), optimized.index(plan[-2]))
+
+    def test_mixed_plans_keep_dispense_before_measure(self):
+        names, _x, _y = host_kinematics.well_positions(CONFIG)
+        rng = random.Random(7)
+        for _ in range(100):
+            wells = rng.sample(names, 6)
+            plan = [HOME, dispense_at(wells[0], "p2")]
+            for well in wells[1:5]:
+                plan += [to_well(well, "p1"), dispense("p1")] if rng.random() < 0.5 else [dispense_at(well, "p3")]
+            plan += [to_well(wells[0]), MEASURE, dispense_at(wells[5], "p1")]
+            optimized, _report = optimize_plan(plan, CONFIG)
+            self.assertLess(optimized.index(plan[1]), optimized.index(plan[-3]), wells)
+
+    def test_off_plate_coordinates_are_barriers(self):
+        waste = {"device": "sidekick", "command": "dispense_at", "args": {"pump": "p1", "vol": 50.0, "x": 4.5, "y": -5.0}}
+        plan = zigzag_plan()
+        plan.insert(5, waste)
+        self.assertIsNone(StepTargets(CONFIG).for_step(waste))
+        optimized, _report = optimize_plan(plan, CONFIG)
+        self.assertEqual(optimized.index(waste), 5)
+
+    def test_measure_away_from_center_is_a_barrier(self):
+        # Measuring with a pump over the well reads whatever is under the arm center
+        plan = [HOME, to_well("E6", "p1"), dispense("p1"), to_well("E8", "p2"), dispense("p2"), MEASURE,
+                to_well("E7", "p1"), dispense("p1"), to_well("E7"), MEASURE]
+        items = split_plan(plan, StepTargets(CONFIG))
+        self.assertEqual([kind for kind, _ in items], ["barrier", "groups"] + ["barrier"] * 3 + ["groups"])
+        optimized, _report = optimize_plan(plan, CONFIG)
+        self.assertEqual(optimized[:6], plan[:6])
+
+    def test_barriers_stay_in_place(self):
+        settings = {"device": "colorimeter", "command": "set_settings", "args": {"gain": 16}}
+        plan = zigzag_plan()
+        plan.insert(9, settings)
+        optimized, _report = optimize_plan(plan, CONFIG)
+        self.assertEqual(optimized.index(settings), 9)
+        self.assertEqual(sorted(map(repr, optimized[:9])), sorted(map(repr, plan[:9])))
+
+    def test_unresolvable_steps_are_barriers(self):
+        plan = [to_well("A1", "p1"), dispense("p1"), to_well("Z99", "p1"), dispense("p1"), to_well("H12")]
+        items = split_plan(plan, StepTargets(CONFIG))
+        self.assertEqual([kind for kind, _ in items], ["groups", "barrier", "barrier", "groups"])
+        optimized, _report = optimize_plan(plan, CONFIG)
+        self.assertEqual(optimized, plan)
+
+    def test_optimized_plan_is_kept(self):
+        optimized, _report = optimize_plan(zigzag_plan(), CONFIG)
+        again, report = optimize_plan(optimized, CONFIG)
+        self.assertEqual(again, optimized)
+        self.assertEqual(report['moved'], 0)
+        self.assertEqual(report['saved_s'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# tests/host_app/test_scan.py
+import os
+import unittest
+import threading
+from host.core.device_manager import DeviceManager, DeviceProblemError
+from host.calibration.scan import run_scan
+from shared_lib.messages import Message
+from communicate.wire_codec import decode_message
+
+
+class TestRunScan(unittest.TestCase):
+    """run_scan against a pty that plays the Sidekick's side of the scan protocol."""
+
+    def setUp(self):
+        self.master_fd, self._slave_fd = os.openpty()
+        self.port = os.ttyname(self._slave_fd)
+        self.manager = DeviceManager()
+        self.manager.start()
+        self.assertTrue(self.manager.connect_device(self.port, 0, 0))
+        self.device_received = []
+
+    def tearDown(self):
+        self.manager.stop()
+        os.close(self.master_fd)
+        os.close(self._slave_fd)
+
+    def device_reads(self):
+        line = b""
+        while not line.endswith(b"\n"):
+            line += os.read(self.master_fd, 1)
+        message = decode_message(line.decode("utf-8").strip())
+        self.device_received.append(message.payload["func"])
+        return message
+
+    def device_writes(self, message):
+        os.write(self.master_fd, message.serialize().encode("utf-8") + b"\n")
+
+    def play_sidekick(self, fail_at=None):
+        scan = self.device_reads()
+        points = scan.payload["args"]["points"]
+        for index, (m1, m2) in enumerate(points):
+            if index == fail_at:
+                self.device_writes(Message("SIDEKICK", "PROBLEM", payload={"message": "Sequence aborted"}, origin=scan.meta["id"]))
+                return
+            self.device_writes(Message("SIDEKICK", "TELEMETRY", payload={
+                "metadata": {"data_type": "scan_point"},
+                "data": {"index": index, "total": len(points), "m1": m1, "m2": m2}}))
+            self.device_reads()  # scan_next
+        self.device_writes(Message("SIDEKICK", "SUCCESS", payload={"message": "done"}, origin=scan.meta["id"]))
+
+    def start_device(self, **kwargs):
+        thread = threading.Thread(target=self.play_sidekick, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    def test_measures_each_point_in_order(self):
+        thread = self.start_device()
+        points = [(10, 20), (11, 20), (12, 20)]
+        results = run_scan(self.manager, self.port, points, lambda i, m1, m2: (i, m1, m2), timeout=5)
+        thread.join(timeout=5)
+        self.assertEqual(results, [(0, 10, 20), (1, 11, 20), (2, 12, 20)])
+        self.assertEqual(self.device_received, ["scan", "scan_next", "scan_next", "scan_next"])
+
+    def test_device_abort_raises(self):
+        thread = self.start_device(fail_at=1)
+        measured = []
+        with self.assertRaises(DeviceProblemError):
+            run_scan(self.manager, self.port, [(0, 0), (1, 0), (2, 0)], lambda i, m1, m2: measured.append(i), timeout=5)
+        thread.join(timeout=5)
+        self.assertEqual(measured, [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
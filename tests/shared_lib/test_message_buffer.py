@@ -0,0 +1,63 @@
+# tests/shared_lib/test_message_buffer.py
+import unittest
+from shared_lib.message_buffer import LinearMessageBuffer, RingMessageBuffer, DequeMessageBuffer
+
+
+class TestLinearMessageBuffer(unittest.TestCase):
+    BUFFER = LinearMessageBuffer
+
+    def test_fifo_order(self):
+        buffer = self.BUFFER(max_size=5)
+        for i in range(5):
+            buffer.store(i)
+        self.assertEqual([buffer.get() for _ in range(5)], list(range(5)))
+        self.assertIsNone(buffer.get())
+
+    def test_full_buffer_raises(self):
+        buffer = self.BUFFER(max_size=2)
+        buffer.store("a")
+        buffer.store("b")
+        self.assertTrue(buffer.is_full())
+        with self.assertRaises(OverflowError):
+            buffer.store("c")
+
+    def test_wraps_around(self):
+        buffer = self.BUFFER(max_size=3)
+        received = []
+        for i in range(10):
+            buffer.store(i)
+            if buffer.is_full():
+                received.append(buffer.get())
+        while not buffer.is_empty():
+            received.append(buffer.get())
+        self.assertEqual(received, list(range(10)))
+
+    def test_peek_does_not_remove(self):
+        buffer = self.BUFFER(max_size=3)
+        self.assertIsNone(buffer.peek())
+        buffer.store("a")
+        buffer.store("b")
+        self.assertEqual(buffer.peek(), "a")
+        self.assertEqual(buffer.get(), "a")
+        self.assertEqual(buffer.peek(), "b")
+
+    def test_flush(self):
+        buffer = self.BUFFER(max_size=3)
+        buffer.store("a")
+        buffer.store("b")
+        buffer.flush()
+        self.assertTrue(buffer.is_empty())
+        buffer.store("c")
+        self.assertEqual(buffer.get(), "c")
+
+
+class TestRingMessageBuffer(TestLinearMessageBuffer):
+    BUFFER = RingMessageBuffer
+
+
+class TestDequeMessageBuffer(TestLinearMessageBuffer):
+    BUFFER = DequeMessageBuffer
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# tests/shared_lib/test_messages.py
+import unittest
+from shared_lib.messages import Message
+
+
+class TestMessageMeta(unittest.TestCase):
+
+    def test_new_message_has_id_and_seq(self):
+        msg = Message("HOST", "INSTRUCTION", payload={"func": "ping"})
+        self.assertIn("id", msg.meta)
+        self.assertIn("seq", msg.meta)
+        self.assertNotIn("origin", msg.meta)
+        self.assertTrue(msg.meta["id"].endswith("-" + str(msg.meta["seq"])))
+
+    def test_seq_increases(self):
+        first = Message("HOST", "INSTRUCTION")
+        second = Message("HOST", "INSTRUCTION")
+        self.assertEqual(second.meta["seq"], first.meta["seq"] + 1)
+        self.assertNotEqual(first.meta["id"], second.meta["id"])
+
+    def test_origin_is_recorded(self):
+        instruction = Message("HOST", "INSTRUCTION")
+        reply = Message("SIDEKICK", "SUCCESS", origin=instruction.meta["id"])
+        self.assertEqual(reply.meta["origin"], instruction.meta["id"])
+
+    def test_from_json_keeps_sender_meta(self):
+        sent = Message("SIDEKICK", "SUCCESS", origin="abcd1234-7")
+        received = Message.from_json(sent.serialize())
+        self.assertEqual(received.meta, sent.meta)
+
+    def test_from_json_without_meta(self):
+        received = Message.from_json('{"subsystem_name": "OLD", "status": "INFO", "payload": {}}')
+        self.assertEqual(received.meta, {})
+
+
+class TestMessageSerialization(unittest.TestCase):
+
+    def test_round_trip(self):
+        sent = Message("COLORIMETER", "DATA_RESPONSE", payload={"data": {"red": 12}}, origin="abcd1234-3")
+        received = Message.from_json(sent.serialize())
+        self.assertEqual(received.to_dict(), sent.to_dict())
+
+    def test_message_is_slotted(self):
+        self.assertFalse(hasattr(Message("HOST", "INFO"), "__dict__"))
+
+    def test_from_json_rejects_bad_status(self):
+        with self.assertRaises(ValueError):
+            Message.from_json('{"subsystem_name": "X", "status": "BOGUS", "payload": {}}')
+
+    def test_from_json_rejects_non_object(self):
+        for line in ("not json", "[1, 2]", "5"):
+            with self.assertRaises(ValueError):
+                Message.from_json(line)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+# tests/shared_lib/test_statemachine.py
+import unittest
+from shared_lib.statemachine import StateMachine, State
+from shared_lib.messages import Message
+from communicate.postman import DummyPostman
+
+
+class RecordingPostman(DummyPostman):
+    """DummyPostman that also records flushed writes."""
+    def __init__(self, params):
+        super().__init__(params)
+        self.writes = []
+
+    def _write(self, data):
+        self.writes.append(data)
+
+
+class Chatty(State):
+    """Sends two messages every tick."""
+    @property
+    def name(self):
+        return 'Chatty'
+
+    def update(self, machine):
+        machine.postman.send_message(Message(machine.name, "TELEMETRY"))
+        machine.postman.send_message(Message(machine.name, "INFO"))
+
+
+class Idle(State):
+    """Runs one queued instruction per tick."""
+    @property
+    def name(self):
+        return 'Idle'
+
+    def update(self, machine):
+        super().update(machine)
+        machine.handle_next_instruction()
+
+
+class Step(State):
+    """Finishes on its first tick."""
+    @property
+    def name(self):
+        return 'Step'
+
+    def update(self, machine):
+        super().update(machine)
+        self.task_complete = True
+
+
+class Report(State):
+    """Finishes on its first tick and leaves a result for the SUCCESS."""
+    @property
+    def name(self):
+        return 'Report'
+
+    def update(self, machine):
+        super().update(machine)
+        machine.sequencer.context['result'] = {"steps": {"m1": 1, "m2": 2}}
+        self.task_complete = True
+
+
+def handle_go(machine, payload):
+    machine.sequencer.start([{"state": "Step"}], initial_context={"name": payload["args"]["n"]})
+
+
+class TestUpdateFlushesPostman(unittest.TestCase):
+
+    def test_messages_of_one_tick_share_one_write(self):
+        machine = StateMachine(name="TEST", config={}, init_state='Chatty')
+        machine.postman = RecordingPostman({"protocol": "dummy", "coalesce": True})
+        machine.postman.open_channel()
+        machine.add_state(Chatty())
+        machine.run()
+        machine.update()
+        self.assertEqual(len(machine.postman.writes), 1)
+        self.assertEqual(machine.postman.writes[0].count(b"\n"), 2)
+
+
+class TestInstructionQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.machine = StateMachine(name="TEST", config={}, init_state='Idle')
+        self.machine.postman = DummyPostman({"protocol": "dummy"})
+        self.machine.postman.open_channel()
+        self.machine.add_state(Idle())
+        self.machine.add_state(Step())
+        self.machine.add_state(Report())
+        self.machine.add_command("go", handle_go, {"args": []})
+        self.machine.run()
+
+    def queue(self, n):
+        self.machine.inbox.store(Message("HOST", "INSTRUCTION", payload={"func": "go", "args": {"n": n}}))
+
+    def replies(self):
+        return [Message.from_json(value) for value in self.machine.postman.sent_values]
+
+    def test_queued_instruction_starts_after_sequence_completes(self):
+        self.queue("first")
+        self.queue("second")
+        self.machine.update()  # Idle starts "first"
+        self.assertEqual(self.machine.state.name, 'Step')
+        self.assertEqual(self.machine.inbox.current_size, 1)
+        self.machine.update()  # "first" finishes its work
+        self.machine.update()  # "first" completes; nothing else runs inside its update()
+        self.assertEqual(self.machine.state.name, 'Idle')
+        self.assertEqual(self.machine.inbox.current_size, 1)
+        self.machine.update()  # Idle starts "second"
+        self.assertEqual(self.machine.state.name, 'Step')
+        self.assertTrue(self.machine.sequencer.is_active)
+        self.assertTrue(self.machine.inbox.is_empty())
+        self.machine.update()
+        self.machine.update()
+        self.assertEqual(self.machine.state.name, 'Idle')
+        messages = [reply.payload["message"] for reply in self.replies()]
+        self.assertEqual(messages, ["Sequence first completed successfully", "Sequence second completed successfully"])
+
+    def test_completion_replies_to_its_own_instruction(self):
+        self.queue("first")
+        self.queue("second")
+        ids = [self.machine.inbox.messages[0].meta["id"], self.machine.inbox.messages[1].meta["id"]]
+        for _ in range(6):
+            self.machine.update()
+        self.assertEqual([reply.meta["origin"] for reply in self.replies()], ids)
+
+    def test_sequence_result_is_returned_with_success(self):
+        self.machine.sequencer.start([{"state": "Report"}], initial_context={"name": "report"})
+        self.machine.update()
+        self.machine.update()
+        success = self.replies()[-1]
+        self.assertEqual(success.status, "SUCCESS")
+        self.assertEqual(success.payload["data"], {"steps": {"m1": 1, "m2": 2}})
+
+
+class TestFlowMeta(unittest.TestCase):
+
+    def setUp(self):
+        self.machine = StateMachine(name="TEST", config={"inbox_size": 3}, init_state='Chatty')
+        self.machine.postman = DummyPostman({"protocol": "dummy"})
+        self.machine.postman.open_channel()
+        self.machine.postman.meta_source = self.machine.flow_meta
+
+    def test_credit_is_free_inbox_space(self):
+        self.machine.inbox.store(Message("HOST", "INSTRUCTION"))
+        self.machine.instructions_received = 1
+        self.assertEqual(self.machine.flow_meta(), {"credit": 2, "rx": 1})
+
+    def test_sent_messages_carry_credit(self):
+        self.machine.instructions_received = 4
+        self.machine.postman.send_message(Message("TEST", "SUCCESS"))
+        meta = Message.from_json(self.machine.postman.sent_values[0]).meta
+        self.assertEqual((meta["credit"], meta["rx"]), (3, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# tests/sidekick/reference.py
+"""
+Host-side helpers for checking Sidekick firmware modules.
+
+firmware/sidekick/__init__.py needs CircuitPython's 'board', so board-free
+modules are loaded straight from their files. Handlers and states are imported
+as a package without that __init__; they only need 'digitalio' to set up pins,
+which the tests replace with fakes. legacy_inverse_kinematics is the
+geometric IK the firmware used before the closed form, kept as the reference.
+"""
+import sys
+import math
+import types
+import logging
+import importlib
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+SIDEKICK_DIR = Path(__file__).resolve().parents[2] / "firmware" / "sidekick"
+
+# The parts of the Sidekick configuration the kinematics read
+KINEMATICS_CONFIG = {
+    "motor_settings": {"step_angle_degrees": 0.9, "microsteps": 8, "max_speed_sps": 200},
+    "kinematics": {"L1": 7.0, "L2": 3.0, "L3": 10, "Ln": 0.5},
+    "operational_limits_degrees": {"m1_min": 0.0, "m1_max": 160.0, "m2_min": 80.0, "m2_max": 180.0},
+}
+
+def load_firmware_module(name):
+    """Imports firmware/sidekick/<name>.py without running the package __init__."""
+    spec = importlib.util.spec_from_file_location(f"sidekick_{name}", SIDEKICK_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def import_firmware_module(name):
+    """
+    Imports firmware/sidekick/<name>.py as part of a package, so its relative
+    imports work, without running the package __init__. An empty 'digitalio' is
+    registered when CircuitPython's is not installed.
+    """
+    if "digitalio" not in sys.modules:
+        try:
+            import digitalio
+        except ImportError:
+            sys.modules["digitalio"] = types.ModuleType("digitalio")
+    if "sidekick_firmware" not in sys.modules:
+        package = types.ModuleType("sidekick_firmware")
+        package.__path__ = [str(SIDEKICK_DIR)]
+        sys.modules["sidekick_firmware"] = package
+    return importlib.import_module(f"sidekick_firmware.{name}")
+
+def make_machine(config=KINEMATICS_CONFIG, m1_steps=0, m2_steps=0):
+    """The attributes of a StateMachine that the kinematics use."""
+    log = logging.getLogger("sidekick-test")
+    log.disabled = True
+    return SimpleNamespace(config=config, log=log,
+                           flags={"current_m1_steps": m1_steps, "current_m2_steps": m2_steps})
+
+
+def _find_standard_position_angle(point):
+    x, y = point[0], point[1]
+    if x == 0:
+        return 90 if y > 0 else 270
+    ref_angle = math.degrees(math.atan(y / x))
+    if x > 0 and y >= 0: return ref_angle
+    if x < 0: return 180 + ref_angle
+    return 360 + ref_angle
+
+def _get_intersections(x0, y0, r0, x1, y1, r1):
+    d = math.sqrt((x1 - x0)**2 + (y1 - y0)**2)
+    if d > r0 + r1 or d < abs(r0 - r1) or d == 0:
+        return None
+    a = (r0**2 - r1**2 + d**2) / (2 * d)
+    h = math.sqrt(r0**2 - a**2)
+    x2 = x0 + a * (x1 - x0) / d
+    y2 = y0 + a * (y1 - y0) / d
+    return (x2 + h * (y1 - y0) / d, y2 - h * (x1 - x0) / d,
+            x2 - h * (y1 - y0) / d, y2 + h * (x1 - x0) / d)
+
+def legacy_inverse_kinematics(machine, target_x, target_y):
+    """
+    The previous firmware IK. Returns every conformation within the operational
+    limits, elbow-back first (the firmware returned the first one).
+    """
+    cfg = machine.config['kinematics']
+    L1, L2, L3 = cfg['L1'], cfg['L2'], cfg['L3']
+    op_limits = machine.config['operational_limits_degrees']
+    p4 = (target_x, target_y)
+    p1_intersections = _get_intersections(p4[0], p4[1], L3, 0, 0, L1)
+    if p1_intersections is None:
+        return []
+    possible_solutions = []
+    for p1 in [(p1_intersections[0], p1_intersections[1]), (p1_intersections[2], p1_intersections[3])]:
+        theta1 = _find_standard_position_angle(p1)
+        p3_angle = _find_standard_position_angle((p4[0] - p1[0], p4[1] - p1[1]))
+        p2_x = L2 * math.cos(math.radians(p3_angle + 180))
+        p2_y = L2 * math.sin(math.radians(p3_angle + 180))
+        theta2 = _find_standard_position_angle((p2_x, p2_y))
+        if (op_limits['m1_min'] <= theta1 <= op_limits['m1_max'] and
+            op_limits['m2_min'] <= theta2 <= op_limits['m2_max']):
+            possible_solutions.append((theta1, theta2))
+    return possible_solutions
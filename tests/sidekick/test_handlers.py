@@ -0,0 +1,116 @@
+# tests/sidekick/test_handlers.py
+import unittest
+from tests.sidekick.reference import import_firmware_module, make_machine
+
+handlers = import_firmware_module("handlers")
+kinematics = import_firmware_module("kinematics")
+CONFIG = import_firmware_module("config").SUBSYSTEM_CONFIG
+
+
+class FakePostman:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, message):
+        self.sent.append(message)
+
+
+class FakeSequencer:
+    def __init__(self):
+        self.started = None
+
+    def start(self, sequence, initial_context=None):
+        self.started = (sequence, initial_context)
+
+
+def sidekick(homed=True):
+    """A homed Sidekick at its home position, with no well table."""
+    machine = make_machine(config=CONFIG)
+    machine.name = "SIDEKICK"
+    machine.flags['is_homed'] = homed
+    machine.well_table = None
+    machine.current_origin = None
+    machine.postman = FakePostman()
+    machine.sequencer = FakeSequencer()
+    return machine
+
+
+def well_steps(machine, well, pump=None):
+    """Steps the firmware's IK path computes for a well, from the plate geometry."""
+    pitch = CONFIG["plate_geometry"]["well_pitch_cm"]
+    x = CONFIG["plate_geometry"]["rows"].index(well[0]) * pitch + CONFIG["A1_offset"]["dx"]
+    y = (int(well[1:]) - 1) * pitch + CONFIG["A1_offset"]["dy"]
+    if pump is not None:
+        x, y = kinematics.pump_center_target(machine, CONFIG["pump_offsets"][pump], x, y)
+    return kinematics.degrees_to_steps(machine, *kinematics.inverse_kinematics(machine, x, y))
+
+
+class TestToWells(unittest.TestCase):
+
+    def to_wells(self, machine, **args):
+        handlers.handle_to_wells(machine, {"func": "to_wells", "args": args})
+        return machine.sequencer.started
+
+    def assert_problem(self, machine, text):
+        self.assertIsNone(machine.sequencer.started)
+        self.assertEqual([m.status for m in machine.postman.sent], ["PROBLEM"])
+        self.assertIn(text, machine.postman.sent[0].payload["message"])
+
+    def test_plain_wells_move_and_report(self):
+        machine = sidekick()
+        sequence, context = self.to_wells(machine, wells=["A1", "h12"])
+        self.assertEqual(context, {"name": "to_wells"})
+        self.assertEqual([step["state"] for step in sequence], ["Moving", "ReportProgress"] * 2)
+        m1, m2 = well_steps(machine, "H12")
+        self.assertEqual(sequence[2]["context"], {"target_m1_steps": m1, "target_m2_steps": m2})
+        self.assertEqual(sequence[3]["context"], {"well": "h12", "index": 1, "total": 2})
+        self.assertEqual(machine.postman.sent, [])
+
+    def test_entries_override_the_defaults(self):
+        machine = sidekick()
+        sequence, _context = self.to_wells(machine, pump=1, vol=20, wells=[
+            "B2", {"well": "C3", "pump": "p3"}, {"well": "D4", "vol": 50}, {"well": "E5", "pump": 2, "vol": None}])
+        states = [step["state"] for step in sequence]
+        self.assertEqual(states, ["Moving", "Dispensing", "ReportProgress"] * 3 + ["Moving", "ReportProgress"])
+        dispenses = [step["context"] for step in sequence if step["state"] == "Dispensing"]
+        self.assertEqual(dispenses, [{"dispense_pump": "p1", "dispense_cycles": 2},
+                                     {"dispense_pump": "p3", "dispense_cycles": 2},
+                                     {"dispense_pump": "p1", "dispense_cycles": 5}])
+        m1, m2 = well_steps(machine, "C3", "p3")
+        self.assertEqual(sequence[3]["context"], {"target_m1_steps": m1, "target_m2_steps": m2})
+        m1, m2 = well_steps(machine, "E5", "p2")
+        self.assertEqual(sequence[9]["context"], {"target_m1_steps": m1, "target_m2_steps": m2})
+
+    def test_volume_needs_a_pump(self):
+        machine = sidekick()
+        self.to_wells(machine, wells=["A1", {"well": "B2", "vol": 10}])
+        self.assert_problem(machine, "Missing 'pump' for 'B2'")
+
+    def test_volume_needs_a_real_pump(self):
+        for pump in (0, "0", 5, "p9"):
+            with self.subTest(pump=pump):
+                machine = sidekick()
+                self.to_wells(machine, pump=pump, vol=10, wells=["A1"])
+                self.assert_problem(machine, "Invalid pump specified for 'A1'")
+
+    def test_invalid_entry_stops_everything(self):
+        machine = sidekick()
+        self.to_wells(machine, pump=1, vol=10, wells=["A1", "Z99"])
+        self.assert_problem(machine, "Invalid 'well' designation: 'Z99' (entry 1)")
+
+    def test_volume_below_one_increment(self):
+        machine = sidekick()
+        self.to_wells(machine, pump=1, vol=5, wells=["A1"])
+        self.assert_problem(machine, "too low to dispense")
+
+    def test_requires_wells_and_homing(self):
+        machine = sidekick()
+        self.to_wells(machine, wells=[])
+        self.assert_problem(machine, "'wells' must be a non-empty list.")
+        machine = sidekick(homed=False)
+        self.to_wells(machine, wells=["A1"])
+        self.assert_problem(machine, "must be homed")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+# tests/sidekick/test_homing.py
+import unittest
+from unittest import mock
+from tests.sidekick.reference import import_firmware_module, make_machine
+
+states = import_firmware_module("states")
+CONFIG = import_firmware_module("config").SUBSYSTEM_CONFIG
+SETTINGS = CONFIG["homing_settings"]
+
+MS = 1000000
+FAST_NS = states.motion.NS_PER_S // SETTINGS["seek_speed_sps"]
+SLOW_NS = states.motion.NS_PER_S // SETTINGS["reapproach_speed_sps"]
+BACKOFF = SETTINGS["reapproach_backoff_steps"]
+
+
+class FakeClock:
+    """Stands in for the time module; only moves when advance() is called."""
+
+    def __init__(self):
+        self.now_ns = 0
+
+    def monotonic_ns(self):
+        return self.now_ns
+
+    def monotonic(self):
+        return self.now_ns / 1e9
+
+    def advance(self, ns):
+        self.now_ns += ns
+
+
+class Pin:
+    def __init__(self, value=True):
+        self.value = value
+
+
+class Endstop:
+    """Pulled up: reads False while pressed."""
+
+    def __init__(self, is_pressed):
+        self.is_pressed = is_pressed
+
+    @property
+    def value(self):
+        return not self.is_pressed()
+
+
+class FakeArm:
+    """
+    Counts the steps each motor takes (+1 with its direction pin HIGH) and
+    presses endstop M1 at m1 >= m1_switch and endstop M2 at m2 <= m2_switch.
+    """
+
+    def __init__(self, hardware, clock, m1_switch, m2_switch=None):
+        self.hardware = hardware
+        self.clock = clock
+        self.m1 = 0
+        self.m2 = 0
+        self.pulses = [] # (time_ns, m1 direction, m2 direction)
+        hardware['endstop_m1'] = Endstop(lambda: self.m1 >= m1_switch)
+        hardware['endstop_m2'] = Endstop(lambda: m2_switch is not None and self.m2 <= m2_switch)
+
+    def pulse(self, step_m1, step_m2):
+        m1_dir = self.hardware['motor1_dir'].value
+        m2_dir = self.hardware['motor2_dir'].value
+        if step_m1:
+            self.m1 += 1 if m1_dir else -1
+        if step_m2:
+            self.m2 += 1 if m2_dir else -1
+        self.pulses.append((self.clock.now_ns, m1_dir if step_m1 else None, m2_dir if step_m2 else None))
+
+
+def homing_machine(m1_switch, m2_switch=None, reapproach_steps=BACKOFF):
+    """A machine whose Homing state runs against a FakeArm and a FakeClock."""
+    config = dict(CONFIG, homing_settings=dict(SETTINGS, reapproach_backoff_steps=reapproach_steps))
+    machine = make_machine(config=config)
+    machine.name = "SIDEKICK"
+    machine.hardware = {name: Pin() for name in ('motor1_dir', 'motor2_dir', 'motor1_enable', 'motor2_enable')}
+    clock = FakeClock()
+    arm = FakeArm(machine.hardware, clock, m1_switch, m2_switch)
+    machine.pulses = arm
+    machine.postman = mock.Mock(receive_many=mock.Mock(return_value=[]))
+    machine.sequencer = mock.Mock(is_active=False)
+    machine.state = states.Homing()
+    machine.go_to_state = lambda name: setattr(machine, 'state', name)
+    return machine, arm, clock
+
+
+class TestApproachEndstop(unittest.TestCase):
+
+    def approach_m1(self, machine, clock, tick_ns=MS // 10, limit=200000):
+        """Runs the M1 approach until it reports the endstop; returns the number of calls."""
+        homing = machine.state
+        with mock.patch.object(states, "time", clock):
+            homing.enter(machine)
+            homing._start_approach(machine, ('motor1_dir',), True, True, False)
+            for calls in range(limit):
+                if homing._approach_endstop(machine, 'endstop_m1'):
+                    return calls
+                clock.advance(tick_ns)
+        self.fail("Endstop never reported")
+
+    def test_fast_seek_backoff_and_slow_reapproach(self):
+        machine, arm, clock = homing_machine(m1_switch=300)
+        self.approach_m1(machine, clock)
+        directions = [m1_dir for _time, m1_dir, _m2_dir in arm.pulses]
+        self.assertEqual(directions, [True] * 300 + [False] * BACKOFF + [True] * BACKOFF)
+        self.assertEqual(arm.m1, 300)
+        self.assertEqual([m2_dir for _time, _m1_dir, m2_dir in arm.pulses], [None] * len(arm.pulses))
+
+        times = [t for t, _m1_dir, _m2_dir in arm.pulses]
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        # Seek and backoff at the fast rate, re-approach at the slow one
+        self.assertTrue(all(FAST_NS <= gap < FAST_NS + MS // 10 for gap in gaps[:299 + BACKOFF]))
+        self.assertTrue(all(SLOW_NS <= gap < SLOW_NS + MS // 10 for gap in gaps[300 + BACKOFF:]))
+
+    def test_net_steps_count_toward_the_endstop(self):
+        machine, arm, clock = homing_machine(m1_switch=300)
+        self.approach_m1(machine, clock)
+        homing = machine.state
+        # The backoff is taken back off, so the net is where the switch closed
+        self.assertEqual(homing._net_steps, arm.m1)
+        # The timeout counts every step toward the endstop
+        self.assertEqual(homing._steps_taken, 300 + BACKOFF)
+
+    def test_no_reapproach_stops_on_the_fast_seek(self):
+        machine, arm, clock = homing_machine(m1_switch=120, reapproach_steps=0)
+        self.approach_m1(machine, clock)
+        self.assertEqual([m1_dir for _time, m1_dir, _m2_dir in arm.pulses], [True] * 120)
+        self.assertEqual(machine.state._net_steps, 120)
+
+    def test_steps_wait_for_the_clock(self):
+        machine, arm, clock = homing_machine(m1_switch=300)
+        homing = machine.state
+        with mock.patch.object(states, "time", clock):
+            homing.enter(machine)
+            homing._start_approach(machine, ('motor1_dir',), True, True, False)
+            for _ in range(10):
+                homing._approach_endstop(machine, 'endstop_m1')
+        self.assertEqual(len(arm.pulses), 1)
+
+
+class TestHomingUpdate(unittest.TestCase):
+
+    def run_homing(self, machine, clock, until, tick_ns=MS // 4, limit=200000):
+        homing = machine.state
+        with mock.patch.object(states, "time", clock):
+            homing.enter(machine)
+            for _ in range(limit):
+                homing.update(machine)
+                if until(homing):
+                    return homing
+                clock.advance(tick_ns)
+        self.fail("Homing never reached the expected stage")
+
+    def test_joint_phase_defines_both_positions(self):
+        machine, arm, clock = homing_machine(m1_switch=250, m2_switch=-500)
+        self.run_homing(machine, clock, lambda homing: homing._homing_stage == 'START_JOINT_BACKOFF')
+        offset = CONFIG['step_correction']
+        # M1 was zeroed at its endstop, then moved with M2 (away from it) until M2's closed
+        self.assertEqual(machine.flags['current_m1_steps'], offset['m1e'] + (250 - arm.m1))
+        self.assertEqual(250 - arm.m1, 500)
+        self.assertEqual(machine.flags['current_m2_steps'], 1600 + offset['m2e'])
+        self.assertEqual(arm.m2, -500)
+
+    def test_timeout_goes_to_error(self):
+        machine, arm, clock = homing_machine(m1_switch=10 ** 9)
+        self.run_homing(machine, clock, lambda homing: machine.state == 'Error')
+        self.assertEqual(machine.flags['error_message'], "FAULT: Homing timeout on Motor 1!")
+        self.assertEqual(len(arm.pulses), CONFIG['safe_limits']['m1_max_steps'] + 2000 + 1)
+        self.assertFalse(machine.flags['is_homed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# tests/sidekick/test_host_kinematics.py
+import unittest
+import numpy as np
+from host.kinematics import sidekick as host_kinematics
+from host.calibration.well_table import build_well_table
+from tests.sidekick.reference import load_firmware_module, make_machine
+
+kinematics = load_firmware_module("kinematics")
+motion = load_firmware_module("motion")
+
+CONFIG = host_kinematics.load_firmware_config()
+
+# Grid over the reachable annulus and beyond, 0.25 cm pitch
+GRID = [(x / 4, y / 4) for x in range(-70, 71) for y in range(-70, 71)]
+X = np.array([x for x, _ in GRID])
+Y = np.array([y for _, y in GRID])
+
+
+# NumPy's trig may differ from libm in the last bit; angles and lengths agree well within this
+TOLERANCE = 1e-9
+
+
+class TestHostKinematics(unittest.TestCase):
+    """The vectorized functions must agree with what the firmware computes."""
+
+    def test_inverse_kinematics_matches_firmware(self):
+        for m1_steps, m2_steps in ((0, 0), (1600, 1600), (400, 1200)):
+            machine = make_machine(CONFIG, m1_steps, m2_steps)
+            theta1, theta2, valid = host_kinematics.inverse_kinematics(CONFIG, X, Y, m1_steps, m2_steps)
+            for i, (x, y) in enumerate(GRID):
+                expected = kinematics.inverse_kinematics(machine, x, y)
+                if expected is None:
+                    self.assertFalse(valid[i], (x, y))
+                    self.assertTrue(np.isnan(theta1[i]))
+                else:
+                    self.assertTrue(valid[i], (x, y))
+                    self.assertAlmostEqual(theta1[i], expected[0], delta=TOLERANCE, msg=(x, y))
+                    self.assertAlmostEqual(theta2[i], expected[1], delta=TOLERANCE, msg=(x, y))
+
+    def test_pump_center_target_matches_firmware(self):
+        machine = make_machine(CONFIG)
+        offset = CONFIG['pump_offsets']['p4']
+        center_x, center_y, valid = host_kinematics.pump_center_target(CONFIG, offset, X, Y)
+        for i, (x, y) in enumerate(GRID):
+            expected = kinematics.pump_center_target(machine, offset, x, y)
+            self.assertEqual(valid[i], expected is not None)
+            if expected is not None:
+                self.assertAlmostEqual(center_x[i], expected[0], delta=TOLERANCE, msg=(x, y))
+                self.assertAlmostEqual(center_y[i], expected[1], delta=TOLERANCE, msg=(x, y))
+
+    def test_conversions_and_forward_kinematics_match_firmware(self):
+        machine = make_machine(CONFIG)
+        theta1, theta2, valid = host_kinematics.inverse_kinematics(CONFIG, X, Y)
+        theta1, theta2 = theta1[valid], theta2[valid]
+        m1_steps, m2_steps = host_kinematics.degrees_to_steps(CONFIG, theta1, theta2)
+        x, y = host_kinematics.forward_kinematics(CONFIG, theta1, theta2)
+        back1, back2 = host_kinematics.steps_to_degrees(CONFIG, m1_steps, m2_steps)
+        for i in range(len(theta1)):
+            self.assertEqual((m1_steps[i], m2_steps[i]), kinematics.degrees_to_steps(machine, theta1[i], theta2[i]))
+            expected_x, expected_y = kinematics.forward_kinematics(machine, theta1[i], theta2[i])
+            self.assertAlmostEqual(x[i], expected_x, delta=TOLERANCE)
+            self.assertAlmostEqual(y[i], expected_y, delta=TOLERANCE)
+            self.assertEqual((back1[i], back2[i]), kinematics.steps_to_degrees(machine, int(m1_steps[i]), int(m2_steps[i])))
+
+    def test_degrees_to_steps_truncates_like_int(self):
+        m1_steps, m2_steps = host_kinematics.degrees_to_steps(CONFIG, np.array([-0.3, 10.06, np.nan]), np.array([0.3, -10.06, 1.0]))
+        self.assertEqual(m1_steps.tolist(), [int(-0.3 / 360 * 3200), int(10.06 / 360 * 3200), 0])
+        self.assertEqual(m2_steps.tolist(), [int(0.3 / 360 * 3200), int(-10.06 / 360 * 3200), 8])
+
+    def test_move_cost_matches_firmware(self):
+        _names, _pumps, steps, _valid = host_kinematics.well_steps(CONFIG)
+        center = steps[:, 0]
+        costs = host_kinematics.move_cost(CONFIG, center[:, None], center[None, :])
+        self.assertEqual(costs.shape, (len(center), len(center)))
+        for i in range(0, len(center), 7):
+            for j in range(len(center)):
+                expected = motion.move_cost(CONFIG['motor_settings'], center[i].tolist(), center[j].tolist())
+                self.assertEqual(costs[i, j], expected)
+        # Every distinct tick count, including moves too short to ramp
+        ramp = dict(CONFIG, motor_settings={**CONFIG['motor_settings'], 'acceleration_sps2': 5000})
+        to = np.array([[t, t // 3] for t in range(0, 4000, 13)])
+        self.assertEqual(host_kinematics.move_cost(ramp, [0, 0], to).tolist(),
+                         [motion.move_cost(ramp['motor_settings'], (0, 0), tuple(step)) for step in to.tolist()])
+        constant = dict(CONFIG, motor_settings={**CONFIG['motor_settings'], 'acceleration_sps2': 0})
+        self.assertEqual(host_kinematics.move_cost(constant, [0, 0], [[0, 0], [1, 5], [-300, 20]]).tolist(),
+                         [motion.move_cost(constant['motor_settings'], (0, 0), to) for to in ((0, 0), (1, 5), (-300, 20))])
+
+    def test_well_steps_matches_well_table(self):
+        names, pumps, steps, valid = host_kinematics.well_steps(CONFIG)
+        table = build_well_table(CONFIG)
+        self.assertEqual(pumps, table['pumps'])
+        self.assertEqual(names, list(table['wells']))
+        self.assertTrue(valid.all())
+        for i, name in enumerate(names):
+            # A target truncated right on a step boundary may land one step apart
+            difference = np.abs(steps[i].reshape(-1) - np.array(table['wells'][name]))
+            self.assertLessEqual(difference.max(), 1, name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# tests/sidekick/test_kinematics.py
+import unittest
+from tests.sidekick.reference import load_firmware_module, make_machine, legacy_inverse_kinematics
+
+kinematics = load_firmware_module("kinematics")
+
+# Grid over the reachable annulus (|L1 - L3| = 3 cm to L1 + L3 = 17 cm), 0.25 cm pitch
+GRID = [(x / 4, y / 4) for x in range(-70, 71) for y in range(-70, 71)]
+
+
+LIMITS = make_machine().config['operational_limits_degrees']
+
+
+def on_limit(angles_list):
+    """True if any angle sits on an operational limit, where rounding decides validity."""
+    edges = (LIMITS['m1_min'], LIMITS['m1_max'], LIMITS['m2_min'], LIMITS['m2_max'], 360.0)
+    return any(abs(angle - edge) < 1e-6 for angles in angles_list for angle in angles for edge in edges)
+
+
+def travel(machine, angles):
+    m1_steps, m2_steps = kinematics.degrees_to_steps(machine, *angles)
+    return max(abs(m1_steps - machine.flags['current_m1_steps']), abs(m2_steps - machine.flags['current_m2_steps']))
+
+
+class TestInverseKinematics(unittest.TestCase):
+
+    def assert_matches_reference(self, machine):
+        checked = 0
+        for x, y in GRID:
+            expected = legacy_inverse_kinematics(machine, x, y)
+            result = kinematics.inverse_kinematics(machine, x, y)
+            if on_limit(expected + ([result] if result else [])):
+                continue
+            if not expected:
+                self.assertIsNone(result, f"({x}, {y})")
+                continue
+            checked += 1
+            self.assertIsNotNone(result, f"({x}, {y})")
+            # One of the reference conformations, and the one with the least travel
+            distance = min(max(abs(result[0] - t1), abs(result[1] - t2)) for t1, t2 in expected)
+            self.assertLess(distance, 1e-6, f"({x}, {y})")
+            self.assertLessEqual(travel(machine, result), min(travel(machine, s) for s in expected))
+        self.assertGreater(checked, 1000)
+
+    def test_matches_reference_from_home(self):
+        self.assert_matches_reference(make_machine())
+
+    def test_matches_reference_from_elsewhere(self):
+        self.assert_matches_reference(make_machine(m1_steps=1200, m2_steps=2800))
+
+    def test_round_trip_through_forward_kinematics(self):
+        machine = make_machine()
+        for x, y in [(10.0, 7.0), (7.59, -5.3), (13.89, 4.6)]:
+            theta1, theta2 = kinematics.inverse_kinematics(machine, x, y)
+            fx, fy = kinematics.forward_kinematics(machine, theta1, theta2)
+            self.assertAlmostEqual(fx, x, places=9)
+            self.assertAlmostEqual(fy, y, places=9)
+
+    def test_unreachable(self):
+        machine = make_machine()
+        self.assertIsNone(kinematics.inverse_kinematics(machine, 0.0, 0.0))
+        self.assertIsNone(kinematics.inverse_kinematics(machine, 20.0, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+# tests/sidekick/test_motion.py
+import unittest
+from tests.sidekick.reference import load_firmware_module
+
+motion = load_firmware_module("motion")
+config = load_firmware_module("config")
+
+MS = 1000000
+
+
+def run_move(stepper, loop_period_ns, start_ns=0, limit=100000):
+    """Drives a stepper from a simulated main loop; returns [(time_ns, step_m1, step_m2)]."""
+    stepper.start(start_ns)
+    now = start_ns
+    ticks = []
+    while not stepper.done and limit:
+        for _ in range(stepper.steps_due(now)):
+            ticks.append((now,) + stepper.next_step())
+        now += loop_period_ns
+        limit -= 1
+    return ticks
+
+
+class TestDDAStepper(unittest.TestCase):
+
+    def test_step_counts_and_joint_arrival(self):
+        for delta_m1, delta_m2 in ((100, 37), (-37, 100), (5, -5), (0, 12), (250, 1), (0, 0)):
+            stepper = motion.DDAStepper(delta_m1, delta_m2, motion.ConstantRateProfile(1000))
+            ticks = run_move(stepper, MS)
+            self.assertTrue(stepper.done)
+            self.assertEqual(len(ticks), max(abs(delta_m1), abs(delta_m2)))
+            self.assertEqual(sum(t[1] for t in ticks), abs(delta_m1))
+            self.assertEqual(sum(t[2] for t in ticks), abs(delta_m2))
+            # Each joint's last step falls within its final step period of the move
+            for axis, delta in ((1, delta_m1), (2, delta_m2)):
+                if delta:
+                    last = max(i for i, t in enumerate(ticks) if t[axis])
+                    self.assertGreaterEqual(last, len(ticks) - len(ticks) // abs(delta))
+
+    def test_minor_axis_steps_evenly(self):
+        stepper = motion.DDAStepper(300, 100, motion.ConstantRateProfile(1000))
+        ticks = run_move(stepper, MS)
+        minor = [i for i, t in enumerate(ticks) if t[2]]
+        gaps = {b - a for a, b in zip(minor, minor[1:])}
+        self.assertEqual(gaps, {3})
+
+    def test_rate_comes_from_schedule_not_loop(self):
+        # A 0.25 ms loop must not step faster than 1000 ticks/s
+        stepper = motion.DDAStepper(200, 50, motion.ConstantRateProfile(1000))
+        ticks = run_move(stepper, MS // 4)
+        self.assertEqual(ticks[-1][0], 199 * MS)
+
+    def test_slow_loop_gets_several_steps_per_update(self):
+        # A 4 ms loop still averages 1000 ticks/s, four per update
+        stepper = motion.DDAStepper(400, 0, motion.ConstantRateProfile(1000))
+        ticks = run_move(stepper, 4 * MS)
+        self.assertEqual(len(ticks), 400)
+        self.assertLessEqual(ticks[-1][0], 400 * MS)
+        per_update = {}
+        for now, _, _ in ticks:
+            per_update[now] = per_update.get(now, 0) + 1
+        self.assertEqual(max(per_update.values()), 4)
+
+    def test_stall_is_capped_and_dropped(self):
+        stepper = motion.DDAStepper(100, 0, motion.ConstantRateProfile(1000), max_burst=8)
+        stepper.start(0)
+        # A 50 ms stall: one capped burst, then the schedule resumes instead of replaying 50 ticks
+        self.assertEqual(stepper.steps_due(50 * MS), 8)
+        for _ in range(8):
+            stepper.next_step()
+        self.assertEqual(stepper.steps_due(50 * MS), 1)
+        stepper.next_step()
+        self.assertEqual(stepper.steps_due(50 * MS + MS // 2), 0)
+        self.assertEqual(stepper.steps_due(51 * MS), 1)
+
+
+class TestTrapezoidProfile(unittest.TestCase):
+
+    def speeds(self, profile, total_ticks):
+        """Instantaneous speed (ticks/s) over each interval of the move."""
+        times = [profile.tick_time(k) for k in range(total_ticks)]
+        self.assertEqual(times[0], 0)
+        self.assertEqual(times, sorted(times))
+        return [1e9 / (b - a) for a, b in zip(times, times[1:])]
+
+    def test_long_move_ramps_cruises_and_ramps_down(self):
+        profile = motion.TrapezoidProfile(3000, max_speed_sps=2000, accel_sps2=4000, start_speed_sps=200)
+        speeds = self.speeds(profile, 3000)
+        self.assertLess(speeds[0], 300)
+        self.assertLess(speeds[-1], 300)
+        self.assertAlmostEqual(max(speeds), 2000, delta=2)
+        self.assertAlmostEqual(speeds[1500], 2000, delta=2)
+        # Symmetric ramps, and no interval changes speed faster than the acceleration allows
+        self.assertAlmostEqual(speeds[10], speeds[-11], delta=1)
+        for k in range(1, len(speeds)):
+            dt = (profile.tick_time(k + 1) - profile.tick_time(k - 1)) / 2e9
+            self.assertLessEqual(abs(speeds[k] - speeds[k - 1]), 4000 * dt * 1.05 + 1)
+        # Far quicker than the old fixed 200 steps/s
+        self.assertLess(profile.tick_time(2999) / 1e9, 3000 / 200 / 4)
+
+    def test_short_move_is_a_triangle(self):
+        profile = motion.TrapezoidProfile(101, max_speed_sps=2000, accel_sps2=4000, start_speed_sps=200)
+        self.assertEqual(profile.ramp, 50)
+        self.assertLess(profile.peak_speed, 2000)
+        speeds = self.speeds(profile, 101)
+        self.assertEqual(max(speeds), max(speeds[49], speeds[50]))
+
+    def test_degenerate_moves(self):
+        for total_ticks in (0, 1, 2):
+            profile = motion.TrapezoidProfile(total_ticks, max_speed_sps=2000, accel_sps2=4000, start_speed_sps=0)
+            self.assertEqual(profile.tick_time(0), 0)
+
+    def test_stepper_follows_profile(self):
+        profile = motion.TrapezoidProfile(500, max_speed_sps=2000, accel_sps2=4000, start_speed_sps=200)
+        stepper = motion.DDAStepper(500, -120, profile)
+        ticks = run_move(stepper, MS // 10)
+        self.assertEqual(len(ticks), 500)
+        self.assertEqual(sum(t[2] for t in ticks), 120)
+        # Every tick fires within one loop period of its scheduled time
+        for k, (now, _, _) in enumerate(ticks):
+            self.assertLess(now - profile.tick_time(k), MS // 10)
+
+    def test_plan_move_uses_motor_settings(self):
+        settings = config.SUBSYSTEM_CONFIG['motor_settings']
+        stepper = motion.plan_move(settings, 800, 300)
+        self.assertIsInstance(stepper.profile, motion.TrapezoidProfile)
+        self.assertEqual(stepper.max_burst, settings['max_steps_per_update'])
+        constant = motion.plan_move({"move_speed_sps": 500}, 800, 300)
+        self.assertEqual(constant.profile.tick_time(3), 6 * MS)
+
+
+class TestMoveCost(unittest.TestCase):
+
+    def test_matches_the_planned_move(self):
+        settings = config.SUBSYSTEM_CONFIG['motor_settings']
+        for delta_m1, delta_m2 in ((800, 300), (-40, 1200), (3, 0), (0, 0), (1, -1)):
+            stepper = motion.plan_move(settings, delta_m1, delta_m2)
+            ticks = run_move(stepper, MS // 10, start_ns=5 * MS)
+            cost = motion.move_cost(settings, (100, 200), (100 + delta_m1, 200 + delta_m2))
+            last = ticks[-1][0] - 5 * MS if ticks else 0
+            # The loop sees each tick within one period of its scheduled time
+            self.assertGreaterEqual(last / 1e9 + 1e-9, cost)
+            self.assertLess(last / 1e9, cost + 1e-4)
+
+    def test_set_by_the_busier_motor(self):
+        settings = config.SUBSYSTEM_CONFIG['motor_settings']
+        self.assertEqual(motion.move_cost(settings, (0, 0), (500, 20)), motion.move_cost(settings, (0, 0), (-20, -500)))
+        self.assertLess(motion.move_cost(settings, (0, 0), (500, 20)), motion.move_cost(settings, (0, 0), (501, 0)))
+        self.assertEqual(motion.move_cost({"move_speed_sps": 500}, (0, 0), (11, 4)), 0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
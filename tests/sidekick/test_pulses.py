@@ -0,0 +1,92 @@
+# tests/sidekick/test_pulses.py
+import random
+import unittest
+from tests.sidekick.reference import load_firmware_module
+
+motion = load_firmware_module("motion")
+pulses = load_firmware_module("pulses")
+
+MS = 1000000
+
+
+class RecordingPin:
+    """A step pin that counts rising edges."""
+
+    def __init__(self):
+        self._value = False
+        self.rising_edges = 0
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, level):
+        if level and not self._value:
+            self.rising_edges += 1
+        self._value = level
+
+
+def trapezoid_stepper(delta_m1, delta_m2):
+    profile = motion.TrapezoidProfile(max(abs(delta_m1), abs(delta_m2)), 2000, 4000, 200)
+    return motion.DDAStepper(delta_m1, delta_m2, profile)
+
+
+class TestLoopPulseBackend(unittest.TestCase):
+
+    def test_move_pulses_each_pin(self):
+        m1, m2 = RecordingPin(), RecordingPin()
+        backend = pulses.LoopPulseBackend(m1, m2)
+        backend.start(trapezoid_stepper(300, -90), 0)
+        now = 0
+        while not backend.poll(now):
+            now += MS // 2
+        self.assertEqual((m1.rising_edges, m2.rising_edges), (300, 90))
+        self.assertFalse(m1.value or m2.value)
+
+    def test_single_pulse(self):
+        m1, m2 = RecordingPin(), RecordingPin()
+        backend = pulses.LoopPulseBackend(m1, m2)
+        backend.pulse(True, False)
+        backend.pulse(True, True)
+        self.assertEqual((m1.rising_edges, m2.rising_edges), (2, 1))
+
+
+class TestSimulatedPulseBackend(unittest.TestCase):
+
+    def test_timing_is_independent_of_the_loop(self):
+        delta_m1, delta_m2 = 700, 260
+        expected_stepper = trapezoid_stepper(delta_m1, delta_m2)
+        backend = pulses.SimulatedPulseBackend(chunk_ticks=32)
+        backend.start(trapezoid_stepper(delta_m1, delta_m2), 5 * MS)
+        # An irregular loop with occasional 10 ms stalls
+        rng = random.Random(1)
+        now = 5 * MS
+        while not backend.poll(now):
+            now += rng.choice((MS // 4, MS, 10 * MS))
+        profile = expected_stepper.profile
+        self.assertEqual(len(backend.events), delta_m1)
+        for tick, (time_ns, step_m1, step_m2) in enumerate(backend.events):
+            self.assertEqual(time_ns, 5 * MS + profile.tick_time(tick))
+            self.assertEqual((step_m1, step_m2), expected_stepper.next_step())
+        self.assertGreaterEqual(now, backend.events[-1][0])
+        self.assertEqual(backend.chunks_queued, (delta_m1 + 31) // 32)
+
+    def test_buffer_is_bounded(self):
+        backend = pulses.SimulatedPulseBackend(chunk_ticks=16, depth_chunks=2)
+        backend.start(trapezoid_stepper(500, 0), 0)
+        self.assertLessEqual(len(backend.events), 32)
+        backend.poll(0)
+        self.assertLessEqual(len(backend.events), 32)
+
+    def test_stop_drops_unplayed_ticks(self):
+        backend = pulses.SimulatedPulseBackend(chunk_ticks=64)
+        backend.start(trapezoid_stepper(500, 0), 0)
+        backend.poll(20 * MS)
+        backend.stop()
+        self.assertTrue(all(event[0] <= 20 * MS for event in backend.events))
+        self.assertGreater(len(backend.events), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# tests/sidekick/test_well_table.py
+import os
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from host.calibration.well_table import build_well_table, load_calibration
+from tests.sidekick.reference import load_firmware_module, make_machine
+
+config = load_firmware_module("config")
+kinematics = load_firmware_module("kinematics")
+well_table = load_firmware_module("well_table")
+
+CONFIG = config.SUBSYSTEM_CONFIG
+CALIBRATION_FILE = Path(__file__).resolve().parents[2] / "sidekick_calibration.json"
+
+
+def firmware_steps(machine, well, pump):
+    """Steps the firmware's IK path (well_to_world + calculate_angles) computes for a well."""
+    rows = CONFIG["plate_geometry"]["rows"]
+    pitch = CONFIG["plate_geometry"]["well_pitch_cm"]
+    x = rows.index(well[0]) * pitch + CONFIG["A1_offset"]["dx"]
+    y = (int(well[1:]) - 1) * pitch + CONFIG["A1_offset"]["dy"]
+    if pump is not None:
+        x, y = kinematics.pump_center_target(machine, CONFIG["pump_offsets"][pump], x, y)
+    return kinematics.degrees_to_steps(machine, *kinematics.inverse_kinematics(machine, x, y))
+
+
+class TestBuildWellTable(unittest.TestCase):
+
+    def test_ik_table_matches_firmware_ik(self):
+        table = build_well_table(CONFIG)
+        self.assertEqual(len(table["wells"]), 96)
+        self.assertEqual(table["pumps"], ["center", "p1", "p2", "p3", "p4"])
+        table["pump_index"] = {pump: i for i, pump in enumerate(table["pumps"])}
+        machine = make_machine(CONFIG)
+        for well in table["wells"]:
+            for pump in (None, "p1", "p2", "p3", "p4"):
+                self.assertEqual(well_table.lookup_well_steps(table, well, pump),
+                                 firmware_steps(machine, well, pump), f"{well} {pump}")
+
+    def test_calibration_reproduces_reference_steps(self):
+        calibration = load_calibration(CALIBRATION_FILE, CONFIG["plate_geometry"]["rows"])
+        table = build_well_table(CONFIG, calibration)
+        self.assertEqual(table["source"], "calibration")
+        with open(CALIBRATION_FILE) as f:
+            reference_points = json.load(f)["reference_points"]
+        for point in reference_points:
+            self.assertEqual(table["wells"][point["well"]][:2], point["final_motor_steps"])
+
+    def test_table_is_json(self):
+        table = build_well_table(CONFIG)
+        self.assertEqual(json.loads(json.dumps(table)), table)
+
+
+class TestLoadWellTable(unittest.TestCase):
+
+    def setUp(self):
+        self.machine = make_machine(CONFIG)
+        handle, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write(self, table):
+        with open(self.path, "w") as f:
+            json.dump(table, f)
+
+    def test_lookup(self):
+        self.write(build_well_table(CONFIG))
+        table = well_table.load_well_table(self.machine, self.path)
+        center = firmware_steps(self.machine, "B6", None)
+        self.assertEqual(well_table.lookup_well_steps(table, "b6 ", 0), center)
+        self.assertEqual(well_table.lookup_well_steps(table, "B6"), center)
+        self.assertEqual(well_table.lookup_well_steps(table, "B6", 2), firmware_steps(self.machine, "B6", "p2"))
+        self.assertEqual(well_table.lookup_well_steps(table, "B6", "P2"), firmware_steps(self.machine, "B6", "p2"))
+        self.assertIsNone(well_table.lookup_well_steps(table, "Z1"))
+        self.assertIsNone(well_table.lookup_well_steps(table, "B6", "p9"))
+        self.assertIsNone(well_table.lookup_well_steps(None, "B6"))
+
+    def test_missing_file_falls_back(self):
+        self.assertIsNone(well_table.load_well_table(self.machine, self.path + ".missing"))
+
+    def test_other_configuration_is_ignored(self):
+        changed = dict(CONFIG, step_correction={"m1e": 0, "m2e": 0})
+        self.write(build_well_table(changed))
+        self.assertIsNone(well_table.load_well_table(self.machine, self.path))
+
+    def test_motion_settings_do_not_invalidate_table(self):
+        self.write(build_well_table(CONFIG))
+        motor_settings = dict(CONFIG['motor_settings'], move_speed_sps=500, acceleration_sps2=0,
+                              max_steps_per_update=2, pulse_backend="pio")
+        self.machine.config = dict(CONFIG, motor_settings=motor_settings)
+        self.assertIsNotNone(well_table.load_well_table(self.machine, self.path))
+        self.machine.config = dict(CONFIG, motor_settings=dict(motor_settings, microsteps=16))
+        self.assertIsNone(well_table.load_well_table(self.machine, self.path))
+
+    def test_malformed_file_is_ignored(self):
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertIsNone(well_table.load_well_table(self.machine, self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()